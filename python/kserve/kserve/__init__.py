@@ -13,87 +13,104 @@
 # limitations under the License.
 from __future__ import absolute_import
 
+import importlib
+
 from kserve.model import Model
 from kserve.model_server import ModelServer
 from kserve.model_repository import ModelRepository
-from kserve.storage import Storage
 from kserve.constants import constants
 from kserve.utils import utils
 from kserve.handlers import base
 
-# import client apis into kserve package
-from kserve.api.kserve_client import KServeClient
-from kserve.constants import constants
+# Imported on first access, so that a model server importing kserve doesn't pay for
+# the storage SDKs, the kubernetes client and the generated OpenAPI models.
+_LAZY_ATTRS = {
+    "Storage": "kserve.storage",
+    "KServeClient": "kserve.api.kserve_client",
+
+    # client API and exceptions
+    "ApiClient": "kserve.api_client",
+    "Configuration": "kserve.configuration",
+    "OpenApiException": "kserve.exceptions",
+    "ApiTypeError": "kserve.exceptions",
+    "ApiValueError": "kserve.exceptions",
+    "ApiKeyError": "kserve.exceptions",
+    "ApiException": "kserve.exceptions",
+
+    # v1alpha1 models
+    "V1alpha1BuiltInAdapter": "kserve.models.v1alpha1_built_in_adapter",
+    "V1alpha1ClusterServingRuntime": "kserve.models.v1alpha1_cluster_serving_runtime",
+    "V1alpha1ClusterServingRuntimeList": "kserve.models.v1alpha1_cluster_serving_runtime_list",
+    "V1alpha1Container": "kserve.models.v1alpha1_container",
+    "V1alpha1ModelSpec": "kserve.models.v1alpha1_model_spec",
+    "V1alpha1ServingRuntime": "kserve.models.v1alpha1_serving_runtime",
+    "V1alpha1ServingRuntimeList": "kserve.models.v1alpha1_serving_runtime_list",
+    "V1alpha1ServingRuntimePodSpec": "kserve.models.v1alpha1_serving_runtime_pod_spec",
+    "V1alpha1ServingRuntimeSpec": "kserve.models.v1alpha1_serving_runtime_spec",
+    "V1alpha1StorageHelper": "kserve.models.v1alpha1_storage_helper",
+    "V1alpha1SupportedModelFormat": "kserve.models.v1alpha1_supported_model_format",
+    "V1alpha1TrainedModel": "kserve.models.v1alpha1_trained_model",
+    "V1alpha1TrainedModelList": "kserve.models.v1alpha1_trained_model_list",
+    "V1alpha1TrainedModelSpec": "kserve.models.v1alpha1_trained_model_spec",
+
+    # v1beta1 models
+    "KnativeAddressable": "kserve.models.knative_addressable",
+    "KnativeCondition": "kserve.models.knative_condition",
+    "KnativeURL": "kserve.models.knative_url",
+    "KnativeVolatileTime": "kserve.models.knative_volatile_time",
+    "NetUrlUserinfo": "kserve.models.net_url_userinfo",
+    "V1beta1AIXExplainerSpec": "kserve.models.v1beta1_aix_explainer_spec",
+    "V1beta1ARTExplainerSpec": "kserve.models.v1beta1_art_explainer_spec",
+    "V1beta1AlibiExplainerSpec": "kserve.models.v1beta1_alibi_explainer_spec",
+    "V1beta1Batcher": "kserve.models.v1beta1_batcher",
+    "V1beta1ComponentExtensionSpec": "kserve.models.v1beta1_component_extension_spec",
+    "V1beta1ComponentStatusSpec": "kserve.models.v1beta1_component_status_spec",
+    "V1beta1CustomExplainer": "kserve.models.v1beta1_custom_explainer",
+    "V1beta1CustomPredictor": "kserve.models.v1beta1_custom_predictor",
+    "V1beta1CustomTransformer": "kserve.models.v1beta1_custom_transformer",
+    "V1beta1DeployConfig": "kserve.models.v1beta1_deploy_config",
+    "V1beta1ExplainerConfig": "kserve.models.v1beta1_explainer_config",
+    "V1beta1ExplainerExtensionSpec": "kserve.models.v1beta1_explainer_extension_spec",
+    "V1beta1ExplainerSpec": "kserve.models.v1beta1_explainer_spec",
+    "V1beta1ExplainersConfig": "kserve.models.v1beta1_explainers_config",
+    "V1beta1InferenceService": "kserve.models.v1beta1_inference_service",
+    "V1beta1InferenceServiceList": "kserve.models.v1beta1_inference_service_list",
+    "V1beta1InferenceServiceSpec": "kserve.models.v1beta1_inference_service_spec",
+    "V1beta1InferenceServiceStatus": "kserve.models.v1beta1_inference_service_status",
+    "V1beta1InferenceServicesConfig": "kserve.models.v1beta1_inference_services_config",
+    "V1beta1IngressConfig": "kserve.models.v1beta1_ingress_config",
+    "V1beta1LightGBMSpec": "kserve.models.v1beta1_light_gbm_spec",
+    "V1beta1LoggerSpec": "kserve.models.v1beta1_logger_spec",
+    "V1beta1ModelFormat": "kserve.models.v1beta1_model_format",
+    "V1beta1ModelSpec": "kserve.models.v1beta1_model_spec",
+    "V1beta1ONNXRuntimeSpec": "kserve.models.v1beta1_onnx_runtime_spec",
+    "V1beta1PMMLSpec": "kserve.models.v1beta1_pmml_spec",
+    "V1beta1PaddleServerSpec": "kserve.models.v1beta1_paddle_server_spec",
+    "V1beta1PodSpec": "kserve.models.v1beta1_pod_spec",
+    "V1beta1PredictorConfig": "kserve.models.v1beta1_predictor_config",
+    "V1beta1PredictorExtensionSpec": "kserve.models.v1beta1_predictor_extension_spec",
+    "V1beta1PredictorProtocols": "kserve.models.v1beta1_predictor_protocols",
+    "V1beta1PredictorSpec": "kserve.models.v1beta1_predictor_spec",
+    "V1beta1PredictorsConfig": "kserve.models.v1beta1_predictors_config",
+    "V1beta1SKLearnSpec": "kserve.models.v1beta1_sk_learn_spec",
+    "V1beta1TFServingSpec": "kserve.models.v1beta1_tf_serving_spec",
+    "V1beta1TorchServeSpec": "kserve.models.v1beta1_torch_serve_spec",
+    "V1beta1TransformerConfig": "kserve.models.v1beta1_transformer_config",
+    "V1beta1TransformerSpec": "kserve.models.v1beta1_transformer_spec",
+    "V1beta1TransformersConfig": "kserve.models.v1beta1_transformers_config",
+    "V1beta1TritonSpec": "kserve.models.v1beta1_triton_spec",
+    "V1beta1XGBoostSpec": "kserve.models.v1beta1_xg_boost_spec",
+}
+
 
-# import ApiClient
-from kserve.api_client import ApiClient
-from kserve.configuration import Configuration
-from kserve.exceptions import OpenApiException
-from kserve.exceptions import ApiTypeError
-from kserve.exceptions import ApiValueError
-from kserve.exceptions import ApiKeyError
-from kserve.exceptions import ApiException
+def __getattr__(name):
+    module = _LAZY_ATTRS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
 
-# import v1alpha1 models into kserve packages
-from kserve.models.v1alpha1_built_in_adapter import V1alpha1BuiltInAdapter
-from kserve.models.v1alpha1_cluster_serving_runtime import V1alpha1ClusterServingRuntime
-from kserve.models.v1alpha1_cluster_serving_runtime_list import V1alpha1ClusterServingRuntimeList
-from kserve.models.v1alpha1_container import V1alpha1Container
-from kserve.models.v1alpha1_model_spec import V1alpha1ModelSpec
-from kserve.models.v1alpha1_serving_runtime import V1alpha1ServingRuntime
-from kserve.models.v1alpha1_serving_runtime_list import V1alpha1ServingRuntimeList
-from kserve.models.v1alpha1_serving_runtime_pod_spec import V1alpha1ServingRuntimePodSpec
-from kserve.models.v1alpha1_serving_runtime_spec import V1alpha1ServingRuntimeSpec
-from kserve.models.v1alpha1_storage_helper import V1alpha1StorageHelper
-from kserve.models.v1alpha1_supported_model_format import V1alpha1SupportedModelFormat
-from kserve.models.v1alpha1_trained_model import V1alpha1TrainedModel
-from kserve.models.v1alpha1_trained_model_list import V1alpha1TrainedModelList
-from kserve.models.v1alpha1_trained_model_spec import V1alpha1TrainedModelSpec
 
-# import v1beta1 models into sdk package
-from kserve.models.knative_addressable import KnativeAddressable
-from kserve.models.knative_condition import KnativeCondition
-from kserve.models.knative_url import KnativeURL
-from kserve.models.knative_volatile_time import KnativeVolatileTime
-from kserve.models.net_url_userinfo import NetUrlUserinfo
-from kserve.models.v1beta1_aix_explainer_spec import V1beta1AIXExplainerSpec
-from kserve.models.v1beta1_art_explainer_spec import V1beta1ARTExplainerSpec
-from kserve.models.v1beta1_alibi_explainer_spec import V1beta1AlibiExplainerSpec
-from kserve.models.v1beta1_batcher import V1beta1Batcher
-from kserve.models.v1beta1_component_extension_spec import V1beta1ComponentExtensionSpec
-from kserve.models.v1beta1_component_status_spec import V1beta1ComponentStatusSpec
-from kserve.models.v1beta1_custom_explainer import V1beta1CustomExplainer
-from kserve.models.v1beta1_custom_predictor import V1beta1CustomPredictor
-from kserve.models.v1beta1_custom_transformer import V1beta1CustomTransformer
-from kserve.models.v1beta1_deploy_config import V1beta1DeployConfig
-from kserve.models.v1beta1_explainer_config import V1beta1ExplainerConfig
-from kserve.models.v1beta1_explainer_extension_spec import V1beta1ExplainerExtensionSpec
-from kserve.models.v1beta1_explainer_spec import V1beta1ExplainerSpec
-from kserve.models.v1beta1_explainers_config import V1beta1ExplainersConfig
-from kserve.models.v1beta1_inference_service import V1beta1InferenceService
-from kserve.models.v1beta1_inference_service_list import V1beta1InferenceServiceList
-from kserve.models.v1beta1_inference_service_spec import V1beta1InferenceServiceSpec
-from kserve.models.v1beta1_inference_service_status import V1beta1InferenceServiceStatus
-from kserve.models.v1beta1_inference_services_config import V1beta1InferenceServicesConfig
-from kserve.models.v1beta1_ingress_config import V1beta1IngressConfig
-from kserve.models.v1beta1_light_gbm_spec import V1beta1LightGBMSpec
-from kserve.models.v1beta1_logger_spec import V1beta1LoggerSpec
-from kserve.models.v1beta1_model_format import V1beta1ModelFormat
-from kserve.models.v1beta1_model_spec import V1beta1ModelSpec
-from kserve.models.v1beta1_onnx_runtime_spec import V1beta1ONNXRuntimeSpec
-from kserve.models.v1beta1_pmml_spec import V1beta1PMMLSpec
-from kserve.models.v1beta1_paddle_server_spec import V1beta1PaddleServerSpec
-from kserve.models.v1beta1_pod_spec import V1beta1PodSpec
-from kserve.models.v1beta1_predictor_config import V1beta1PredictorConfig
-from kserve.models.v1beta1_predictor_extension_spec import V1beta1PredictorExtensionSpec
-from kserve.models.v1beta1_predictor_protocols import V1beta1PredictorProtocols
-from kserve.models.v1beta1_predictor_spec import V1beta1PredictorSpec
-from kserve.models.v1beta1_predictors_config import V1beta1PredictorsConfig
-from kserve.models.v1beta1_sk_learn_spec import V1beta1SKLearnSpec
-from kserve.models.v1beta1_tf_serving_spec import V1beta1TFServingSpec
-from kserve.models.v1beta1_torch_serve_spec import V1beta1TorchServeSpec
-from kserve.models.v1beta1_transformer_config import V1beta1TransformerConfig
-from kserve.models.v1beta1_transformer_spec import V1beta1TransformerSpec
-from kserve.models.v1beta1_transformers_config import V1beta1TransformersConfig
-from kserve.models.v1beta1_triton_spec import V1beta1TritonSpec
-from kserve.models.v1beta1_xg_boost_spec import V1beta1XGBoostSpec
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRS))
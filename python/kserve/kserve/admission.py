@@ -0,0 +1,109 @@
+# Copyright 2022 The KServe Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+from collections import deque
+from http import HTTPStatus
+from typing import Deque, Optional
+
+import tornado.web
+
+DEFAULT_MAX_QUEUE_SIZE = 0
+
+
+class AdmissionController:
+    """
+    AdmissionController bounds the requests a model processes concurrently to
+    max_in_flight. Further requests wait in a FIFO queue of up to max_queue_size
+    entries. Requests arriving when the queue is full are rejected right away with
+    429 Too Many Requests, requests which waited longer than queue_timeout_ms are
+    rejected with 503 Service Unavailable.
+
+        async with model.admission:
+            ...
+    """
+
+    def __init__(self, max_in_flight: int, max_queue_size: Optional[int] = DEFAULT_MAX_QUEUE_SIZE,
+                 queue_timeout_ms: Optional[int] = None, rejected=None):
+        if max_in_flight <= 0:
+            raise ValueError(f"max_in_flight must be positive, got {max_in_flight}")
+        self.max_in_flight = max_in_flight
+        self.max_queue_size = max_queue_size or 0
+        self.queue_timeout_ms = queue_timeout_ms
+        self.in_flight = 0
+        # optional counter the rejected requests are recorded on
+        self.rejected = rejected
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def queue_size(self) -> int:
+        return len(self._waiters)
+
+    @property
+    def overloaded(self) -> bool:
+        """Whether the queue is full, new requests are rejected. Without a queue all the
+        slots being busy is how a loaded model runs, so it is never reported as overloaded.
+        """
+        return self.max_queue_size > 0 and self.in_flight >= self.max_in_flight \
+            and len(self._waiters) >= self.max_queue_size
+
+    def _reject(self, status: HTTPStatus, reason: str):
+        if self.rejected is not None:
+            self.rejected.inc()
+        raise tornado.web.HTTPError(status_code=status, reason=reason)
+
+    async def acquire(self):
+        if self.in_flight < self.max_in_flight and not self._waiters:
+            self.in_flight += 1
+            return
+        if len(self._waiters) >= self.max_queue_size:
+            self._reject(HTTPStatus.TOO_MANY_REQUESTS,
+                         f"Too many requests, {self.in_flight} in flight and "
+                         f"{len(self._waiters)} queued")
+        waiter = asyncio.get_event_loop().create_future()
+        self._waiters.append(waiter)
+        timeout = self.queue_timeout_ms / 1000 if self.queue_timeout_ms else None
+        try:
+            # the slot is handed over by release(), in_flight is already counted for it
+            await asyncio.wait_for(asyncio.shield(waiter), timeout)
+        except asyncio.TimeoutError:
+            self._abandon(waiter)
+            self._reject(HTTPStatus.SERVICE_UNAVAILABLE,
+                         f"Request waited more than {self.queue_timeout_ms}ms in the queue")
+        except asyncio.CancelledError:
+            self._abandon(waiter)
+            raise
+
+    def _abandon(self, waiter: asyncio.Future):
+        if waiter.done() and not waiter.cancelled():
+            # the slot was handed over at the same time, pass it on
+            self.release()
+            return
+        waiter.cancel()
+        self._waiters.remove(waiter)
+
+    def release(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.release()
@@ -0,0 +1,266 @@
+# Copyright 2022 The KServe Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Offline batch scoring with the model server's Model implementations:
+
+    python -m kserve.batch --model_class sklearnserver.SKLearnModel --model_dir gs://bucket/model \
+        --input features.csv --output predictions.csv
+
+The model directory is downloaded once with Storage.download, each worker process
+then loads its own copy of the model. The input is read in chunks of --chunk_size
+rows, every chunk is run through the model as a {"instances": rows} request, so the
+predictions are the same as the ones of the served model, and the predictions are
+written in the format of the input. CSV and Parquet require pandas and pyarrow.
+"""
+
+import argparse
+import asyncio
+import importlib
+import json
+import logging
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Deque, Dict, Iterator, List, Optional, Type
+
+from kserve.model import Model
+from kserve.storage import Storage
+from kserve.utils import json_codec, utils
+
+DEFAULT_CHUNK_SIZE = 1024
+DEFAULT_MODEL_NAME = "model"
+FORMATS = ("csv", "parquet", "ndjson")
+# Chunks submitted ahead per worker, bounds the number of chunks held in memory
+CHUNKS_PER_WORKER = 2
+REPORT_INTERVAL_SECONDS = 10
+
+
+def load_model_class(path: str) -> Type[Model]:
+    """Imports a Model class given as module.Class or module:Class"""
+    module_name, _, class_name = path.replace(":", ".").rpartition(".")
+    if not module_name:
+        raise ValueError(f"Model class {path} must be given as module.Class")
+    model_class = getattr(importlib.import_module(module_name), class_name)
+    if not (isinstance(model_class, type) and issubclass(model_class, Model)):
+        raise ValueError(f"{path} is not a subclass of kserve.Model")
+    return model_class
+
+
+def infer_format(path: str) -> str:
+    extension = os.path.splitext(path)[1].lower().lstrip(".")
+    if extension in ("jsonl", "json"):
+        return "ndjson"
+    if extension in ("parquet", "pq"):
+        return "parquet"
+    if extension in FORMATS:
+        return extension
+    raise ValueError(f"Can't infer the format of {path}, set it with --format {'|'.join(FORMATS)}")
+
+
+def read_chunks(path: str, fmt: str, chunk_size: int) -> Iterator[List[Any]]:
+    """Yields the rows of the input in chunks of up to chunk_size instances"""
+    if fmt == "ndjson":
+        rows = []
+        with open(path, "rb") as f:
+            for line in f:
+                if line.strip():
+                    rows.append(json_codec.loads(line))
+                if len(rows) >= chunk_size:
+                    yield rows
+                    rows = []
+        if rows:
+            yield rows
+    elif fmt == "csv":
+        import pandas as pd
+        for frame in pd.read_csv(path, chunksize=chunk_size):
+            yield frame.values.tolist()
+    elif fmt == "parquet":
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas().values.tolist()
+    else:
+        raise ValueError(f"Unsupported format {fmt}")
+
+
+class PredictionWriter:
+    """Writes the predictions of each chunk to the output in the given format"""
+
+    def __init__(self, path: str, fmt: str):
+        self.path = path
+        self.fmt = fmt
+        self._file = open(path, "wb") if fmt == "ndjson" else None
+        self._parquet_writer = None
+        self._first = True
+
+    @staticmethod
+    def _frame(predictions: List[Any]):
+        import pandas as pd
+        if predictions and isinstance(predictions[0], (list, tuple)):
+            frame = pd.DataFrame(predictions)
+            frame.columns = [f"prediction_{i}" for i in range(len(frame.columns))]
+            return frame
+        return pd.DataFrame({"prediction": predictions})
+
+    def write(self, predictions: List[Any]):
+        if self.fmt == "ndjson":
+            self._file.write(b"".join(json_codec.dumps(p) + b"\n" for p in predictions))
+        elif self.fmt == "csv":
+            self._frame(predictions).to_csv(self.path, mode="w" if self._first else "a",
+                                            header=self._first, index=False)
+        elif self.fmt == "parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(self._frame(predictions), preserve_index=False)
+            if self._parquet_writer is None:
+                self._parquet_writer = pq.ParquetWriter(self.path, table.schema)
+            self._parquet_writer.write_table(table)
+        self._first = False
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+
+
+_worker_model: Optional[Model] = None
+_worker_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _init_worker(model_class: Type[Model], name: str, model_dir: str, model_kwargs: Dict):
+    global _worker_model, _worker_loop
+    _worker_model = model_class(name, model_dir, **model_kwargs)
+    _worker_model.load()
+    _worker_loop = asyncio.new_event_loop()
+
+
+def _predict_chunk(rows: List[Any]) -> List[Any]:
+    response = _worker_loop.run_until_complete(_worker_model({"instances": rows}))
+    predictions = response.get("predictions") if isinstance(response, dict) else None
+    if not isinstance(predictions, list) or len(predictions) != len(rows):
+        raise RuntimeError("Expected a response with one prediction per instance")
+    return predictions
+
+
+class _InlineExecutor:
+    """Runs chunks in the calling process, used with a single worker"""
+
+    def submit(self, fn, *args) -> Future:
+        future: Future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:  # pylint: disable=broad-except
+            future.set_exception(e)
+        return future
+
+    def shutdown(self):
+        pass
+
+
+def run(model_class: Type[Model], model_dir: str, input_path: str, output_path: str,
+        input_format: Optional[str] = None, output_format: Optional[str] = None,
+        model_name: str = DEFAULT_MODEL_NAME, model_kwargs: Optional[Dict] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE, workers: Optional[int] = None) -> Dict[str, float]:
+    """Scores the input file with the model and writes the predictions to the output file.
+    Returns the number of rows, the elapsed seconds and the rows per second.
+    """
+    input_format = input_format or infer_format(input_path)
+    output_format = output_format or input_format
+    workers = workers or utils.cpu_count()
+    local_dir = Storage.download(model_dir)
+    initargs = (model_class, model_name, local_dir, model_kwargs or {})
+    if workers > 1:
+        # spawn instead of fork, models like LightGBM are not fork-safe
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                       initializer=_init_worker, initargs=initargs)
+    else:
+        _init_worker(*initargs)
+        executor = _InlineExecutor()
+    logging.info("Scoring %s with %d workers", input_path, workers)
+
+    start = last_report = time.monotonic()
+    rows = 0
+    pending: Deque[Future] = deque()
+    writer = PredictionWriter(output_path, output_format)
+    try:
+        def write_next():
+            nonlocal rows, last_report
+            predictions = pending.popleft().result()
+            writer.write(predictions)
+            rows += len(predictions)
+            now = time.monotonic()
+            if now - last_report >= REPORT_INTERVAL_SECONDS:
+                logging.info("Scored %d rows, %.0f rows/sec", rows, rows / (now - start))
+                last_report = now
+
+        for chunk in read_chunks(input_path, input_format, chunk_size):
+            pending.append(executor.submit(_predict_chunk, chunk))
+            while len(pending) >= workers * CHUNKS_PER_WORKER:
+                write_next()
+        while pending:
+            write_next()
+    finally:
+        for future in pending:
+            future.cancel()
+        writer.close()
+        executor.shutdown()
+
+    elapsed = time.monotonic() - start
+    rows_per_second = rows / elapsed if elapsed > 0 else float(rows)
+    logging.info("Scored %d rows in %.2fs, %.0f rows/sec", rows, elapsed, rows_per_second)
+    return {"rows": rows, "seconds": elapsed, "rows_per_second": rows_per_second}
+
+
+def _parse_model_arg(value: str):
+    key, sep, raw = value.partition("=")
+    if not sep:
+        raise argparse.ArgumentTypeError(f"Model argument {value} must be given as key=value")
+    try:
+        return key, json.loads(raw)
+    except ValueError:
+        return key, raw
+
+
+parser = argparse.ArgumentParser(description="Scores a file offline with a kserve Model")
+parser.add_argument("--model_class", required=True,
+                    help="The Model class, e.g. sklearnserver.SKLearnModel.")
+parser.add_argument("--model_dir", required=True, help="A URI pointer to the model binary.")
+parser.add_argument("--model_name", default=DEFAULT_MODEL_NAME, help="The name of the model.")
+parser.add_argument("--model_arg", action="append", type=_parse_model_arg, default=[],
+                    help="Extra key=value arguments of the model constructor, e.g. nthread=1.")
+parser.add_argument("--input", required=True, help="The local CSV, Parquet or NDJSON input file.")
+parser.add_argument("--output", required=True, help="The file the predictions are written to.")
+parser.add_argument("--format", default=None, choices=FORMATS,
+                    help="The format of the input, inferred from its extension by default.")
+parser.add_argument("--output_format", default=None, choices=FORMATS,
+                    help="The format of the output, the input format by default.")
+parser.add_argument("--chunk_size", default=DEFAULT_CHUNK_SIZE, type=int,
+                    help="The number of rows per predict call.")
+parser.add_argument("--workers", default=None, type=int,
+                    help="The number of worker processes, each loads a copy of the model.")
+
+
+def main(argv: Optional[List[str]] = None):
+    logging.basicConfig(level=logging.INFO)
+    args = parser.parse_args(argv)
+    run(load_model_class(args.model_class), args.model_dir, args.input, args.output,
+        input_format=args.format, output_format=args.output_format, model_name=args.model_name,
+        model_kwargs=dict(args.model_arg), chunk_size=args.chunk_size, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
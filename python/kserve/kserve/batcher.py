@@ -0,0 +1,255 @@
+# Copyright 2022 The KServe Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import logging
+from collections import Counter
+from functools import reduce
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from kserve.errors import InferenceError
+
+DEFAULT_MAX_BATCH_SIZE = 32
+DEFAULT_MAX_LATENCY_MS = 5000
+
+INSTANCES_KEY = "instances"
+INPUTS_KEY = "inputs"
+PREDICTIONS_KEY = "predictions"
+OUTPUTS_KEY = "outputs"
+
+
+def _is_nested(data: List) -> bool:
+    if isinstance(data, np.ndarray):
+        return data.ndim > 1
+    return len(data) > 0 and isinstance(data[0], (list, np.ndarray))
+
+
+def _is_rows(data: Any) -> bool:
+    """Whether data can be split in rows, models may return NumPy arrays instead of lists"""
+    return isinstance(data, list) or (isinstance(data, np.ndarray) and data.ndim > 0)
+
+
+def _row_size(shape: List[int]) -> int:
+    return reduce(lambda x, y: x * y, shape[1:], 1)
+
+
+def batch_key(request: Any) -> Optional[Tuple]:
+    """Returns the key of the batch the request can be merged into,
+    or None if the request cannot be merged with other requests.
+    v1 requests are merged on "instances", v2 requests on the first
+    dimension of every tensor in "inputs".
+    """
+    if not isinstance(request, dict):
+        return None
+    if set(request.keys()) == {INSTANCES_KEY}:
+        if not isinstance(request[INSTANCES_KEY], list) or len(request[INSTANCES_KEY]) == 0:
+            return None
+        return (INSTANCES_KEY,)
+    if set(request.keys()) == {INPUTS_KEY}:
+        inputs = request[INPUTS_KEY]
+        if not isinstance(inputs, list) or len(inputs) == 0:
+            return None
+        key = [INPUTS_KEY]
+        rows = None
+        for tensor in inputs:
+            if not isinstance(tensor, dict) or \
+                    tensor.keys() - {"name", "shape", "datatype", "data"}:
+                return None
+            shape = tensor.get("shape")
+            data = tensor.get("data")
+            if not isinstance(shape, list) or len(shape) == 0 or not isinstance(data, list):
+                return None
+            if rows is not None and shape[0] != rows:
+                return None
+            rows = shape[0]
+            nested = _is_nested(data)
+            expected = rows if nested else rows * _row_size(shape)
+            if len(data) != expected:
+                return None
+            key.append((tensor.get("name"), tensor.get("datatype"), tuple(shape[1:]), nested))
+        return tuple(key)
+    return None
+
+
+def batch_rows(request: Dict) -> int:
+    if INSTANCES_KEY in request:
+        return len(request[INSTANCES_KEY])
+    return request[INPUTS_KEY][0]["shape"][0]
+
+
+def merge_requests(requests: List[Dict]) -> Dict:
+    """Concatenates requests sharing the same batch key into a single request."""
+    if INSTANCES_KEY in requests[0]:
+        instances = []
+        for request in requests:
+            instances.extend(request[INSTANCES_KEY])
+        return {INSTANCES_KEY: instances}
+
+    inputs = []
+    for i, tensor in enumerate(requests[0][INPUTS_KEY]):
+        data = []
+        rows = 0
+        for request in requests:
+            data.extend(request[INPUTS_KEY][i]["data"])
+            rows += request[INPUTS_KEY][i]["shape"][0]
+        merged = dict(tensor)
+        merged["shape"] = [rows] + list(tensor["shape"][1:])
+        merged["data"] = data
+        inputs.append(merged)
+    return {INPUTS_KEY: inputs}
+
+
+def split_response(response: Any, rows: List[int]) -> List[Dict]:
+    """Splits the response of a merged request back into one response per request.
+    Raises InferenceError when the response does not line up with the merged rows.
+    """
+    total = sum(rows)
+    if isinstance(response, dict) and set(response.keys()) == {PREDICTIONS_KEY}:
+        predictions = response[PREDICTIONS_KEY]
+        if not _is_rows(predictions) or len(predictions) != total:
+            got = len(predictions) if _is_rows(predictions) else repr(predictions)
+            raise InferenceError(f"Expected a list of {total} predictions from batched request, got {got}")
+        responses = []
+        start = 0
+        for n in rows:
+            responses.append({PREDICTIONS_KEY: predictions[start:start + n]})
+            start += n
+        return responses
+
+    if isinstance(response, dict) and isinstance(response.get(OUTPUTS_KEY), list):
+        responses = [{k: v for k, v in response.items() if k != OUTPUTS_KEY} for _ in rows]
+        for resp in responses:
+            resp[OUTPUTS_KEY] = []
+        for tensor in response[OUTPUTS_KEY]:
+            shape = tensor.get("shape")
+            data = tensor.get("data")
+            if not isinstance(shape, list) or len(shape) == 0 or shape[0] != total \
+                    or not _is_rows(data):
+                raise InferenceError(f"Output {tensor.get('name')} of batched request "
+                                     f"does not have {total} rows")
+            step = 1 if _is_nested(data) else _row_size(shape)
+            start = 0
+            for resp, n in zip(responses, rows):
+                part = dict(tensor)
+                part["shape"] = [n] + list(shape[1:])
+                part["data"] = data[start:start + n * step]
+                resp[OUTPUTS_KEY].append(part)
+                start += n * step
+        return responses
+
+    raise InferenceError("Unable to split response of batched request")
+
+
+class _Batch:
+    def __init__(self):
+        self.requests: List[Dict] = []
+        self.rows: List[int] = []
+        self.futures: List[asyncio.Future] = []
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+    @property
+    def size(self) -> int:
+        return sum(self.rows)
+
+
+class Batcher:
+    """
+    Batcher queues concurrent requests of a model and merges them into a single
+    predict call once max_batch_size rows are queued or the oldest request has
+    waited for max_latency_ms. Requests which cannot be merged are predicted on their own.
+    When the merged predict fails or its response can't be split, the requests of the
+    batch are predicted one by one, so that a bad request only fails itself.
+    """
+
+    def __init__(self, predict: Callable[[Dict], Awaitable[Dict]],
+                 max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+                 max_latency_ms: int = DEFAULT_MAX_LATENCY_MS,
+                 batch_size=None):
+        self.predict = predict
+        self.max_batch_size = max_batch_size if max_batch_size and max_batch_size > 0 \
+            else DEFAULT_MAX_BATCH_SIZE
+        self.max_latency_ms = max_latency_ms if max_latency_ms and max_latency_ms > 0 \
+            else DEFAULT_MAX_LATENCY_MS
+        # batch size (in rows) -> number of predict calls with that size
+        self.batch_sizes: Counter = Counter()
+        # optional histogram the batch sizes are also observed on
+        self.batch_size = batch_size
+        self._batches: Dict[Tuple, _Batch] = {}
+
+    async def submit(self, request: Any) -> Any:
+        key = batch_key(request)
+        if key is None:
+            self._observe(1)
+            return await self.predict(request)
+
+        loop = asyncio.get_event_loop()
+        future = loop.create_future()
+        batch = self._batches.get(key)
+        if batch is None:
+            batch = _Batch()
+            self._batches[key] = batch
+            batch.timer = loop.call_later(self.max_latency_ms / 1000, self._flush, key)
+        batch.requests.append(request)
+        batch.rows.append(batch_rows(request))
+        batch.futures.append(future)
+        if batch.size >= self.max_batch_size:
+            self._flush(key)
+        return await future
+
+    def _flush(self, key: Tuple):
+        batch = self._batches.pop(key, None)
+        if batch is None:
+            return
+        if batch.timer is not None:
+            batch.timer.cancel()
+        asyncio.ensure_future(self._run(batch))
+
+    def _observe(self, size: int):
+        self.batch_sizes[size] += 1
+        if self.batch_size is not None:
+            self.batch_size.observe(size)
+
+    async def _run(self, batch: _Batch):
+        self._observe(batch.size)
+        logging.debug("Running batch of %d requests with %d rows", len(batch.requests), batch.size)
+        if len(batch.requests) == 1:
+            await self._resolve(batch.futures[0], batch.requests[0])
+            return
+        try:
+            responses = split_response(await self.predict(merge_requests(batch.requests)), batch.rows)
+        except Exception as e:  # pylint: disable=broad-except
+            logging.warning("Batch of %d requests failed, falling back to unbatched predict: %s",
+                            len(batch.requests), e)
+            for future, request in zip(batch.futures, batch.requests):
+                await self._resolve(future, request)
+            return
+        for future, response in zip(batch.futures, responses):
+            if not future.done():
+                future.set_result(response)
+
+    async def _resolve(self, future: asyncio.Future, request: Dict):
+        try:
+            response = await self.predict(request)
+        except Exception as e:  # pylint: disable=broad-except
+            if not future.done():
+                future.set_exception(e)
+            return
+        if not future.done():
+            future.set_result(response)
+
+    def stats(self) -> Dict[int, int]:
+        """Returns the distribution of batch sizes as {rows: count}."""
+        return dict(sorted(self.batch_sizes.items()))
@@ -0,0 +1,157 @@
+# Copyright 2022 The KServe Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""
+On disk cache of the objects downloaded by Storage, shared by all the models and
+processes using the same cache directory and kept across restarts when it is on
+a persistent volume. An object is cached under the SHA-256 of its URI and version
+(ETag, generation), so that another version of the object is a miss. Hits are
+hard linked into the model directory, the entries are evicted least recently
+used first to keep the cache within its size.
+"""
+
+import contextlib
+import fcntl
+import hashlib
+import logging
+import os
+import shutil
+from typing import Callable, Optional
+
+from kserve import metrics
+
+CACHE_DIR_ENV = "STORAGE_CACHE_DIR"
+CACHE_SIZE_ENV = "STORAGE_CACHE_SIZE_MB"
+_DEFAULT_CACHE_SIZE_MB = 10240
+
+_OBJECTS = "objects"
+_LOCKS = "locks"
+_TMP_SUFFIX = ".tmp"
+
+
+@contextlib.contextmanager
+def _file_lock(path: str, blocking: bool = True):
+    """Holds an exclusive flock on the file, yields whether it was acquired"""
+    with open(path, "a") as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _link(src: str, dest: str):
+    if os.path.lexists(dest):
+        os.remove(dest)
+    try:
+        os.link(src, dest)
+    except OSError:
+        # the model directory is on another filesystem, a copy still saves the download
+        shutil.copyfile(src, dest)
+
+
+class DownloadCache:
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.join(directory, _OBJECTS), exist_ok=True)
+        os.makedirs(os.path.join(directory, _LOCKS), exist_ok=True)
+
+    @staticmethod
+    def from_env() -> Optional["DownloadCache"]:
+        """Returns the cache configured by STORAGE_CACHE_DIR and STORAGE_CACHE_SIZE_MB,
+        None if caching is disabled.
+        """
+        directory = os.getenv(CACHE_DIR_ENV)
+        if not directory:
+            return None
+        size_mb = float(os.getenv(CACHE_SIZE_ENV, _DEFAULT_CACHE_SIZE_MB))
+        return DownloadCache(directory, int(size_mb * 1024 * 1024))
+
+    def _entry(self, key: str):
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, _OBJECTS, digest), os.path.join(self.directory, _LOCKS, digest)
+
+    def fetch(self, key: str, dest_path: str, download: Callable[[str], None]) -> bool:
+        """Links the object cached under the key to dest_path, on a miss the object is
+        downloaded into the cache first by download(path). Concurrent fetches of a key,
+        from any process, download it once. Returns whether the object was cached.
+        """
+        path, lock = self._entry(key)
+        with _file_lock(lock):
+            if os.path.exists(path):
+                # the modification time is the recency of the entry, atime is often not updated
+                os.utime(path)
+                _link(path, dest_path)
+                size = os.path.getsize(path)
+                metrics.STORAGE_CACHE_REQUESTS.labels("hit").inc()
+                metrics.STORAGE_CACHE_SAVED_BYTES.inc(size)
+                logging.info("Download cache hit for %s, %d bytes", key, size)
+                return True
+            metrics.STORAGE_CACHE_REQUESTS.labels("miss").inc()
+            tmp_path = path + _TMP_SUFFIX
+            try:
+                download(tmp_path)
+                size = os.path.getsize(tmp_path)
+                if size > self.max_bytes:
+                    logging.info("%s of %d bytes doesn't fit in the download cache", key, size)
+                    os.replace(tmp_path, dest_path)
+                    return False
+                # read only, as a write through the hard link of a model would change the cached object
+                os.chmod(tmp_path, 0o444)
+                self._evict(size)
+                os.replace(tmp_path, path)
+            except BaseException:
+                if os.path.lexists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+            _link(path, dest_path)
+            return False
+
+    def _evict(self, needed: int):
+        """Removes the least recently used entries until the cache has room for needed
+        bytes. Entries being fetched are skipped, an entry still linked from a model
+        directory only frees its space once that directory is removed.
+        """
+        objects = os.path.join(self.directory, _OBJECTS)
+        with _file_lock(os.path.join(self.directory, "evict.lock")):
+            entries = []
+            for name in os.listdir(objects):
+                if "." in name:
+                    # objects being downloaded, by the cache or by the SDKs writing to a temporary file first
+                    continue
+                try:
+                    stat = os.stat(os.path.join(objects, name))
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, name))
+            total = sum(size for _, size, _ in entries)
+            for _, size, name in sorted(entries):
+                if total + needed <= self.max_bytes:
+                    break
+                with _file_lock(os.path.join(self.directory, _LOCKS, name), blocking=False) as locked:
+                    if not locked:
+                        continue
+                    try:
+                        os.remove(os.path.join(objects, name))
+                    except FileNotFoundError:
+                        continue
+                total -= size
+                metrics.STORAGE_CACHE_EVICTIONS.inc()
+                logging.info("Evicted %d bytes from the download cache", size)
@@ -0,0 +1,147 @@
+# Copyright 2022 The KServe Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from enum import Enum
+from typing import Any, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from kserve.utils import utils
+
+try:
+    from multiprocessing import resource_tracker, shared_memory
+except ImportError:  # Python < 3.8, arrays are pickled instead
+    resource_tracker = None
+    shared_memory = None
+
+# Arrays smaller than this are pickled, shared memory setup costs more than the copy.
+SHARED_MEMORY_MIN_BYTES = 1 << 16
+
+
+class ExecutionMode(Enum):
+    # Synchronous handlers run on the event loop
+    INLINE = "inline"
+    # Synchronous handlers run in a thread pool
+    THREAD = "thread"
+    # Synchronous handlers run in a pool of processes, each holding a copy of the model
+    PROCESS = "process"
+
+
+class _SharedArray(NamedTuple):
+    name: str
+    shape: Tuple
+    dtype: str
+
+
+def _share_arrays(obj: Any, blocks: List) -> Any:
+    """Replaces large NumPy arrays in a request or response by shared memory blocks."""
+    if isinstance(obj, np.ndarray):
+        if shared_memory is None or obj.nbytes < SHARED_MEMORY_MIN_BYTES or obj.dtype.hasobject:
+            return obj
+        shm = shared_memory.SharedMemory(create=True, size=obj.nbytes)
+        blocks.append(shm)
+        np.ndarray(obj.shape, dtype=obj.dtype, buffer=shm.buf)[...] = obj
+        return _SharedArray(shm.name, obj.shape, obj.dtype.str)
+    if isinstance(obj, dict):
+        return {k: _share_arrays(v, blocks) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_share_arrays(v, blocks) for v in obj]
+    return obj
+
+
+def _restore_arrays(obj: Any, blocks: List, copy: bool) -> Any:
+    if isinstance(obj, _SharedArray):
+        shm = shared_memory.SharedMemory(name=obj.name)
+        blocks.append(shm)
+        array = np.ndarray(obj.shape, dtype=np.dtype(obj.dtype), buffer=shm.buf)
+        return array.copy() if copy else array
+    if isinstance(obj, dict):
+        return {k: _restore_arrays(v, blocks, copy) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_restore_arrays(v, blocks, copy) for v in obj]
+    return obj
+
+
+def _close(blocks: List, unlink: bool = False):
+    for shm in blocks:
+        try:
+            shm.close()
+        except BufferError:
+            # the model kept a reference to the array, the mapping goes away with the process
+            pass
+        if unlink:
+            shm.unlink()
+
+
+_worker_model = None
+
+
+def _init_worker(model):
+    global _worker_model
+    _worker_model = model
+
+
+def _run_in_worker(method: str, request: Any) -> Any:
+    blocks: List = []
+    try:
+        response = getattr(_worker_model, method)(_restore_arrays(request, blocks, copy=False))
+        response_blocks: List = []
+        response = _share_arrays(response, response_blocks)
+        for shm in response_blocks:
+            # the blocks are unlinked by the parent once it has read the response
+            resource_tracker.unregister(shm._name, "shared_memory")  # pylint: disable=protected-access
+        _close(response_blocks)
+        return response
+    finally:
+        _close(blocks)
+
+
+async def run_in_process(executor: Executor, method: str, request: Any) -> Any:
+    """Runs the given model method in a worker of the process pool,
+    passing large arrays through shared memory.
+    """
+    blocks: List = []
+    try:
+        shared = _share_arrays(request, blocks)
+        response = await asyncio.get_event_loop().run_in_executor(
+            executor, _run_in_worker, method, shared)
+    finally:
+        _close(blocks, unlink=True)
+    response_blocks: List = []
+    try:
+        return _restore_arrays(response, response_blocks, copy=True)
+    finally:
+        _close(response_blocks, unlink=True)
+
+
+def create_executor(model, mode: ExecutionMode, max_workers: Optional[int]) -> Optional[Executor]:
+    """Creates the executor of a model. Returns None for the loop's default
+    executor, which ModelServer sizes with max_asyncio_workers.
+    """
+    if mode == ExecutionMode.THREAD:
+        if not max_workers:
+            return None
+        return ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=model.name)
+    if mode == ExecutionMode.PROCESS:
+        # spawn instead of fork, models like LightGBM are not fork-safe
+        max_workers = max_workers or utils.cpu_count()
+        logging.info("Starting %d worker processes for model %s", max_workers, model.name)
+        return ProcessPoolExecutor(max_workers=max_workers,
+                                   mp_context=multiprocessing.get_context("spawn"),
+                                   initializer=_init_worker, initargs=(model,))
+    return None
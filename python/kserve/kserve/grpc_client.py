@@ -0,0 +1,132 @@
+# Copyright 2022 The KServe Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import itertools
+import logging
+from enum import Enum
+from typing import TYPE_CHECKING, List, Optional, Tuple
+
+import grpc
+
+if TYPE_CHECKING:
+    from tritonclient.grpc import service_pb2_grpc
+
+DEFAULT_GRPC_PORT = 80
+DEFAULT_KEEPALIVE_TIMEOUT_MS = 20000
+
+
+class GRPCCompression(Enum):
+    NONE = "none"
+    GZIP = "gzip"
+    DEFLATE = "deflate"
+
+
+_COMPRESSION = {
+    GRPCCompression.NONE: grpc.Compression.NoCompression,
+    GRPCCompression.GZIP: grpc.Compression.Gzip,
+    GRPCCompression.DEFLATE: grpc.Compression.Deflate,
+}
+
+
+def channel_options(max_message_size: Optional[int] = None, keepalive_time_ms: Optional[int] = None,
+                    lb_policy: Optional[str] = None) -> List[Tuple[str, object]]:
+    """Returns the grpc channel arguments of the given settings, unset ones keep the grpc defaults"""
+    options: List[Tuple[str, object]] = []
+    if max_message_size:
+        options += [("grpc.max_send_message_length", max_message_size),
+                    ("grpc.max_receive_message_length", max_message_size)]
+    if keepalive_time_ms:
+        options += [("grpc.keepalive_time_ms", keepalive_time_ms),
+                    ("grpc.keepalive_timeout_ms", DEFAULT_KEEPALIVE_TIMEOUT_MS),
+                    ("grpc.keepalive_permit_without_calls", 1),
+                    ("grpc.http2.max_pings_without_data", 0)]
+    if lb_policy:
+        options.append(("grpc.lb_policy_name", lb_policy))
+    return options
+
+
+def endpoints(hosts: str) -> List[str]:
+    """Splits a comma separated list of predictor hosts, adding the default port if missing"""
+    result = []
+    for host in hosts.split(","):
+        host = host.strip()
+        if host:
+            result.append(host if ":" in host else f"{host}:{DEFAULT_GRPC_PORT}")
+    return result
+
+
+class GRPCChannelPool:
+    """
+    Pool of size channels to the predictor, each with its own HTTP/2 connection.
+    When several comma separated hosts are given the channels are spread across
+    them, stubs are handed out round-robin. A channel with the round_robin
+    lb_policy also balances across all addresses a host name resolves to.
+    """
+
+    def __init__(self, hosts: str, size: int = 1, options: Optional[List[Tuple[str, object]]] = None,
+                 compression: Optional[GRPCCompression] = None, ready=None, reconnects=None):
+        targets = endpoints(hosts)
+        if not targets:
+            raise ValueError(f"Invalid predictor host {hosts}")
+        size = max(size or 1, len(targets))
+        compression = _COMPRESSION[GRPCCompression(compression)] if compression else None
+        # channels of a pool must not share subchannels, or they would share a single connection
+        options = list(options or []) + [("grpc.use_local_subchannel_pool", 1)]
+        self.channels = [grpc.aio.insecure_channel(targets[i % len(targets)], options=options,
+                                                   compression=compression) for i in range(size)]
+        from tritonclient.grpc import service_pb2_grpc
+        self._stubs = itertools.cycle([service_pb2_grpc.GRPCInferenceServiceStub(channel)
+                                       for channel in self.channels])
+        # optional gauge of the ready channels and counter of reconnects
+        self._ready = ready
+        self._reconnects = reconnects
+        self._watchers: List[asyncio.Task] = []
+
+    def stub(self) -> "service_pb2_grpc.GRPCInferenceServiceStub":
+        if not self._watchers and (self._ready is not None or self._reconnects is not None):
+            self._watchers = [asyncio.ensure_future(self._watch(channel)) for channel in self.channels]
+        return next(self._stubs)
+
+    async def _watch(self, channel: grpc.aio.Channel):
+        state = channel.get_state(try_to_connect=True)
+        ready = connected = False
+        try:
+            while state != grpc.ChannelConnectivity.SHUTDOWN:
+                if (state == grpc.ChannelConnectivity.READY) != ready:
+                    ready = not ready
+                    if self._ready is not None and ready:
+                        self._ready.inc()
+                    elif self._ready is not None:
+                        self._ready.dec()
+                if state == grpc.ChannelConnectivity.READY:
+                    connected = True
+                elif state == grpc.ChannelConnectivity.CONNECTING and connected:
+                    logging.info("Reconnecting gRPC channel to %s", channel)
+                    if self._reconnects is not None:
+                        self._reconnects.inc()
+                await channel.wait_for_state_change(state)
+                state = channel.get_state()
+        except asyncio.CancelledError:
+            pass
+        finally:
+            if ready and self._ready is not None:
+                self._ready.dec()
+
+    async def close(self):
+        for watcher in self._watchers:
+            watcher.cancel()
+        await asyncio.gather(*self._watchers, return_exceptions=True)
+        self._watchers = []
+        await asyncio.gather(*[channel.close() for channel in self.channels])
@@ -0,0 +1,257 @@
+# Copyright 2022 The KServe Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import time
+from typing import Dict, List, Optional
+
+import grpc
+import numpy as np
+import tornado.web
+from tritonclient.grpc import service_pb2, service_pb2_grpc
+from tritonclient.utils import deserialize_bytes_tensor, triton_to_np_dtype
+
+from kserve.metrics import model_metrics, request_metrics
+from kserve.model import Model
+from kserve.model_repository import ModelRepository
+from kserve.utils import utils
+from kserve.utils.binary_data import to_raw_bytes, to_tensor
+
+# InferTensorContents field holding the data of each v2 datatype
+_CONTENTS_FIELDS = {
+    "BOOL": "bool_contents",
+    "INT8": "int_contents",
+    "INT16": "int_contents",
+    "INT32": "int_contents",
+    "INT64": "int64_contents",
+    "UINT8": "uint_contents",
+    "UINT16": "uint_contents",
+    "UINT32": "uint_contents",
+    "UINT64": "uint64_contents",
+    "FP32": "fp32_contents",
+    "FP64": "fp64_contents",
+    "BYTES": "bytes_contents",
+}
+
+
+def _infer_parameters(parameters) -> Dict:
+    return {key: getattr(value, value.WhichOneof("parameter_choice"))
+            for key, value in parameters.items()
+            if value.WhichOneof("parameter_choice") is not None}
+
+
+def decode_infer_request(request: service_pb2.ModelInferRequest) -> Dict:
+    """Decodes a ModelInferRequest into a v2 inference request dict whose tensor
+    data are NumPy arrays. raw_input_contents are wrapped with np.frombuffer
+    without copying or going through JSON.
+    """
+    inputs = []
+    for i, tensor in enumerate(request.inputs):
+        shape = list(tensor.shape)
+        if request.raw_input_contents:
+            raw = request.raw_input_contents[i]
+            if tensor.datatype == "BYTES":
+                data = deserialize_bytes_tensor(raw)
+            else:
+                data = np.frombuffer(raw, dtype=triton_to_np_dtype(tensor.datatype))
+        else:
+            field = _CONTENTS_FIELDS.get(tensor.datatype)
+            if field is None:
+                raise ValueError(f"Unsupported datatype {tensor.datatype} for input {tensor.name}")
+            if tensor.datatype == "BYTES":
+                data = np.array(list(getattr(tensor.contents, field)), dtype=np.object_)
+            else:
+                data = np.array(getattr(tensor.contents, field),
+                                dtype=triton_to_np_dtype(tensor.datatype))
+        infer_input = {
+            "name": tensor.name,
+            "shape": shape,
+            "datatype": tensor.datatype,
+            "data": data.reshape(shape),
+        }
+        if tensor.parameters:
+            infer_input["parameters"] = _infer_parameters(tensor.parameters)
+        inputs.append(infer_input)
+
+    infer_request = {"inputs": inputs}
+    if request.id:
+        infer_request["id"] = request.id
+    if request.parameters:
+        infer_request["parameters"] = _infer_parameters(request.parameters)
+    if request.outputs:
+        infer_request["outputs"] = [{"name": output.name} for output in request.outputs]
+    return infer_request
+
+
+def _encode_output(output: Dict, raw_output_contents: List[bytes]) \
+        -> service_pb2.ModelInferResponse.InferOutputTensor:
+    data, datatype = to_tensor(output["data"], output.get("datatype"))
+    if "shape" in output:
+        data = data.reshape(output["shape"])
+    raw_output_contents.append(to_raw_bytes(data, datatype))
+    return service_pb2.ModelInferResponse.InferOutputTensor(
+        name=output["name"], datatype=datatype, shape=list(data.shape))
+
+
+def encode_infer_response(model_name: str, response, request_id: str = "") \
+        -> service_pb2.ModelInferResponse:
+    """Encodes a model response into a ModelInferResponse. v2 responses are
+    encoded output by output, v1 {"predictions": ...} responses are returned
+    as a single "predictions" output. Tensor data is sent as raw_output_contents.
+    """
+    if isinstance(response, service_pb2.ModelInferResponse):
+        return response
+    if "outputs" in response:
+        outputs = response["outputs"]
+    elif "predictions" in response:
+        outputs = [{"name": "predictions", "data": response["predictions"]}]
+    else:
+        raise ValueError("Expected \"outputs\" or \"predictions\" in model response")
+
+    raw_output_contents: List[bytes] = []
+    encoded = [_encode_output(output, raw_output_contents) for output in outputs]
+    return service_pb2.ModelInferResponse(
+        model_name=response.get("model_name", model_name),
+        model_version=response.get("model_version", "") or "",
+        id=response.get("id", request_id) or "",
+        outputs=encoded,
+        raw_output_contents=raw_output_contents)
+
+
+# gRPC status of the HTTP errors raised by models and admission control
+_GRPC_STATUS_CODES = {
+    400: grpc.StatusCode.INVALID_ARGUMENT,
+    404: grpc.StatusCode.NOT_FOUND,
+    429: grpc.StatusCode.RESOURCE_EXHAUSTED,
+    503: grpc.StatusCode.UNAVAILABLE,
+}
+
+
+class InferenceServicer(service_pb2_grpc.GRPCInferenceServiceServicer):
+    """Serves the v2 GRPCInferenceService against a ModelRepository."""
+
+    def __init__(self, models: ModelRepository):
+        self.models = models
+
+    async def _get_model(self, name: str, context: grpc.aio.ServicerContext):
+        try:
+            model = await self.models.use_model(name)
+        except tornado.web.HTTPError as e:
+            await context.abort(_GRPC_STATUS_CODES.get(e.status_code, grpc.StatusCode.INTERNAL), e.reason)
+        except Exception as e:  # pylint: disable=broad-except
+            await context.abort(grpc.StatusCode.UNAVAILABLE, f"Failed to load model {name}: {e}")
+        if model is None:
+            await context.abort(grpc.StatusCode.NOT_FOUND,
+                                "Model with name %s does not exist." % name)
+        if not self.models.is_model_ready(name):
+            await context.abort(grpc.StatusCode.UNAVAILABLE,
+                                self.models.get_failure(name) or "Model with name %s is not ready." % name)
+        return model
+
+    async def ServerLive(self, request, context):
+        return service_pb2.ServerLiveResponse(live=True)
+
+    async def ServerReady(self, request, context):
+        ready = all(self.models.is_model_ready(name) and not self.models.is_model_overloaded(name)
+                    for name in self.models.get_models())
+        return service_pb2.ServerReadyResponse(ready=ready)
+
+    async def ModelReady(self, request, context):
+        if self.models.get_model(request.name) is None:
+            await context.abort(grpc.StatusCode.NOT_FOUND,
+                                "Model with name %s does not exist." % request.name)
+        ready = self.models.is_model_ready(request.name) and \
+            not self.models.is_model_overloaded(request.name)
+        return service_pb2.ModelReadyResponse(ready=ready)
+
+    async def ModelMetadata(self, request, context):
+        model = self.models.get_model(request.name)
+        if model is None:
+            await context.abort(grpc.StatusCode.NOT_FOUND,
+                                "Model with name %s does not exist." % request.name)
+        if utils.is_ray_serve_handle(model):
+            # only predict and explain are exposed by Ray Serve deployments
+            metadata = Model(request.name).metadata()
+        else:
+            metadata = model.metadata()
+        if request.version and request.version not in metadata["versions"]:
+            await context.abort(grpc.StatusCode.NOT_FOUND,
+                                "Model %s has no version %s." % (request.name, request.version))
+
+        def tensors(tensors: List[Dict]):
+            return [service_pb2.ModelMetadataResponse.TensorMetadata(
+                name=tensor["name"], datatype=tensor["datatype"], shape=tensor.get("shape", []))
+                for tensor in tensors]
+        return service_pb2.ModelMetadataResponse(
+            name=metadata["name"], versions=metadata["versions"], platform=metadata["platform"],
+            inputs=tensors(metadata["inputs"]), outputs=tensors(metadata["outputs"]))
+
+    async def ModelInfer(self, request, context):
+        model = await self._get_model(request.model_name, context)
+        start = time.perf_counter()
+        metrics = model_metrics(request.model_name)
+        metrics.request_size.observe(request.ByteSize())
+        metrics.in_flight.inc()
+        failed = True
+        try:
+            try:
+                body = decode_infer_request(request)
+            except ValueError as e:
+                await context.abort(grpc.StatusCode.INVALID_ARGUMENT, str(e))
+            metrics.stages["decode"].observe(time.perf_counter() - start)
+            try:
+                if not utils.is_ray_serve_handle(model):
+                    response = await model(body)
+                else:
+                    response = await model.remote(body)
+                encode_start = time.perf_counter()
+                response = encode_infer_response(request.model_name, response, request.id)
+                metrics.stages["encode"].observe(time.perf_counter() - encode_start)
+                metrics.response_size.observe(response.ByteSize())
+                failed = False
+                return response
+            except tornado.web.HTTPError as e:
+                await context.abort(_GRPC_STATUS_CODES.get(e.status_code, grpc.StatusCode.INTERNAL),
+                                    e.reason or str(e))
+            except Exception as e:  # pylint: disable=broad-except
+                logging.exception("Failed to run inference for model %s", request.model_name)
+                await context.abort(grpc.StatusCode.INTERNAL, str(e))
+        finally:
+            metrics.in_flight.dec()
+            totals = request_metrics(request.model_name, "grpc-v2")
+            totals.latency.observe(time.perf_counter() - start)
+            if failed:
+                totals.errors.inc()
+
+
+class GRPCServer:
+    def __init__(self, port: int, models: ModelRepository,
+                 options: Optional[List] = None):
+        self.port = port
+        self.models = models
+        self.options = options
+        self._server: Optional[grpc.aio.Server] = None
+
+    async def start(self) -> int:
+        self._server = grpc.aio.server(options=self.options)
+        service_pb2_grpc.add_GRPCInferenceServiceServicer_to_server(
+            InferenceServicer(self.models), self._server)
+        port = self._server.add_insecure_port(f"[::]:{self.port}")
+        logging.info("Listening on gRPC port %s", port)
+        await self._server.start()
+        return port
+
+    async def stop(self, grace: Optional[float] = None):
+        if self._server is not None:
+            await self._server.stop(grace)
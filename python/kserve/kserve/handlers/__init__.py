@@ -13,7 +13,9 @@
 # limitations under the License.
 
 from .base import NotFoundHandler  # noqa # pylint: disable=unused-import
-from .health import LivenessHandler, HealthHandler  # noqa # pylint: disable=unused-import
-from .model_management import LoadHandler, UnloadHandler, ListHandler  # noqa # pylint: disable=unused-import
+from .health import LivenessHandler, HealthHandler, ReadinessHandler  # noqa # pylint: disable=unused-import
+from .model_management import LoadHandler, UnloadHandler, ListHandler, RepositoryIndexHandler  # noqa # pylint: disable=unused-import
 from .explain import ExplainHandler  # noqa # pylint: disable=unused-import
 from .predict import PredictHandler  # noqa # pylint: disable=unused-import
+from .metrics import MetricsHandler  # noqa # pylint: disable=unused-import
+from .stream import InferStreamHandler  # noqa # pylint: disable=unused-import
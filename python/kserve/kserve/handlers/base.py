@@ -11,11 +11,15 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-from typing import Any
+import time
+from typing import Any, Optional
 
 import tornado.web
 from http import HTTPStatus
+from kserve.model import Model
+from kserve.metrics import ModelMetrics, model_metrics, request_metrics
 from kserve.model_repository import ModelRepository
+from kserve.utils import json_codec
 
 
 class BaseHandler(tornado.web.RequestHandler):
@@ -34,6 +38,14 @@ class BaseHandler(tornado.web.RequestHandler):
 
         self.write({"error": reason})
 
+    def write_json(self, response: Any):
+        """Writes the response encoded with the kserve JSON codec"""
+        self.set_header("Content-Type", "application/json; charset=UTF-8")
+        self.write(self.encode_json(response))
+
+    def encode_json(self, response: Any) -> bytes:
+        return json_codec.dumps(response)
+
 
 class NotFoundHandler(tornado.web.RequestHandler):
     def write_error(self, status_code: int, **kwargs: Any) -> None:
@@ -44,14 +56,74 @@ class NotFoundHandler(tornado.web.RequestHandler):
 class HTTPHandler(BaseHandler):
     def initialize(self, models: ModelRepository):
         self.models = models  # pylint:disable=attribute-defined-outside-init
+        self.model_name: Optional[str] = None  # pylint:disable=attribute-defined-outside-init
+        self.metrics: Optional[ModelMetrics] = None  # pylint:disable=attribute-defined-outside-init
+        self.request_size = 0  # pylint:disable=attribute-defined-outside-init
+        self.response_size = 0  # pylint:disable=attribute-defined-outside-init
+
+    @property
+    def protocol(self) -> str:
+        return "v2" if self.request.path.startswith("/v2/") else "v1"
+
+    def prepare(self):
+        # unknown models are not recorded, so that arbitrary paths don't create label sets
+        if not self.path_args:
+            return
+        if self.models.get_model(self.path_args[0]) is None and not self.models.is_model_evicted(self.path_args[0]):
+            return
+        self.model_name = self.path_args[0]  # pylint:disable=attribute-defined-outside-init
+        self.metrics = model_metrics(self.model_name)  # pylint:disable=attribute-defined-outside-init
+        # time the request spent between being read and its handler running on the loop
+        self.metrics.queue_latency.observe(self.request.request_time())
+        self.metrics.in_flight.inc()
+        self.request_size = len(self.request.body)  # pylint:disable=attribute-defined-outside-init
+
+    def observe_stage(self, stage: str, start: float):
+        """Records the time since start, a time.perf_counter() value, as the stage latency"""
+        if self.metrics is not None:
+            self.metrics.stages[stage].observe(time.perf_counter() - start)
+
+    def decode_json(self, body: bytes) -> Any:
+        start = time.perf_counter()
+        request = json_codec.loads(body)
+        self.observe_stage("decode", start)
+        return request
 
-    def get_model(self, name: str):
-        model = self.models.get_model(name)
+    def encode_json(self, response: Any) -> bytes:
+        start = time.perf_counter()
+        body = json_codec.dumps(response)
+        self.observe_stage("encode", start)
+        return body
+
+    def write(self, chunk):
+        if isinstance(chunk, (bytes, str)):
+            self.response_size += len(chunk)  # pylint:disable=attribute-defined-outside-init
+        super().write(chunk)
+
+    def on_finish(self):
+        if self.metrics is None:
+            return
+        self.metrics.in_flight.dec()
+        self.metrics.request_size.observe(self.request_size)
+        self.metrics.response_size.observe(self.response_size)
+        metrics = request_metrics(self.model_name, self.protocol)
+        metrics.latency.observe(self.request.request_time())
+        if self.get_status() >= 400:
+            metrics.errors.inc()
+
+    async def get_model(self, name: str):
+        model = await self.models.use_model(name)
         if model is None:
             raise tornado.web.HTTPError(
                 status_code=HTTPStatus.NOT_FOUND,
                 reason="Model with name %s does not exist." % name
             )
+        if isinstance(model, Model) and model.warming_up:
+            raise tornado.web.HTTPError(
+                status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+                reason="Model with name %s is warming up." % name
+            )
         if not self.models.is_model_ready(name):
-            model.load()
+            reason = self.models.get_failure(name) or "Model with name %s is not ready." % name
+            raise tornado.web.HTTPError(status_code=HTTPStatus.SERVICE_UNAVAILABLE, reason=reason)
         return model
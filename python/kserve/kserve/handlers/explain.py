@@ -12,30 +12,29 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import json
 from http import HTTPStatus
 
 import tornado.web
-from ray.serve.api import RayServeHandle
 
 from kserve.handlers.base import HTTPHandler
+from kserve.utils import json_codec, utils
 from kserve.model import ModelType
 
 
 class ExplainHandler(HTTPHandler):
     async def post(self, name: str):
         try:
-            body = json.loads(self.request.body)
-        except json.decoder.JSONDecodeError as e:
+            body = self.decode_json(self.request.body)
+        except json_codec.JSONDecodeError as e:
             raise tornado.web.HTTPError(
                 status_code=HTTPStatus.BAD_REQUEST,
                 reason="Unrecognized request format: %s" % e
             )
         # call model locally or remote model workers
-        model = self.get_model(name)
-        if not isinstance(model, RayServeHandle):
+        model = await self.get_model(name)
+        if not utils.is_ray_serve_handle(model):
             response = await model(body, model_type=ModelType.EXPLAINER)
         else:
             model_handle = model
             response = await model_handle.remote(body, model_type=ModelType.EXPLAINER)
-        self.write(response)
+        self.write_json(response)
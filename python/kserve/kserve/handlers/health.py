@@ -14,6 +14,7 @@
 
 import tornado.web
 from kserve.handlers.base import BaseHandler
+from kserve.model import Model
 from kserve.model_repository import ModelRepository
 
 
@@ -34,7 +35,22 @@ class HealthHandler(BaseHandler):
                 reason="Model with name %s does not exist." % name
             )
 
-        if self.models.is_model_ready(name):
+        if self.models.is_model_overloaded(name):
+            # report not ready while overloaded so that traffic is routed to other replicas
+            self.set_status(503)
+            self.write({
+                "name": name,
+                "ready": False,
+                "overloaded": True
+            })
+        elif isinstance(model, Model) and model.warming_up:
+            self.set_status(503)
+            self.write({
+                "name": name,
+                "ready": False,
+                "warming_up": True
+            })
+        elif self.models.is_model_ready(name):
             self.write({
                 "name": name,
                 "ready": True
@@ -45,3 +61,16 @@ class HealthHandler(BaseHandler):
                 "name": name,
                 "ready": False
             })
+
+
+class ReadinessHandler(BaseHandler):
+    def initialize(self, models: ModelRepository):
+        self.models = models  # pylint:disable=attribute-defined-outside-init
+
+    def get(self):
+        names = list(self.models.get_models())
+        ready = all(self.models.is_model_ready(name) and not self.models.is_model_overloaded(name)
+                    for name in names)
+        if not ready:
+            self.set_status(503)
+        self.write({"ready": ready})
@@ -0,0 +1,23 @@
+# Copyright 2022 The KServe Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from kserve import metrics
+from kserve.handlers.base import BaseHandler
+
+
+class MetricsHandler(BaseHandler):  # pylint:disable=too-few-public-methods
+    def get(self):
+        body, content_type = metrics.generate()
+        self.set_header("Content-Type", content_type)
+        self.write(body)
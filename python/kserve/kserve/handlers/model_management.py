@@ -13,22 +13,20 @@
 # limitations under the License.
 
 import sys
-import inspect
 import tornado.web
 from kserve.handlers.base import BaseHandler
 from kserve.model_repository import ModelRepository
 
 
 class LoadHandler(BaseHandler):
-    def initialize(self, models: ModelRepository):  # pylint:disable=attribute-defined-outside-init
+    def initialize(self, models: ModelRepository, control=None):  # pylint:disable=attribute-defined-outside-init
         self.models = models
+        # ControlChannel of the pre-fork worker mode, the load is applied in the other workers too
+        self.control = control
 
     async def post(self, name: str):
         try:
-            if inspect.iscoroutinefunction(self.models.load):
-                await self.models.load(name)
-            else:
-                self.models.load(name)
+            await self.models.reload_model(name)
         except Exception:
             ex_type, ex_value, ex_traceback = sys.exc_info()
             raise tornado.web.HTTPError(
@@ -40,19 +38,24 @@ class LoadHandler(BaseHandler):
         if not self.models.is_model_ready(name):
             raise tornado.web.HTTPError(
                 status_code=503,
-                reason=f"Model with name {name} is not ready."
+                reason=self.models.get_failure(name) or f"Model with name {name} is not ready."
             )
+        if self.control is not None:
+            self.control.broadcast("load", name)
         self.write({
             "name": name,
-            "load": True
+            "load": True,
+            "state": self.models.get_state(name).value
         })
 
 
 class UnloadHandler(BaseHandler):
-    def initialize(self, models: ModelRepository):  # pylint:disable=attribute-defined-outside-init
+    def initialize(self, models: ModelRepository, control=None):  # pylint:disable=attribute-defined-outside-init
         self.models = models
+        self.control = control
 
     def post(self, name: str):
+        self.models.clear_response_cache(name)
         try:
             self.models.unload(name)
         except KeyError:
@@ -60,12 +63,24 @@ class UnloadHandler(BaseHandler):
                 status_code=404,
                 reason="Model with name %s does not exist." % name
             )
+        if self.control is not None:
+            self.control.broadcast("unload", name)
         self.write({
             "name": name,
             "unload": True
         })
 
 
+class RepositoryIndexHandler(BaseHandler):
+    """Lists the models of the repository with their state, see ModelRepository.index"""
+    def initialize(self, models: ModelRepository):
+        self.models = models  # pylint:disable=attribute-defined-outside-init
+
+    def post(self):
+        # a list, which tornado's write doesn't encode
+        self.write_json(self.models.index())
+
+
 class ListHandler(BaseHandler):
     def initialize(self, models: ModelRepository):
         self.models = models  # pylint:disable=attribute-defined-outside-init
@@ -12,7 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import json
+import time
 from http import HTTPStatus
 
 import tornado.web
@@ -21,10 +21,13 @@ import cloudevents.exceptions as ce
 from cloudevents.http import CloudEvent, from_http
 from cloudevents.sdk.converters.util import has_binary_headers
 
-from ray.serve.api import RayServeHandle
 
 from kserve.handlers.base import HTTPHandler
+from kserve.utils import json_codec
+from kserve.utils import utils
 from kserve.utils.utils import is_structured_cloudevent, create_response_cloudevent
+from kserve.utils.binary_data import (INFERENCE_HEADER_CONTENT_LENGTH, binary_outputs,
+                                      decode_binary_request, encode_binary_response)
 
 
 class PredictHandler(HTTPHandler):
@@ -44,18 +47,33 @@ class PredictHandler(HTTPHandler):
                 reason="Cloud Event Exceptions: %s" % e
             )
 
+    def get_binary_request(self) -> dict:
+        try:
+            start = time.perf_counter()
+            header_length = int(self.request.headers[INFERENCE_HEADER_CONTENT_LENGTH])
+            request = decode_binary_request(self.request.body, header_length)
+            self.observe_stage("decode", start)
+            return request
+        except (ValueError, KeyError, TypeError) as e:
+            raise tornado.web.HTTPError(
+                status_code=HTTPStatus.BAD_REQUEST,
+                reason="Unrecognized binary request format: %s" % e
+            )
+
     async def post(self, name: str):
         is_cloudevent = False
         is_binary_cloudevent = False
 
-        if has_binary_headers(self.request.headers):
+        if INFERENCE_HEADER_CONTENT_LENGTH in self.request.headers:
+            body = self.get_binary_request()
+        elif has_binary_headers(self.request.headers):
             is_cloudevent = True
             is_binary_cloudevent = True
             body = self.get_binary_cloudevent()
         else:
             try:
-                body = json.loads(self.request.body)
-            except json.decoder.JSONDecodeError as e:
+                body = self.decode_json(self.request.body)
+            except json_codec.JSONDecodeError as e:
                 raise tornado.web.HTTPError(
                     status_code=HTTPStatus.BAD_REQUEST,
                     reason="Unrecognized request format: %s" % e
@@ -64,9 +82,11 @@ class PredictHandler(HTTPHandler):
             if is_structured_cloudevent(body):
                 is_cloudevent = True
 
+        all_binary_outputs, binary_output_names = binary_outputs(body)
+
         # call model locally or remote model workers
-        model = self.get_model(name)
-        if not isinstance(model, RayServeHandle):
+        model = await self.get_model(name)
+        if not utils.is_ray_serve_handle(model):
             response = await model(body)
         else:
             model_handle = model
@@ -83,5 +103,17 @@ class PredictHandler(HTTPHandler):
 
             for k, v in headers.items():
                 self.set_header(k, v)
-
-        self.write(response)
+        else:
+            start = time.perf_counter()
+            binary_response = encode_binary_response(response, all_binary_outputs,
+                                                     binary_output_names)
+            if binary_response is not None:
+                self.observe_stage("encode", start)
+                response, header_length = binary_response
+                self.set_header("Content-Type", "application/octet-stream")
+                self.set_header(INFERENCE_HEADER_CONTENT_LENGTH, header_length)
+
+        if isinstance(response, (bytes, str)):
+            self.write(response)
+        else:
+            self.write_json(response)
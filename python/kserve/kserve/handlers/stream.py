@@ -0,0 +1,136 @@
+# Copyright 2022 The KServe Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import logging
+import sys
+import time
+from collections import deque
+from http import HTTPStatus
+from typing import Any, Deque, List
+
+import numpy as np
+import tornado.web
+
+from kserve.handlers.base import HTTPHandler
+from kserve.utils import json_codec, utils
+
+DEFAULT_STREAM_BATCH_SIZE = 64
+# Batches predicted concurrently per stream, reading the body is paused beyond that
+MAX_PENDING_BATCHES = 2
+
+
+@tornado.web.stream_request_body
+class InferStreamHandler(HTTPHandler):
+    """
+    Streams newline delimited JSON instances through the model. Each line of the
+    request body is one instance, the instances are predicted in batches of
+    batch_size (query argument) and each prediction is written back as one line as
+    soon as its batch completes, in the order of the instances. Reading the body is
+    paused while MAX_PENDING_BATCHES are being predicted, so memory is bounded
+    regardless of the size of the stream.
+    """
+
+    async def prepare(self):
+        super().prepare()
+        self.model = await self.get_model(self.path_args[0])  # pylint:disable=attribute-defined-outside-init
+        try:
+            self.batch_size = int(self.get_query_argument("batch_size", DEFAULT_STREAM_BATCH_SIZE))
+        except ValueError as e:
+            raise tornado.web.HTTPError(status_code=HTTPStatus.BAD_REQUEST, reason=str(e))
+        if self.batch_size <= 0:
+            raise tornado.web.HTTPError(status_code=HTTPStatus.BAD_REQUEST,
+                                        reason="batch_size must be positive")
+        # the body is not buffered, max_buffer_size doesn't apply to it
+        self.request.connection.set_max_body_size(sys.maxsize)
+        self._partial = b""  # pylint:disable=attribute-defined-outside-init
+        self._rows: List[Any] = []  # pylint:disable=attribute-defined-outside-init
+        self._pending: Deque[asyncio.Future] = deque()  # pylint:disable=attribute-defined-outside-init
+        self._error = None  # pylint:disable=attribute-defined-outside-init
+        self.set_header("Content-Type", "application/x-ndjson")
+
+    async def data_received(self, chunk: bytes):
+        self.request_size += len(chunk)  # pylint:disable=attribute-defined-outside-init
+        if self._error is not None:
+            return
+        lines = (self._partial + chunk).split(b"\n")
+        self._partial = lines.pop()  # pylint:disable=attribute-defined-outside-init
+        try:
+            for line in lines:
+                await self._add_line(line)
+        except Exception as e:  # pylint: disable=broad-except
+            # raised from post(), errors of data_received would only close the connection
+            self._error = e  # pylint:disable=attribute-defined-outside-init
+            self._cancel_pending()
+
+    async def post(self, name: str):
+        try:
+            if self._error is not None:
+                raise self._error
+            await self._add_line(self._partial)
+            if self._rows:
+                await self._submit()
+            while self._pending:
+                await self._write_next()
+        except Exception as e:
+            self._cancel_pending()
+            if not self._headers_written:
+                raise
+            # the status line is sent already, report the error as the last line of the stream
+            reason = getattr(e, "reason", None) or str(e)
+            logging.error("Inference stream of model %s failed: %s", name, reason)
+            self.write(json_codec.dumps({"error": reason}) + b"\n")
+
+    async def _add_line(self, line: bytes):
+        if not line.strip():
+            return
+        try:
+            self._rows.append(json_codec.loads(line))
+        except json_codec.JSONDecodeError as e:
+            raise tornado.web.HTTPError(status_code=HTTPStatus.BAD_REQUEST,
+                                        reason="Unrecognized request format: %s" % e)
+        if len(self._rows) >= self.batch_size:
+            await self._submit()
+
+    async def _submit(self):
+        rows, self._rows = self._rows, []  # pylint:disable=attribute-defined-outside-init
+        self._pending.append(asyncio.ensure_future(self._predict(rows)))
+        while len(self._pending) >= MAX_PENDING_BATCHES:
+            await self._write_next()
+
+    async def _predict(self, rows: List[Any]) -> List[Any]:
+        body = {"instances": rows}
+        if utils.is_ray_serve_handle(self.model):
+            response = await self.model.remote(body)
+        else:
+            response = await self.model(body)
+        predictions = response.get("predictions") if isinstance(response, dict) else None
+        if not isinstance(predictions, (list, np.ndarray)) or np.ndim(predictions) == 0 \
+                or len(predictions) != len(rows):
+            raise tornado.web.HTTPError(
+                status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
+                reason="Expected a response with one prediction per instance for streaming")
+        return predictions
+
+    async def _write_next(self):
+        predictions = await self._pending.popleft()
+        start = time.perf_counter()
+        self.write(b"".join(json_codec.dumps(prediction) + b"\n" for prediction in predictions))
+        self.observe_stage("encode", start)
+        await self.flush()
+
+    def _cancel_pending(self):
+        for pending in self._pending:
+            pending.cancel()
+        self._pending.clear()
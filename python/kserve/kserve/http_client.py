@@ -0,0 +1,162 @@
+# Copyright 2022 The KServe Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Outbound HTTP clients used by Model to call the predictor and the explainer.
+Each client holds a pool of at most pool_size concurrent connections which are
+kept alive for idle_timeout seconds between requests.
+
+    tornado  Tornado's SimpleAsyncHTTPClient, bounds concurrency but opens a connection per
+             request, it doesn't keep connections alive and ignores idle_timeout
+    curl     Tornado's CurlAsyncHTTPClient, keep-alive connections through libcurl, requires pycurl
+    httpx    httpx.AsyncClient, keep-alive and optionally HTTP/2, requires httpx (httpx[http2])
+
+The default backend is the first of httpx and curl which is installed, tornado otherwise.
+"""
+
+import importlib.util
+import logging
+from enum import Enum
+from typing import Dict, NamedTuple, Optional
+
+from tornado.httpclient import AsyncHTTPClient
+
+DEFAULT_POOL_SIZE = 100
+DEFAULT_IDLE_TIMEOUT = 60
+
+
+class HTTPClientBackend(Enum):
+    TORNADO = "tornado"
+    CURL = "curl"
+    HTTPX = "httpx"
+
+
+class HTTPResponse(NamedTuple):
+    code: int
+    body: bytes
+
+
+class OutboundHTTPClient:
+    """Base class of the outbound clients, tracks the requests using the pool"""
+
+    def __init__(self, pool_size: int = DEFAULT_POOL_SIZE, idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+                 http2: bool = False, active=None, size=None):
+        self.pool_size = pool_size
+        self.idle_timeout = idle_timeout
+        self.http2 = http2
+        self.active = 0
+        # optional gauges of the requests in flight and of the pool size
+        self._active_gauge = active
+        if size is not None:
+            size.set(pool_size)
+
+    async def post(self, url: str, body: bytes, headers: Optional[Dict[str, str]] = None,
+                   timeout: Optional[float] = None) -> HTTPResponse:
+        self.active += 1
+        if self._active_gauge is not None:
+            self._active_gauge.inc()
+        try:
+            return await self._post(url, body, headers or {}, timeout)
+        finally:
+            self.active -= 1
+            if self._active_gauge is not None:
+                self._active_gauge.dec()
+
+    async def _post(self, url: str, body: bytes, headers: Dict[str, str],
+                    timeout: Optional[float]) -> HTTPResponse:
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class TornadoHTTPClient(OutboundHTTPClient):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._client = self._create_client()
+
+    def _create_client(self) -> AsyncHTTPClient:
+        return AsyncHTTPClient(force_instance=True, max_clients=self.pool_size)
+
+    async def _post(self, url, body, headers, timeout):
+        response = await self._client.fetch(url, method="POST", body=body, headers=headers,
+                                            request_timeout=timeout, raise_error=False)
+        if response.code == 599 and response.error is not None:
+            # no HTTP response, e.g. the connection failed or timed out
+            raise response.error
+        return HTTPResponse(response.code, response.body)
+
+    async def close(self):
+        self._client.close()
+
+
+class CurlHTTPClient(TornadoHTTPClient):
+    def _create_client(self) -> AsyncHTTPClient:
+        import pycurl
+        from tornado.curl_httpclient import CurlAsyncHTTPClient
+
+        def prepare_curl(curl):
+            # libcurl keeps connections alive, drop the ones idle for longer than idle_timeout
+            if hasattr(pycurl, "MAXAGE_CONN"):
+                curl.setopt(pycurl.MAXAGE_CONN, int(self.idle_timeout))
+            if self.http2:
+                curl.setopt(pycurl.HTTP_VERSION, pycurl.CURL_HTTP_VERSION_2_PRIOR_KNOWLEDGE)
+
+        return CurlAsyncHTTPClient(force_instance=True, max_clients=self.pool_size,
+                                   defaults={"prepare_curl_callback": prepare_curl})
+
+
+class HttpxHTTPClient(OutboundHTTPClient):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        import httpx
+        limits = httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size,
+                              keepalive_expiry=self.idle_timeout)
+        self._client = httpx.AsyncClient(limits=limits, http2=self.http2)
+
+    async def _post(self, url, body, headers, timeout):
+        response = await self._client.post(url, content=body, headers=headers, timeout=timeout)
+        return HTTPResponse(response.status_code, response.content)
+
+    async def close(self):
+        await self._client.aclose()
+
+
+_BACKENDS = {
+    HTTPClientBackend.TORNADO: TornadoHTTPClient,
+    HTTPClientBackend.CURL: CurlHTTPClient,
+    HTTPClientBackend.HTTPX: HttpxHTTPClient,
+}
+
+
+def default_backend() -> HTTPClientBackend:
+    """Returns the first backend keeping connections alive which is installed"""
+    if importlib.util.find_spec("httpx") is not None:
+        return HTTPClientBackend.HTTPX
+    if importlib.util.find_spec("pycurl") is not None:
+        return HTTPClientBackend.CURL
+    logging.warning("Neither httpx nor pycurl is installed, the tornado HTTP client opens a connection "
+                    "per request. Install kserve[httpx] for keep-alive connections.")
+    return HTTPClientBackend.TORNADO
+
+
+def create_http_client(backend: Optional[HTTPClientBackend] = None, pool_size: Optional[int] = None,
+                       idle_timeout: Optional[float] = None, http2: Optional[bool] = None,
+                       active=None, size=None) -> OutboundHTTPClient:
+    backend = HTTPClientBackend(backend) if backend else default_backend()
+    if http2 and backend == HTTPClientBackend.TORNADO:
+        logging.warning("The tornado HTTP client doesn't support HTTP/2, use the curl or httpx backend")
+    return _BACKENDS[backend](pool_size or DEFAULT_POOL_SIZE,
+                              DEFAULT_IDLE_TIMEOUT if idle_timeout is None else idle_timeout,
+                              bool(http2), active=active, size=size)
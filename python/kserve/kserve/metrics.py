@@ -0,0 +1,202 @@
+# Copyright 2022 The KServe Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Prometheus metrics of the model server. Label children are bound once per model
+(and protocol) and cached, so recording a request doesn't allocate label dicts.
+"""
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+from typing import Dict, Tuple
+
+PROMETHEUS_MULTIPROC_DIR = "PROMETHEUS_MULTIPROC_DIR"
+
+
+def _workers() -> int:
+    """The --workers of the model server, parsed here as well as the metrics are created on import"""
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument('--workers', default=1, type=int)
+    args, _ = parser.parse_known_args()
+    return args.workers
+
+
+# The prometheus client picks between per process and multiprocess values when it is
+# imported. Forked workers each write their samples to files in PROMETHEUS_MULTIPROC_DIR,
+# aggregated on scrape, so the directory has to be set before the import.
+if PROMETHEUS_MULTIPROC_DIR not in os.environ and _workers() != 1:
+    if "prometheus_client" in sys.modules:
+        logging.warning("prometheus_client was imported before kserve, the metrics of the workers are not "
+                        "aggregated unless %s is set", PROMETHEUS_MULTIPROC_DIR)
+    else:
+        os.environ[PROMETHEUS_MULTIPROC_DIR] = tempfile.mkdtemp(prefix="kserve_metrics_")
+
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter,  # noqa: E402
+                               Gauge, Histogram, generate_latest, multiprocess)
+
+LATENCY_BUCKETS = (.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+PAYLOAD_BUCKETS = tuple(float(1 << i) for i in range(6, 31, 2))
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+# Stages of a request, decode and encode are the JSON (de)serialization in the handlers.
+STAGES = ("decode", "preprocess", "predict", "explain", "postprocess", "encode")
+
+REQUEST_LATENCY = Histogram("kserve_request_duration_seconds",
+                            "End to end latency of inference requests handled by the server",
+                            ["model", "protocol"], buckets=LATENCY_BUCKETS)
+REQUEST_ERRORS = Counter("kserve_request_errors_total", "Inference requests which failed",
+                         ["model", "protocol"])
+REQUEST_QUEUE_LATENCY = Histogram("kserve_request_queue_duration_seconds",
+                                  "Time between a request being read and its handler running "
+                                  "on the event loop", ["model"], buckets=LATENCY_BUCKETS)
+REQUESTS_IN_FLIGHT = Gauge("kserve_requests_in_flight", "Inference requests being processed",
+                           ["model"], multiprocess_mode="livesum")
+PAYLOAD_SIZE = Histogram("kserve_payload_bytes", "Size of request and response bodies",
+                         ["model", "direction"], buckets=PAYLOAD_BUCKETS)
+STAGE_LATENCY = Histogram("kserve_stage_duration_seconds", "Latency of each stage of a request",
+                          ["model", "stage"], buckets=LATENCY_BUCKETS)
+OUTBOUND_LATENCY = Histogram("kserve_outbound_request_duration_seconds",
+                             "Latency of calls made to the predictor or explainer",
+                             ["model", "target", "protocol"], buckets=LATENCY_BUCKETS)
+REQUESTS_REJECTED = Counter("kserve_requests_rejected_total",
+                            "Requests rejected by admission control because the model is overloaded",
+                            ["model"])
+COALESCING_REQUESTS = Counter("kserve_coalescing_requests_total",
+                              "Requests of models coalescing identical concurrent requests", ["model"])
+COALESCED_REQUESTS = Counter("kserve_coalesced_requests_total",
+                             "Requests which shared the result of an identical request in flight", ["model"])
+CACHE_REQUESTS = Counter("kserve_response_cache_requests_total", "Response cache lookups by result",
+                         ["model", "result"])
+CACHE_EVICTIONS = Counter("kserve_response_cache_evictions_total",
+                          "Responses evicted from the response cache", ["model"])
+CACHE_BYTES = Gauge("kserve_response_cache_bytes", "Size of the responses held by the response cache",
+                    ["model"], multiprocess_mode="livesum")
+OUTBOUND_ACTIVE = Gauge("kserve_outbound_requests_active",
+                        "Requests in flight on the outbound HTTP connection pool",
+                        ["model", "target"], multiprocess_mode="livesum")
+OUTBOUND_POOL_SIZE = Gauge("kserve_outbound_pool_size", "Size of the outbound HTTP connection pool",
+                           ["model", "target"], multiprocess_mode="livesum")
+GRPC_CHANNELS_READY = Gauge("kserve_grpc_channels_ready", "gRPC channels to the predictor which are ready",
+                            ["model"], multiprocess_mode="livesum")
+GRPC_RECONNECTS = Counter("kserve_grpc_channel_reconnects_total",
+                          "Reconnects of gRPC channels to the predictor", ["model"])
+WARMUP_DURATION = Gauge("kserve_model_warmup_duration_seconds",
+                        "Duration of the last warmup of a model", ["model"], multiprocess_mode="max")
+MODEL_CACHE_REQUESTS = Counter("kserve_model_cache_requests_total",
+                               "Requests for a model by whether it was resident or had to be reloaded", ["result"])
+MODEL_EVICTIONS = Counter("kserve_model_evictions_total",
+                          "Models evicted from the repository to stay within its memory budget")
+MODEL_LOAD_LATENCY = Histogram("kserve_model_load_duration_seconds", "Latency of model loads by the repository",
+                               buckets=LATENCY_BUCKETS)
+MODEL_MEMORY = Gauge("kserve_model_repository_memory_bytes",
+                     "Resident memory measured for the models loaded by the repository", multiprocess_mode="livesum")
+STORAGE_CACHE_REQUESTS = Counter("kserve_storage_cache_requests_total",
+                                 "Objects requested from the download cache by result", ["result"])
+STORAGE_CACHE_SAVED_BYTES = Counter("kserve_storage_cache_saved_bytes_total",
+                                    "Bytes served by the download cache instead of being downloaded")
+STORAGE_CACHE_EVICTIONS = Counter("kserve_storage_cache_evictions_total",
+                                  "Objects evicted from the download cache to stay within its size")
+STORAGE_DOWNLOAD_RETRIES = Counter("kserve_storage_download_retries_total",
+                                   "Downloads retried or resumed after a transient failure or a checksum mismatch")
+STORAGE_RESUMED_BYTES = Counter("kserve_storage_resumed_bytes_total",
+                                "Bytes not downloaded again as interrupted downloads were resumed")
+BATCH_SIZE = Histogram("kserve_batch_size", "Number of instances per batched predict call",
+                       ["model"], buckets=BATCH_SIZE_BUCKETS)
+
+
+class ModelMetrics:
+    """Label children of the per model metrics"""
+    __slots__ = ("name", "queue_latency", "in_flight", "request_size", "response_size",
+                 "stages", "batch_size", "rejected", "coalescing", "coalesced", "cache_hits",
+                 "cache_misses", "cache_evictions", "cache_bytes", "grpc_channels_ready",
+                 "grpc_reconnects", "warmup", "_outbound")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.queue_latency = REQUEST_QUEUE_LATENCY.labels(name)
+        self.in_flight = REQUESTS_IN_FLIGHT.labels(name)
+        self.request_size = PAYLOAD_SIZE.labels(name, "request")
+        self.response_size = PAYLOAD_SIZE.labels(name, "response")
+        self.stages = {stage: STAGE_LATENCY.labels(name, stage) for stage in STAGES}
+        self.batch_size = BATCH_SIZE.labels(name)
+        self.rejected = REQUESTS_REJECTED.labels(name)
+        self.coalescing = COALESCING_REQUESTS.labels(name)
+        self.coalesced = COALESCED_REQUESTS.labels(name)
+        self.cache_hits = CACHE_REQUESTS.labels(name, "hit")
+        self.cache_misses = CACHE_REQUESTS.labels(name, "miss")
+        self.cache_evictions = CACHE_EVICTIONS.labels(name)
+        self.cache_bytes = CACHE_BYTES.labels(name)
+        self.grpc_channels_ready = GRPC_CHANNELS_READY.labels(name)
+        self.grpc_reconnects = GRPC_RECONNECTS.labels(name)
+        self.warmup = WARMUP_DURATION.labels(name)
+        self._outbound: Dict[Tuple[str, str], Histogram] = {}
+
+    def outbound(self, target: str, protocol: str) -> Histogram:
+        child = self._outbound.get((target, protocol))
+        if child is None:
+            child = OUTBOUND_LATENCY.labels(self.name, target, protocol)
+            self._outbound[(target, protocol)] = child
+        return child
+
+    def outbound_pool(self, target: str) -> Tuple[Gauge, Gauge]:
+        """Returns the gauges of the active requests and the size of the pool of a target"""
+        return OUTBOUND_ACTIVE.labels(self.name, target), OUTBOUND_POOL_SIZE.labels(self.name, target)
+
+
+class RequestMetrics:
+    """Label children of the per model and protocol request metrics"""
+    __slots__ = ("latency", "errors")
+
+    def __init__(self, name: str, protocol: str):
+        self.latency = REQUEST_LATENCY.labels(name, protocol)
+        self.errors = REQUEST_ERRORS.labels(name, protocol)
+
+
+_model_metrics: Dict[str, ModelMetrics] = {}
+_request_metrics: Dict[Tuple[str, str], RequestMetrics] = {}
+
+
+def model_metrics(name: str) -> ModelMetrics:
+    metrics = _model_metrics.get(name)
+    if metrics is None:
+        metrics = ModelMetrics(name)
+        _model_metrics[name] = metrics
+    return metrics
+
+
+def request_metrics(name: str, protocol: str) -> RequestMetrics:
+    metrics = _request_metrics.get((name, protocol))
+    if metrics is None:
+        metrics = RequestMetrics(name, protocol)
+        _request_metrics[(name, protocol)] = metrics
+    return metrics
+
+
+def mark_process_dead(pid: int):
+    """Drops the live gauges of an exited worker, called by the parent of the workers"""
+    if PROMETHEUS_MULTIPROC_DIR in os.environ:
+        multiprocess.mark_process_dead(pid)
+
+
+def generate() -> Tuple[bytes, str]:
+    """Returns the exposition of all metrics and its content type"""
+    if PROMETHEUS_MULTIPROC_DIR in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
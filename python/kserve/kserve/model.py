@@ -12,19 +12,34 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from typing import Dict, Union
+import copy
+import logging
 import sys
+from typing import TYPE_CHECKING, Dict, List, Optional, Union
+from concurrent.futures import Executor
+import asyncio
 import inspect
+import time
 import json
 import tornado.web
-from tornado.httpclient import AsyncHTTPClient
 from cloudevents.http import CloudEvent
 from http import HTTPStatus
 from enum import Enum
 from kserve.utils.utils import is_structured_cloudevent
-import grpc
-from tritonclient.grpc import InferResult, service_pb2_grpc
-from tritonclient.grpc.service_pb2 import ModelInferRequest, ModelInferResponse
+from kserve.utils import json_codec
+from kserve.admission import AdmissionController
+from kserve.batcher import Batcher
+from kserve.errors import InferenceError, ModelMissingError  # noqa: F401
+from kserve.executor import ExecutionMode, create_executor, run_in_process
+from kserve.grpc_client import GRPCChannelPool, GRPCCompression, channel_options
+from kserve.http_client import HTTPClientBackend, OutboundHTTPClient, create_http_client
+from kserve.metrics import ModelMetrics, model_metrics
+from kserve.response_cache import ResponseCache, request_key
+from kserve.single_flight import SingleFlight
+
+if TYPE_CHECKING:
+    from tritonclient.grpc import service_pb2_grpc
+    from tritonclient.grpc.service_pb2 import ModelInferRequest, ModelInferResponse
 
 
 PREDICTOR_URL_FORMAT = "http://{0}/v1/models/{1}:predict"
@@ -44,22 +59,6 @@ class PredictorProtocol(Enum):
     GRPC_V2 = "grpc-v2"
 
 
-class ModelMissingError(Exception):
-    def __init__(self, path):
-        self.path = path
-
-    def __str__(self):
-        return self.path
-
-
-class InferenceError(RuntimeError):
-    def __init__(self, reason):
-        self.reason = reason
-
-    def __str__(self):
-        return self.reason
-
-
 # Model is intended to be subclassed by various components within KServe.
 class Model:
     def __init__(self, name: str):
@@ -72,39 +71,250 @@ class Model:
         # We generally don't want things to time out at the request level here,
         # timeouts should be handled elsewhere in the system.
         self.timeout = 600
-        self._http_client_instance = None
-        self._grpc_client_stub = None
+        # Outbound HTTP clients per target (predictor, explainer), see create_http_client
+        self.http_client_backend: Optional[HTTPClientBackend] = None
+        self.http_pool_size: Optional[int] = None
+        self.http_idle_timeout: Optional[float] = None
+        self.http2: Optional[bool] = None
+        self._http_clients: Dict[str, OutboundHTTPClient] = {}
+        # Channels to a gRPC predictor, see GRPCChannelPool
+        self.grpc_channels: Optional[int] = None
+        self.grpc_max_message_size: Optional[int] = None
+        self.grpc_keepalive_time_ms: Optional[int] = None
+        self.grpc_compression: Optional[GRPCCompression] = None
+        self.grpc_lb_policy: Optional[str] = None
+        self._grpc_pool: Optional[GRPCChannelPool] = None
+        # Server side batching is enabled when max_batch_size is set,
+        # either on the model or by the ModelServer it is registered with.
+        self.max_batch_size = None
+        self.max_latency_ms = None
+        self._batcher = None
+        # Where synchronous preprocess/predict/explain/postprocess handlers run, see ExecutionMode.
+        # model_workers sizes the model's own thread or process pool.
+        self.execution_mode: Optional[ExecutionMode] = None
+        self.model_workers: Optional[int] = None
+        self._executor: Optional[Executor] = None
+        self._metrics: Optional[ModelMetrics] = None
+        # Responses are only cached for models which opt in by setting a ResponseCache,
+        # it is cleared when the model is loaded or unloaded through the repository API.
+        self.response_cache: Optional[ResponseCache] = None
+        # Concurrent identical requests share a single computation when coalesce_requests is set
+        self.coalesce_requests: Optional[bool] = None
+        self._single_flight: Optional[SingleFlight] = None
+        # Admission control is enabled when max_in_flight is set, requests beyond it wait
+        # in a queue of max_queue_size for at most queue_timeout_ms, see AdmissionController.
+        self.max_in_flight: Optional[int] = None
+        self.max_queue_size: Optional[int] = None
+        self.queue_timeout_ms: Optional[int] = None
+        self._admission: Optional[AdmissionController] = None
+        # Requests run warmup_iterations times by warmup() before the model reports ready,
+        # model servers load them from the warmup/ directory of the model, see warmup.load_requests.
+        self.warmup_requests: List[Dict] = []
+        self.warmup_iterations: Optional[int] = None
+        self.warmup_seconds: Optional[float] = None
+        self._warming_up = False
+        # v2 model metadata, see metadata(). The framework servers set the platform,
+        # models may describe their tensors as {"name": ..., "datatype": ..., "shape": [...]}.
+        self.platform = ""
+        self.versions: List[str] = []
+        self.input_metadata: List[Dict] = []
+        self.output_metadata: List[Dict] = []
+
+    def __getstate__(self):
+        # Clients, batcher, executor and cache are bound to the process which created them
+        state = self.__dict__.copy()
+        for key in ("_grpc_pool", "_batcher", "_executor", "_metrics",
+                    "response_cache", "_admission", "_single_flight"):
+            state[key] = None
+        state["_http_clients"] = {}
+        return state
 
     async def __call__(self, body, model_type: ModelType = ModelType.PREDICTOR):
-        request = await self.preprocess(body) if inspect.iscoroutinefunction(self.preprocess) \
-            else self.preprocess(body)
+        cache = self.response_cache
+        if cache is None and not self.coalesce_requests:
+            return await self._admit(body, model_type)
+        key = request_key(self.name, model_type.value, body)
+        if key is None:
+            return await self._admit(body, model_type)
+        if cache is not None:
+            if cache.metrics is None:
+                cache.metrics = self.metrics
+            response = cache.get(key)
+            if response is not None:
+                return response
+
+        async def compute():
+            response = await self._admit(body, model_type)
+            if cache is not None:
+                cache.put(key, response)
+            return response
+
+        if self.coalesce_requests:
+            return await self.single_flight.do(key, compute)
+        return await compute()
+
+    def metadata(self) -> Dict:
+        """Returns the v2 metadata of the model"""
+        return {"name": self.name, "versions": self.versions, "platform": self.platform,
+                "inputs": self.input_metadata, "outputs": self.output_metadata}
+
+    def memory_bytes(self) -> Optional[int]:
+        """
+        Returns the resident memory of the loaded model. A ModelRepository with a memory
+        budget measures it as the growth of the process RSS while the model loads otherwise.
+        :return: the memory of the model in bytes, None to have it measured
+        """
+        return None
+
+    @property
+    def warming_up(self) -> bool:
+        return self._warming_up
+
+    async def warmup(self) -> Optional[float]:
+        """
+        Runs the warmup requests through preprocess, predict and postprocess, bypassing
+        the response cache and admission control. The model isn't reported ready until
+        the warmup completes, a failed warmup is logged and doesn't keep it unready.
+        :return: the duration of the warmup in seconds, None if there are no warmup requests
+        """
+        if not self.warmup_requests or self._warming_up:
+            return None
+        self._warming_up = True
+        start = time.perf_counter()
+        try:
+            for _ in range(self.warmup_iterations or 1):
+                for request in self.warmup_requests:
+                    await self._call(copy.deepcopy(request), ModelType.PREDICTOR)
+        except Exception:  # pylint: disable=broad-except
+            logging.exception("Warmup of model %s failed", self.name)
+        finally:
+            self._warming_up = False
+        self.warmup_seconds = time.perf_counter() - start
+        self.metrics.warmup.set(self.warmup_seconds)
+        logging.info("Warmed up model %s with %d requests x %d in %.3fs", self.name,
+                     len(self.warmup_requests), self.warmup_iterations or 1, self.warmup_seconds)
+        return self.warmup_seconds
+
+    @property
+    def single_flight(self) -> SingleFlight:
+        if self._single_flight is None:
+            self._single_flight = SingleFlight(self.metrics.coalescing, self.metrics.coalesced)
+        return self._single_flight
+
+    async def _admit(self, body, model_type: ModelType):
+        admission = self.admission
+        if admission is None:
+            return await self._call(body, model_type)
+        async with admission:
+            return await self._call(body, model_type)
+
+    async def _call(self, body, model_type: ModelType):
+        stages = self.metrics.stages
+        start = time.perf_counter()
+        request = await self._run_handler("preprocess", body)
         request = self.validate(request)
+        preprocessed = time.perf_counter()
+        stages["preprocess"].observe(preprocessed - start)
         if model_type == ModelType.EXPLAINER:
-            response = (await self.explain(request)) if inspect.iscoroutinefunction(self.explain) \
-                else self.explain(request)
+            response = await self._run_handler("explain", request)
+            stage = stages["explain"]
         elif model_type == ModelType.PREDICTOR:
-            response = (await self.predict(request)) if inspect.iscoroutinefunction(self.predict) \
-                else self.predict(request)
+            response = (await self.batcher.submit(request)) if self.batcher is not None \
+                else (await self._predict(request))
+            stage = stages["predict"]
         else:
             raise NotImplementedError
-        response = self.postprocess(response)
+        predicted = time.perf_counter()
+        stage.observe(predicted - preprocessed)
+        if type(self).postprocess is Model.postprocess:
+            response = self.postprocess(response)
+        else:
+            response = await self._run_handler("postprocess", response)
+        stages["postprocess"].observe(time.perf_counter() - predicted)
         return response
 
     @property
-    def _http_client(self):
-        if self._http_client_instance is None:
-            self._http_client_instance = AsyncHTTPClient(max_clients=sys.maxsize)
-        return self._http_client_instance
+    def admission(self) -> Optional[AdmissionController]:
+        if self._admission is None and self.max_in_flight:
+            self._admission = AdmissionController(self.max_in_flight, self.max_queue_size,
+                                                  self.queue_timeout_ms, rejected=self.metrics.rejected)
+        return self._admission
+
+    @property
+    def overloaded(self) -> bool:
+        return self._admission is not None and self._admission.overloaded
+
+    @property
+    def metrics(self) -> ModelMetrics:
+        if self._metrics is None or self._metrics.name != self.name:
+            self._metrics = model_metrics(self.name)
+        return self._metrics
+
+    async def _predict(self, request):
+        return await self._run_handler("predict", request)
+
+    async def _run_handler(self, method: str, request):
+        handler = getattr(self, method)
+        if inspect.iscoroutinefunction(handler):
+            return await handler(request)
+        mode = ExecutionMode(self.execution_mode) if self.execution_mode else ExecutionMode.INLINE
+        if mode == ExecutionMode.INLINE:
+            return handler(request)
+        if mode == ExecutionMode.PROCESS:
+            return await run_in_process(self.executor, method, request)
+        return await asyncio.get_event_loop().run_in_executor(self.executor, handler, request)
+
+    @property
+    def executor(self) -> Optional[Executor]:
+        if self._executor is None and self.execution_mode:
+            self._executor = create_executor(self, ExecutionMode(self.execution_mode), self.model_workers)
+        return self._executor
+
+    def shutdown_executor(self):
+        """Stops the model's thread or process pool, e.g. before the model is reloaded"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
 
     @property
-    def _grpc_client(self):
-        if self._grpc_client_stub is None:
-            # requires appending ":80" to the predictor host for gRPC to work
-            if ":" not in self.predictor_host:
-                self.predictor_host = self.predictor_host + ":80"
-            _channel = grpc.aio.insecure_channel(self.predictor_host)
-            self._grpc_client_stub = service_pb2_grpc.GRPCInferenceServiceStub(_channel)
-        return self._grpc_client_stub
+    def batcher(self) -> Optional[Batcher]:
+        if self._batcher is None and self.max_batch_size:
+            self._batcher = Batcher(self._predict, self.max_batch_size, self.max_latency_ms,
+                                    batch_size=self.metrics.batch_size)
+        return self._batcher
+
+    def _http_client(self, target: str) -> OutboundHTTPClient:
+        client = self._http_clients.get(target)
+        if client is None:
+            active, size = self.metrics.outbound_pool(target)
+            client = create_http_client(self.http_client_backend, self.http_pool_size,
+                                        self.http_idle_timeout, self.http2, active=active, size=size)
+            self._http_clients[target] = client
+        return client
+
+    async def _http_post(self, target: str, url: str, request: Dict) -> Dict:
+        start = time.perf_counter()
+        response = await self._http_client(target).post(
+            url, json_codec.dumps(request), headers={'Content-Type': 'application/json'},
+            timeout=self.timeout)
+        self.metrics.outbound(target, self.protocol).observe(time.perf_counter() - start)
+        if response.code != 200:
+            raise tornado.web.HTTPError(
+                status_code=response.code,
+                reason=response.body.decode("utf-8", errors="replace"))
+        return json_codec.loads(response.body)
+
+    @property
+    def _grpc_client(self) -> "service_pb2_grpc.GRPCInferenceServiceStub":
+        if self._grpc_pool is None:
+            # predictor_host may list several comma separated hosts, ":80" is added if no port is given
+            options = channel_options(self.grpc_max_message_size, self.grpc_keepalive_time_ms,
+                                      self.grpc_lb_policy)
+            self._grpc_pool = GRPCChannelPool(self.predictor_host, self.grpc_channels or 1, options,
+                                              self.grpc_compression,
+                                              ready=self.metrics.grpc_channels_ready,
+                                              reconnects=self.metrics.grpc_reconnects)
+        return self._grpc_pool.stub()
 
     def validate(self, request):
         if self.protocol == PredictorProtocol.REST_V2:
@@ -130,7 +340,7 @@ class Model:
         self.ready = True
         return self.ready
 
-    async def preprocess(self, request: Union[Dict, CloudEvent]) -> Union[Dict, ModelInferRequest]:
+    async def preprocess(self, request: Union[Dict, CloudEvent]) -> Union[Dict, "ModelInferRequest"]:
         """
         The preprocess handler can be overridden for data or feature transformation.
         The default implementation decodes to Dict if it is a binary CloudEvent
@@ -163,13 +373,16 @@ class Model:
 
         return response
 
-    def postprocess(self, response: Union[Dict, ModelInferResponse]) -> Dict:
+    def postprocess(self, response: Union[Dict, "ModelInferResponse"]) -> Dict:
         """
         The postprocess handler can be overridden for inference response transformation
         :param response: Dict|ModelInferResponse passed from predict handler
         :return: Dict
         """
-        if isinstance(response, ModelInferResponse):
+        service_pb2 = sys.modules.get("tritonclient.grpc.service_pb2")
+        if service_pb2 is not None and isinstance(response, service_pb2.ModelInferResponse):
+            # only a grpc-v2 predictor returns protobuf responses, and it imported tritonclient
+            from tritonclient.grpc import InferResult
             response = InferResult(response)
             return response.get_response(as_json=True)
         return response
@@ -178,25 +391,15 @@ class Model:
         predict_url = PREDICTOR_URL_FORMAT.format(self.predictor_host, self.name)
         if self.protocol == PredictorProtocol.REST_V2.value:
             predict_url = PREDICTOR_V2_URL_FORMAT.format(self.predictor_host, self.name)
-        json_header = {'Content-Type': 'application/json'}
-        response = await self._http_client.fetch(
-            predict_url,
-            method='POST',
-            request_timeout=self.timeout,
-            headers=json_header,
-            body=json.dumps(request)
-        )
-        if response.code != 200:
-            raise tornado.web.HTTPError(
-                status_code=response.code,
-                reason=response.body)
-        return json.loads(response.body)
+        return await self._http_post("predictor", predict_url, request)
 
-    async def _grpc_predict(self, request: ModelInferRequest) -> ModelInferResponse:
+    async def _grpc_predict(self, request: "ModelInferRequest") -> "ModelInferResponse":
+        start = time.perf_counter()
         async_result = await self._grpc_client.ModelInfer(request=request, timeout=self.timeout)
+        self.metrics.outbound("predictor", self.protocol).observe(time.perf_counter() - start)
         return async_result
 
-    async def predict(self, request: Union[Dict, ModelInferRequest]) -> Union[Dict, ModelInferResponse]:
+    async def predict(self, request: Union[Dict, "ModelInferRequest"]) -> Union[Dict, "ModelInferResponse"]:
         """
         The predict handler can be overridden to implement the model inference.
         The default implementation makes a call to the predictor if predictor_host is specified
@@ -222,14 +425,4 @@ class Model:
         explain_url = EXPLAINER_URL_FORMAT.format(self.explainer_host, self.name)
         if self.protocol == PredictorProtocol.REST_V2.value:
             explain_url = EXPLAINER_V2_URL_FORMAT.format(self.explainer_host, self.name)
-        response = await self._http_client.fetch(
-            url=explain_url,
-            method='POST',
-            request_timeout=self.timeout,
-            body=json.dumps(request)
-        )
-        if response.code != 200:
-            raise tornado.web.HTTPError(
-                status_code=response.code,
-                reason=response.body)
-        return json.loads(response.body)
+        return await self._http_post("explainer", explain_url, request)
@@ -12,63 +12,408 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from typing import Dict, Optional, Union
-from kserve import Model
-from ray.serve.api import RayServeHandle
+import asyncio
+import contextlib
+import functools
+import inspect
+import logging
 import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent import futures
+from enum import Enum
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Union
+
+import psutil
+import tornado.ioloop
+import tornado.web
+
+from kserve import Model
+from kserve import metrics
+from kserve.utils import utils
+
+if TYPE_CHECKING:
+    from ray.serve.api import RayServeHandle
 
 MODEL_MOUNT_DIRS = "/mnt/models"
 
 
+class ModelState(Enum):
+    UNAVAILABLE = "UNAVAILABLE"
+    LOADING = "LOADING"
+    READY = "READY"
+    FAILED = "FAILED"
+
+
+def _rss() -> int:
+    return psutil.Process().memory_info().rss
+
+
+def _shutdown(model: Optional[Union[Model, "RayServeHandle"]]):
+    """Stops the executor of a model leaving the repository, its workers would hold it in memory"""
+    if isinstance(model, Model):
+        model.shutdown_executor()
+
+
 class ModelRepository:
     """
     Model repository interface, follows NVIDIA Triton's `model-repository`
     extension.
+
+    With a memory_budget the repository holds the models it loads in an LRU cache:
+    the resident memory of a model is the one reported by Model.memory_bytes, or is
+    measured as the growth of the process RSS while it loads, and once the measured
+    models exceed the budget the least recently used ones are evicted. The growth of
+    the RSS is only the model's own if no other load overlaps it, so with a budget
+    the loads run one at a time. An evicted model is reloaded with load_model
+    on its next request, see use_model. Models whose memory wasn't measured, like
+    the ones loaded before being registered with the ModelServer, are never evicted.
+
+    Loads through load and use_model run in the loop's executor, concurrent loads of a
+    model share a single one, and the state of each model is tracked, see ModelState.
+    A loaded model is warmed up before it is reported READY, see warmup.
     """
 
-    def __init__(self, models_dir: str = MODEL_MOUNT_DIRS):
-        self.models = {}
+    def __init__(self, models_dir: str = MODEL_MOUNT_DIRS, memory_budget: Optional[int] = None):
+        self.models = OrderedDict()
         self.models_dir = models_dir
+        self.memory_budget = memory_budget
+        # measured resident memory of the evictable models
+        self.model_memory: Dict[str, int] = {}
+        # memory of the evicted models when they were last resident
+        self._evicted: Dict[str, int] = {}
+        # RSS at the start of the loads in progress
+        self._loading: Dict[str, int] = {}
+        # serializes the loads measured against the memory budget
+        self._measure_lock = threading.RLock()
+        # requests for a model which is loading wait at most load_timeout_ms for it, 0 fails them fast
+        self.load_timeout_ms: Optional[int] = None
+        self._pending: Dict[str, asyncio.Future] = {}
+        # loads of load_models, which run in threads before the loop is started
+        self._startup: Dict[str, futures.Future] = {}
+        self._startup_order: List[str] = []
+        self._failures: Dict[str, str] = {}
+        # loop the models are warmed up on, set by start_warmup
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # load_model runs in executor threads and updates the models
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def load_models(self, workers: Optional[int] = None, wait: bool = True):
+        """
+        Loads the models of models_dir with load_model concurrently, in a pool of
+        workers threads. A model which fails to load is logged and reported FAILED,
+        the others still load. The models are kept in the order of their names.
+        :param workers: number of concurrent loads, defaults to the number of CPUs + 4 (at most 32).
+                        With a memory_budget the loads are measured one at a time, see track_load
+        :param wait: whether to wait for the loads, otherwise the models become ready one
+                     by one while the server starts and are reported LOADING until then
+        """
+        names = sorted(name for name in os.listdir(self.models_dir)
+                       if os.path.isdir(os.path.join(self.models_dir, name)))
+        if not names:
+            return
+        executor = futures.ThreadPoolExecutor(max_workers=workers or min(32, utils.cpu_count() + 4),
+                                              thread_name_prefix="load_models")
+        with self._lock:
+            self._startup_order = names
+            for name in names:
+                self._startup[name] = executor.submit(self._load_at_startup, name)
+        executor.shutdown(wait=wait)
 
-    def load_models(self):
-        for name in os.listdir(self.models_dir):
-            d = os.path.join(self.models_dir, name)
-            if os.path.isdir(d):
-                self.load_model(name)
+    def wait_for_loads(self):
+        """Waits for the loads started by load_models"""
+        futures.wait(list(self._startup.values()))
+
+    def _load_at_startup(self, name: str) -> bool:
+        try:
+            ready = self._load_tracked(name, functools.partial(self.load_model, name))
+            with self._lock:
+                loop = self._loop
+            if ready and loop is not None:
+                # the model stays LOADING until warmed up, the models loaded before the loop
+                # was set are warmed up by start_warmup
+                asyncio.run_coroutine_threadsafe(self.warmup(name), loop).result()
+            return ready
+        except Exception:  # pylint: disable=broad-except
+            logging.exception("Failed to load model %s", name)
+            return False
+        finally:
+            with self._lock:
+                del self._startup[name]
+                if not self._startup:
+                    # models were added in the order their loads completed
+                    for loaded in self._startup_order:
+                        if loaded in self.models:
+                            self.models.move_to_end(loaded)
 
     def set_models_dir(self, models_dir):  # used for unit tests
         self.models_dir = models_dir
 
-    def get_model(self, name: str) -> Optional[Union[Model, RayServeHandle]]:
+    def get_model(self, name: str) -> Optional[Union[Model, "RayServeHandle"]]:
         return self.models.get(name, None)
 
-    def get_models(self) -> Dict[str, Union[Model, RayServeHandle]]:
-        return self.models
+    def get_models(self) -> Dict[str, Union[Model, "RayServeHandle"]]:
+        """Returns a snapshot of the models, loads in executor threads keep updating them"""
+        with self._lock:
+            return OrderedDict(self.models)
+
+    async def use_model(self, name: str) -> Optional[Union[Model, "RayServeHandle"]]:
+        """Returns the model to serve a request with and marks it as most recently
+        used. A model which isn't ready or was evicted is loaded in the background,
+        the request waits for the load for at most load_timeout_ms.
+        """
+        with self._lock:
+            model = self.models.get(name, None)
+            if model is not None:
+                self.models.move_to_end(name)
+            # loads in other threads remove the model from _startup and _evicted as they complete
+            startup = self._startup.get(name)
+            evicted = self._evicted.get(name)
+        if model is not None:
+            self.hits += 1
+            metrics.MODEL_CACHE_REQUESTS.labels("hit").inc()
+            if not isinstance(model, Model) or model.ready:
+                return model
+            future = self._load_async(name, model.load)
+        elif name in self._pending:
+            future = self._pending[name]
+        elif startup is not None:
+            future = asyncio.wrap_future(startup)
+        elif evicted is not None:
+            self.misses += 1
+            metrics.MODEL_CACHE_REQUESTS.labels("miss").inc()
+            # make room for the model before loading it, assuming it takes as much memory as before
+            self.evict(evicted)
+            logging.info("Reloading evicted model %s", name)
+            future = self._load_async(name, functools.partial(self.load_model, name))
+        else:
+            return None
+        timeout = None if self.load_timeout_ms is None else self.load_timeout_ms / 1000
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            raise tornado.web.HTTPError(status_code=503, reason=f"Model with name {name} is loading.")
+        return self.models.get(name, None)
+
+    def _load_async(self, name: str, load: Callable[[], bool]) -> asyncio.Future:
+        future = self._pending.get(name)
+        if future is None:
+            future = asyncio.ensure_future(self._run_load(name, load))
+            # the load may fail with no request left waiting for it
+            future.add_done_callback(lambda f: f.cancelled() or f.exception())
+            self._pending[name] = future
+        return future
+
+    async def _run_load(self, name: str, load: Callable[[], bool]) -> bool:
+        try:
+            ready = await asyncio.get_event_loop().run_in_executor(None, self._load_tracked, name, load)
+            if ready:
+                await self.warmup(name)
+            return ready
+        finally:
+            del self._pending[name]
+
+    async def warmup(self, name: str):
+        """Runs the warmup requests of a loaded model, see Model.warmup"""
+        model = self.get_model(name)
+        if isinstance(model, Model):
+            await model.warmup()
+
+    def start_warmup(self):
+        """Warms up the loaded models on the current loop, called by the ModelServer in
+        each worker. Models whose load completes afterwards are warmed up by the load.
+        """
+        loop = asyncio.get_event_loop()
+        with self._lock:
+            self._loop = loop
+            names = list(self.models)
+        for name in names:
+            tornado.ioloop.IOLoop.current().spawn_callback(self.warmup, name)
+
+    def _load_tracked(self, name: str, load: Callable[[], bool]) -> bool:
+        """Runs a load, recording its memory and why it failed"""
+        with self._lock:
+            self._failures.pop(name, None)
+        try:
+            with self.track_load(name):
+                ready = load()
+        except Exception as e:
+            with self._lock:
+                self._failures[name] = f"{type(e).__name__}: {e}"
+            raise
+        if not ready:
+            with self._lock:
+                self._failures[name] = "Model is not ready after loading."
+        return ready
+
+    @contextlib.contextmanager
+    def track_load(self, name: str):
+        """Measures the memory of a model loaded by the block, update records it
+        when the model is added to the repository. With a memory budget the block
+        waits for the other measured loads, it shouldn't run on the event loop.
+        """
+        with self._lock:
+            nested = name in self._loading
+        if nested:
+            # nested in the tracking of the same load
+            yield
+            return
+        with self._measure_lock if self.memory_budget is not None else contextlib.nullcontext():
+            start = time.perf_counter()
+            start_rss = _rss()
+            with self._lock:
+                self._loading[name] = start_rss
+            try:
+                yield
+            finally:
+                with self._lock:
+                    self._loading.pop(name, None)
+                metrics.MODEL_LOAD_LATENCY.observe(time.perf_counter() - start)
+
+    def is_model_evicted(self, name: str) -> bool:
+        return name in self._evicted
+
+    def get_state(self, name: str) -> ModelState:
+        if name in self._pending or name in self._startup:
+            return ModelState.LOADING
+        model = self.get_model(name)
+        if isinstance(model, Model) and model.warming_up:
+            return ModelState.LOADING
+        if self.is_model_ready(name):
+            return ModelState.READY
+        if name in self._failures:
+            return ModelState.FAILED
+        return ModelState.UNAVAILABLE
+
+    def get_failure(self, name: str) -> Optional[str]:
+        """Returns why the last load of a model failed"""
+        return self._failures.get(name)
+
+    def index(self) -> List[Dict]:
+        """Returns the state of the models known to the repository, following the
+        repository index of the v2 model repository extension.
+        """
+        with self._lock:
+            names = set(self.models) | set(self._evicted) | set(self._pending) | set(self._startup) \
+                | set(self._failures)
+        index = []
+        for name in sorted(names):
+            entry = {"name": name, "state": self.get_state(name).value}
+            reason = self._failures.get(name)
+            if entry["state"] == ModelState.FAILED.value and reason is not None:
+                entry["reason"] = reason
+            index.append(entry)
+        return index
 
     def is_model_ready(self, name: str):
         model = self.get_model(name)
         if not model:
             return False
         if isinstance(model, Model):
-            return False if model is None else model.ready
+            # a model warming up isn't ready to take traffic yet
+            return model.ready and not model.warming_up
         else:
             # For Ray Serve, the models are guaranteed to be ready after deploying the model.
             return True
 
+    def is_model_overloaded(self, name: str) -> bool:
+        model = self.get_model(name)
+        return isinstance(model, Model) and model.overloaded
+
     def update(self, model: Model):
-        self.models[model.name] = model
+        with self._lock:
+            previous = self.models.get(model.name)
+            if previous is not model:
+                _shutdown(previous)
+            self.models[model.name] = model
+            self.models.move_to_end(model.name)
+            self._evicted.pop(model.name, None)
+            start_rss = self._loading.get(model.name)
+            if start_rss is not None:
+                memory = model.memory_bytes() if isinstance(model, Model) else None
+                self.model_memory[model.name] = max(_rss() - start_rss, 0) if memory is None else memory
+                self.evict(keep=model.name)
+            self._update_memory()
 
-    def update_handle(self, name: str, model_handle: RayServeHandle):
-        self.models[name] = model_handle
+    def update_handle(self, name: str, model_handle: "RayServeHandle"):
+        with self._lock:
+            self.models[name] = model_handle
 
-    def load(self, name: str) -> bool:
-        pass
+    def evict(self, needed: int = 0, keep: Optional[str] = None):
+        """Evicts the least recently used models until the measured models and needed
+        bytes fit in the memory budget, or no other model can be evicted.
+        """
+        if self.memory_budget is None:
+            return
+        with self._lock:
+            for name in list(self.models):
+                if sum(self.model_memory.values()) + needed <= self.memory_budget:
+                    break
+                if name == keep or name not in self.model_memory:
+                    continue
+                memory = self.model_memory.pop(name)
+                _shutdown(self.models.pop(name))
+                self._evicted[name] = memory
+                self.evictions += 1
+                metrics.MODEL_EVICTIONS.inc()
+                logging.info("Evicted model %s using %d bytes to stay within the memory budget of %d bytes",
+                             name, memory, self.memory_budget)
+            self._update_memory()
+
+    def _update_memory(self):
+        metrics.MODEL_MEMORY.set(sum(self.model_memory.values()))
+
+    def stats(self) -> Dict[str, int]:
+        return {"models": len(self.models), "evicted": len(self._evicted),
+                "memory_bytes": sum(self.model_memory.values()), "hits": self.hits,
+                "misses": self.misses, "evictions": self.evictions}
+
+    async def load(self, name: str) -> bool:
+        """Loads a model with load_model in the loop's executor, so that the server keeps
+        serving while it loads. Concurrent loads of the same model share a single load.
+        """
+        return await self._load_async(name, functools.partial(self.load_model, name))
 
     def load_model(self, name: str) -> bool:
         pass
 
-    def unload(self, name: str):
-        if name in self.models:
-            del self.models[name]
+    async def reload_model(self, name: str):
+        """Loads a model requested through the repository API, in this worker or in another
+        pre-fork worker. The cached responses of the previous model are dropped.
+        """
+        self.clear_response_cache(name)
+        if type(self).load is ModelRepository.load:
+            # tracked in the executor, the loop mustn't wait for the measured loads in progress
+            await self.load(name)
+        elif inspect.iscoroutinefunction(self.load):
+            with self.track_load(name):
+                await self.load(name)
         else:
-            raise KeyError(f"model {name} does not exist")
+            def load():
+                with self.track_load(name):
+                    self.load(name)
+            await asyncio.get_event_loop().run_in_executor(None, load)
+        # the repository may have replaced the model with a newly loaded one
+        self.clear_response_cache(name)
+
+    def clear_response_cache(self, name: str):
+        """Drops the cached responses of a model, they may not match a reloaded model"""
+        model = self.get_model(name)
+        if isinstance(model, Model) and model.response_cache is not None:
+            model.response_cache.clear()
+
+    def unload(self, name: str):
+        with self._lock:
+            if name in self.models:
+                _shutdown(self.models.pop(name))
+                self.model_memory.pop(name, None)
+                self._update_memory()
+            elif name in self._evicted:
+                del self._evicted[name]
+            elif name not in self._failures:
+                raise KeyError(f"model {name} does not exist")
+            self._failures.pop(name, None)
@@ -14,11 +14,15 @@
 
 import argparse
 import logging
-from typing import List, Optional, Dict, Union
+import os
+import tempfile
+from typing import TYPE_CHECKING, List, Optional, Dict, Union
 import tornado.ioloop
 import tornado.web
 import tornado.httpserver
 import tornado.log
+import tornado.netutil
+import tornado.process
 import asyncio
 from tornado import concurrent
 
@@ -26,9 +30,17 @@ from .utils import utils
 
 import kserve.handlers as handlers
 from kserve import Model
+from kserve import metrics
+from kserve import prefork
+from kserve.prefork import ControlChannel
 from kserve.model_repository import ModelRepository
-from ray.serve.api import Deployment, RayServeHandle
-from ray import serve
+from kserve.executor import ExecutionMode
+from kserve.grpc_client import GRPCCompression, channel_options
+from kserve.http_client import HTTPClientBackend
+
+if TYPE_CHECKING:
+    from ray.serve.api import Deployment, RayServeHandle
+    from kserve.grpc_server import GRPCServer
 
 DEFAULT_HTTP_PORT = 8080
 DEFAULT_GRPC_PORT = 8081
@@ -39,12 +51,71 @@ parser.add_argument('--http_port', default=DEFAULT_HTTP_PORT, type=int,
                     help='The HTTP Port listened to by the model server.')
 parser.add_argument('--grpc_port', default=DEFAULT_GRPC_PORT, type=int,
                     help='The GRPC Port listened to by the model server.')
+parser.add_argument('--enable_grpc', default=True, type=lambda x: str(x).lower() == 'true',
+                    help='Serve the v2 gRPC inference protocol on the GRPC port.')
 parser.add_argument('--max_buffer_size', default=DEFAULT_MAX_BUFFER_SIZE, type=int,
                     help='The max buffer size for tornado.')
 parser.add_argument('--workers', default=1, type=int,
                     help='The number of works to fork')
+parser.add_argument('--prefork', default=False, type=lambda x: str(x).lower() == 'true',
+                    help='Load the models before forking the workers so that they share the model memory, '
+                         'each worker listens on its own SO_REUSEPORT socket and is pinned to a CPU.')
+parser.add_argument('--warmup_iterations', default=1, type=int,
+                    help='The number of times the warmup requests bundled in the warmup/ directory of a model '
+                         'are run before the model reports ready.')
+parser.add_argument('--model_memory_budget_mb', default=None, type=int,
+                    help='The memory budget of the models loaded by the model repository, least recently '
+                         'used models are evicted to stay within it and reloaded on their next request.')
+parser.add_argument('--model_load_timeout_ms', default=None, type=int,
+                    help='How long requests for a model which is loading wait for it before failing with 503, '
+                         'by default they wait until it is loaded, 0 fails them immediately.')
+parser.add_argument('--model_load_workers', default=None, type=int,
+                    help='The number of models of the model repository loaded concurrently at startup.')
+parser.add_argument('--load_models_in_background', default=False, type=lambda x: str(x).lower() == 'true',
+                    help='Start serving while the models of the model repository are loading, '
+                         'each model reports ready once it is loaded.')
 parser.add_argument('--max_asyncio_workers', default=None, type=int,
                     help='Max number of asyncio workers to spawn')
+parser.add_argument('--execution_mode', default=None, choices=[m.value for m in ExecutionMode],
+                    help='Where synchronous model handlers run: on the event loop (inline), '
+                         'in a thread pool (thread) or in a process pool (process).')
+parser.add_argument('--model_workers', default=None, type=int,
+                    help='The number of threads or processes per model for the thread and process '
+                         'execution modes.')
+parser.add_argument('--max_batch_size', default=None, type=int,
+                    help='Enable server side batching with up to this many instances per batch.')
+parser.add_argument('--max_latency_ms', default=None, type=int,
+                    help='The max time in milliseconds a request waits for a batch to fill up.')
+parser.add_argument('--max_in_flight', default=None, type=int,
+                    help='Enable admission control with up to this many requests processed '
+                         'concurrently per model.')
+parser.add_argument('--max_queue_size', default=None, type=int,
+                    help='The max number of requests per model waiting for admission, '
+                         'further requests are rejected with 429.')
+parser.add_argument('--queue_timeout_ms', default=None, type=int,
+                    help='Requests waiting longer than this for admission are rejected with 503.')
+parser.add_argument('--coalesce_requests', default=None, type=lambda x: str(x).lower() == 'true',
+                    help='Let concurrent identical requests to a model share a single computation.')
+parser.add_argument('--http_client_backend', default=None, choices=[b.value for b in HTTPClientBackend],
+                    help='The HTTP client models use to call the predictor and explainer. Defaults to httpx or '
+                         'curl if installed, the tornado client does not keep connections alive.')
+parser.add_argument('--http_pool_size', default=None, type=int,
+                    help='The max number of concurrent connections to the predictor and to the explainer.')
+parser.add_argument('--http_idle_timeout', default=None, type=float,
+                    help='The seconds idle connections to the predictor and explainer are kept alive.')
+parser.add_argument('--http2', default=None, type=lambda x: str(x).lower() == 'true',
+                    help='Call the predictor and explainer over HTTP/2, requires the curl or httpx client.')
+parser.add_argument('--grpc_channels', default=None, type=int,
+                    help='The number of gRPC channels, each with its own connection, to the predictor.')
+parser.add_argument('--grpc_max_message_size', default=None, type=int,
+                    help='The max size in bytes of gRPC messages sent and received, '
+                         'for the predictor channels and the gRPC server.')
+parser.add_argument('--grpc_keepalive_time_ms', default=None, type=int,
+                    help='The interval of keepalive pings on idle gRPC channels to the predictor.')
+parser.add_argument('--grpc_compression', default=None, choices=[c.value for c in GRPCCompression],
+                    help='The compression of gRPC requests to the predictor.')
+parser.add_argument('--grpc_lb_policy', default=None, choices=['pick_first', 'round_robin'],
+                    help='The load balancing policy across the addresses of the predictor host.')
 
 args, _ = parser.parse_known_args()
 
@@ -57,20 +128,72 @@ class ModelServer:
                  max_buffer_size: int = args.max_buffer_size,
                  workers: int = args.workers,
                  max_asyncio_workers: int = args.max_asyncio_workers,
-                 registered_models: ModelRepository = ModelRepository()):
+                 max_batch_size: Optional[int] = args.max_batch_size,
+                 max_latency_ms: Optional[int] = args.max_latency_ms,
+                 registered_models: ModelRepository = ModelRepository(),
+                 enable_grpc: bool = args.enable_grpc,
+                 execution_mode: Optional[str] = args.execution_mode,
+                 model_workers: Optional[int] = args.model_workers,
+                 max_in_flight: Optional[int] = args.max_in_flight,
+                 max_queue_size: Optional[int] = args.max_queue_size,
+                 queue_timeout_ms: Optional[int] = args.queue_timeout_ms,
+                 coalesce_requests: Optional[bool] = args.coalesce_requests,
+                 http_client_backend: Optional[str] = args.http_client_backend,
+                 http_pool_size: Optional[int] = args.http_pool_size,
+                 http_idle_timeout: Optional[float] = args.http_idle_timeout,
+                 http2: Optional[bool] = args.http2,
+                 grpc_channels: Optional[int] = args.grpc_channels,
+                 grpc_max_message_size: Optional[int] = args.grpc_max_message_size,
+                 grpc_keepalive_time_ms: Optional[int] = args.grpc_keepalive_time_ms,
+                 grpc_compression: Optional[str] = args.grpc_compression,
+                 grpc_lb_policy: Optional[str] = args.grpc_lb_policy,
+                 prefork: bool = args.prefork,
+                 warmup_iterations: int = args.warmup_iterations,
+                 model_memory_budget_mb: Optional[int] = args.model_memory_budget_mb,
+                 model_load_timeout_ms: Optional[int] = args.model_load_timeout_ms):
         self.registered_models = registered_models
+        if model_memory_budget_mb is not None and registered_models.memory_budget is None:
+            registered_models.memory_budget = model_memory_budget_mb << 20
+            registered_models.evict()
+        if model_load_timeout_ms is not None and registered_models.load_timeout_ms is None:
+            registered_models.load_timeout_ms = model_load_timeout_ms
         self.http_port = http_port
         self.grpc_port = grpc_port
         self.max_buffer_size = max_buffer_size
         self.workers = workers
         self.max_asyncio_workers = max_asyncio_workers
+        self.max_batch_size = max_batch_size
+        self.max_latency_ms = max_latency_ms
+        self.enable_grpc = enable_grpc
+        self.execution_mode = ExecutionMode(execution_mode) if execution_mode else None
+        self.model_workers = model_workers
+        self.max_in_flight = max_in_flight
+        self.max_queue_size = max_queue_size
+        self.queue_timeout_ms = queue_timeout_ms
+        self.coalesce_requests = coalesce_requests
+        self.http_client_backend = HTTPClientBackend(http_client_backend) if http_client_backend else None
+        self.http_pool_size = http_pool_size
+        self.http_idle_timeout = http_idle_timeout
+        self.http2 = http2
+        self.grpc_channels = grpc_channels
+        self.grpc_max_message_size = grpc_max_message_size
+        self.grpc_keepalive_time_ms = grpc_keepalive_time_ms
+        self.grpc_compression = GRPCCompression(grpc_compression) if grpc_compression else None
+        self.grpc_lb_policy = grpc_lb_policy
+        self.prefork = prefork
+        self.warmup_iterations = warmup_iterations
+        self._control: Optional[ControlChannel] = None
         self._http_server: Optional[tornado.httpserver.HTTPServer] = None
+        self._grpc_server: Optional["GRPCServer"] = None
 
     def create_application(self):
         return tornado.web.Application([
             # Server Liveness API returns 200 if server is alive.
             (r"/", handlers.LivenessHandler),
             (r"/v2/health/live", handlers.LivenessHandler),
+            (r"/v2/health/ready",
+             handlers.ReadinessHandler, dict(models=self.registered_models)),
+            (r"/metrics", handlers.MetricsHandler),
             (r"/v1/models",
              handlers.ListHandler, dict(models=self.registered_models)),
             (r"/v2/models",
@@ -84,17 +207,26 @@ class ModelServer:
              handlers.PredictHandler, dict(models=self.registered_models)),
             (r"/v2/models/([a-zA-Z0-9_-]+)/infer",
              handlers.PredictHandler, dict(models=self.registered_models)),
+            (r"/v2/models/([a-zA-Z0-9_-]+)/infer_stream",
+             handlers.InferStreamHandler, dict(models=self.registered_models)),
             (r"/v1/models/([a-zA-Z0-9_-]+):explain",
              handlers.ExplainHandler, dict(models=self.registered_models)),
             (r"/v2/models/([a-zA-Z0-9_-]+)/explain",
              handlers.ExplainHandler, dict(models=self.registered_models)),
             (r"/v2/repository/models/([a-zA-Z0-9_-]+)/load",
-             handlers.LoadHandler, dict(models=self.registered_models)),
+             handlers.LoadHandler, dict(models=self.registered_models, control=self._control)),
             (r"/v2/repository/models/([a-zA-Z0-9_-]+)/unload",
-             handlers.UnloadHandler, dict(models=self.registered_models)),
+             handlers.UnloadHandler, dict(models=self.registered_models, control=self._control)),
+            (r"/v2/repository/index",
+             handlers.RepositoryIndexHandler, dict(models=self.registered_models)),
         ], default_handler_class=handlers.NotFoundHandler)
 
-    def start(self, models: Union[List[Model], Dict[str, Deployment]], nest_asyncio: bool = False):
+    def start(self, models: Union[List[Model], Dict[str, "Deployment"]], nest_asyncio: bool = False):
+        # Forked workers each record their own samples, the prometheus multiprocess mode set up
+        # by kserve.metrics for --workers aggregates them on scrape. It can't be enabled anymore.
+        if self.workers != 1 and metrics.PROMETHEUS_MULTIPROC_DIR not in os.environ:
+            logging.warning("The metrics of the %s workers are not aggregated, start the server with --workers "
+                            "or set %s", self.workers, metrics.PROMETHEUS_MULTIPROC_DIR)
         if isinstance(models, list):
             for model in models:
                 if isinstance(model, Model):
@@ -102,6 +234,9 @@ class ModelServer:
                 else:
                     raise RuntimeError("Model type should be Model")
         elif isinstance(models, dict):
+            # Ray is only imported by servers deploying models with Ray Serve
+            from ray import serve
+            from ray.serve.api import Deployment
             if all([isinstance(v, Deployment) for v in models.values()]):
                 serve.start(detached=True, http_options={"host": "0.0.0.0", "port": 9071})
                 for key in models:
@@ -117,18 +252,40 @@ class ModelServer:
             # formula as suggest in https://bugs.python.org/issue35279
             self.max_asyncio_workers = min(32, utils.cpu_count()+4)
 
-        self._http_server = tornado.httpserver.HTTPServer(
-            self.create_application(), max_buffer_size=self.max_buffer_size)
+        if self.workers != 1:
+            # loads running in background threads would not continue in the forked workers
+            self.registered_models.wait_for_loads()
+        if self.prefork and self.workers != 1:
+            self._start_prefork()
+        else:
+            self._http_server = tornado.httpserver.HTTPServer(
+                self.create_application(), max_buffer_size=self.max_buffer_size)
 
-        logging.info("Listening on port %s", self.http_port)
-        self._http_server.bind(self.http_port)
-        logging.info("Will fork %d workers", self.workers)
-        self._http_server.start(self.workers)
+            logging.info("Listening on port %s", self.http_port)
+            if self.workers == 1:
+                self._http_server.listen(self.http_port)
+            else:
+                sockets = tornado.netutil.bind_sockets(self.http_port)
+                workers = self.workers if self.workers > 0 else tornado.process.cpu_count()
+                logging.info("Will fork %d workers", workers)
+                prefork.fork_workers(workers, on_exit=metrics.mark_process_dead)
+                self._http_server.add_sockets(sockets)
 
         logging.info(f"Setting max asyncio worker threads as {self.max_asyncio_workers}")
         asyncio.get_event_loop().set_default_executor(
             concurrent.futures.ThreadPoolExecutor(max_workers=self.max_asyncio_workers))
 
+        # The gRPC server is started in each worker after forking, workers share
+        # the port through SO_REUSEPORT which grpc enables by default.
+        if self.enable_grpc:
+            from kserve.grpc_server import GRPCServer
+            options = channel_options(self.grpc_max_message_size) if self.grpc_max_message_size else None
+            self._grpc_server = GRPCServer(self.grpc_port, self.registered_models, options)
+            tornado.ioloop.IOLoop.current().spawn_callback(self._grpc_server.start)
+
+        # Each worker warms up its models, they report ready once warmed up
+        self.registered_models.start_warmup()
+
         # Need to start the IOLoop after workers have been started
         # https://github.com/tornadoweb/tornado/issues/2426
         # The nest_asyncio package needs to be installed by the downstream module
@@ -138,7 +295,22 @@ class ModelServer:
 
         tornado.ioloop.IOLoop.current().start()
 
-    def register_model_handle(self, name: str, model_handle: RayServeHandle):
+    def _start_prefork(self):
+        workers = self.workers if self.workers > 0 else tornado.process.cpu_count()
+        prefork.load_models(self.registered_models)
+        self._control = ControlChannel(tempfile.mkdtemp(prefix="kserve_control_"), workers)
+        self._http_server = tornado.httpserver.HTTPServer(
+            self.create_application(), max_buffer_size=self.max_buffer_size)
+        prefork.freeze()
+
+        logging.info("Will fork %d workers", workers)
+        task_id = prefork.fork_workers(workers, on_exit=metrics.mark_process_dead)
+        cpu = prefork.pin_cpu(task_id)
+        logging.info("Worker %d listening on port %s, pinned to CPU %s", task_id, self.http_port, cpu)
+        self._http_server.add_sockets(tornado.netutil.bind_sockets(self.http_port, reuse_port=True))
+        self._control.start(task_id, self.registered_models)
+
+    def register_model_handle(self, name: str, model_handle: "RayServeHandle"):
         self.registered_models.update_handle(name, model_handle)
         logging.info("Registering model handle: %s", name)
 
@@ -146,5 +318,41 @@ class ModelServer:
         if not model.name:
             raise Exception(
                 "Failed to register model, model.name must be provided.")
+        if model.max_batch_size is None:
+            model.max_batch_size = self.max_batch_size
+        if model.max_latency_ms is None:
+            model.max_latency_ms = self.max_latency_ms
+        if model.execution_mode is None:
+            model.execution_mode = self.execution_mode
+        if model.model_workers is None:
+            model.model_workers = self.model_workers
+        if model.max_in_flight is None:
+            model.max_in_flight = self.max_in_flight
+        if model.max_queue_size is None:
+            model.max_queue_size = self.max_queue_size
+        if model.queue_timeout_ms is None:
+            model.queue_timeout_ms = self.queue_timeout_ms
+        if model.coalesce_requests is None:
+            model.coalesce_requests = self.coalesce_requests
+        if model.http_client_backend is None:
+            model.http_client_backend = self.http_client_backend
+        if model.http_pool_size is None:
+            model.http_pool_size = self.http_pool_size
+        if model.http_idle_timeout is None:
+            model.http_idle_timeout = self.http_idle_timeout
+        if model.http2 is None:
+            model.http2 = self.http2
+        if model.grpc_channels is None:
+            model.grpc_channels = self.grpc_channels
+        if model.grpc_max_message_size is None:
+            model.grpc_max_message_size = self.grpc_max_message_size
+        if model.grpc_keepalive_time_ms is None:
+            model.grpc_keepalive_time_ms = self.grpc_keepalive_time_ms
+        if model.grpc_compression is None:
+            model.grpc_compression = self.grpc_compression
+        if model.grpc_lb_policy is None:
+            model.grpc_lb_policy = self.grpc_lb_policy
+        if model.warmup_iterations is None:
+            model.warmup_iterations = self.warmup_iterations
         self.registered_models.update(model)
         logging.info("Registering model: %s", model.name)
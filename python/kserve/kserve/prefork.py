@@ -0,0 +1,182 @@
+# Copyright 2022 The KServe Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Pre-fork worker mode of the ModelServer. Models are loaded in the parent and the
+heap is frozen before forking, so that workers share the model memory copy-on-write:
+gc.freeze() moves the loaded objects to a permanent generation the collector doesn't
+touch, otherwise every collection would write to the pages of all objects it scans.
+Each worker listens on its own SO_REUSEPORT socket, letting the kernel balance the
+connections, and is pinned to one CPU.
+
+Models loaded or unloaded through the repository API after the fork are applied
+in every worker through a ControlChannel, keeping the workers' repositories consistent.
+These models are loaded by each worker and are not shared.
+"""
+
+import gc
+import json
+import logging
+import os
+import random
+import socket
+import sys
+from typing import Callable, Optional
+
+import tornado.ioloop
+
+from kserve.model import Model
+from kserve.model_repository import ModelRepository
+
+LOAD = "load"
+UNLOAD = "unload"
+
+
+def load_models(models: ModelRepository):
+    """Loads the registered models which aren't ready yet"""
+    for name, model in models.get_models().items():
+        if isinstance(model, Model) and not model.ready:
+            logging.info("Loading model %s before forking", name)
+            model.load()
+
+
+def freeze():
+    gc.collect()
+    if hasattr(gc, "freeze"):
+        gc.freeze()
+
+
+def fork_workers(num_processes: int, on_exit: Optional[Callable[[int], None]] = None,
+                 max_restarts: int = 100) -> int:
+    """
+    Forks the workers like tornado.process.fork_processes, which doesn't tell the parent
+    when a worker exits. Returns the task id of the worker in each worker, workers which
+    exit abnormally are restarted with the same task id. The parent calls on_exit with the
+    pid of each worker which exited, and exits once all workers exited normally.
+    """
+    children = {}
+
+    def start_child(task_id: int) -> Optional[int]:
+        pid = os.fork()
+        if pid == 0:
+            random.seed()
+            return task_id
+        children[pid] = task_id
+        return None
+
+    for i in range(num_processes):
+        if start_child(i) is not None:
+            return i
+    restarts = 0
+    while children:
+        pid, status = os.wait()
+        if pid not in children:
+            continue
+        task_id = children.pop(pid)
+        if on_exit is not None:
+            on_exit(pid)
+        if os.WIFSIGNALED(status):
+            logging.warning("Worker %d (pid %d) killed by signal %d, restarting", task_id, pid, os.WTERMSIG(status))
+        elif os.WEXITSTATUS(status) != 0:
+            logging.warning("Worker %d (pid %d) exited with status %d, restarting",
+                            task_id, pid, os.WEXITSTATUS(status))
+        else:
+            logging.info("Worker %d (pid %d) exited normally", task_id, pid)
+            continue
+        restarts += 1
+        if restarts > max_restarts:
+            raise RuntimeError("Too many worker restarts, giving up")
+        if start_child(task_id) is not None:
+            return task_id
+    sys.exit(0)
+
+
+def pin_cpu(task_id: int) -> Optional[int]:
+    """Pins the calling process to one of the CPUs it may run on, chosen by task_id"""
+    if not hasattr(os, "sched_setaffinity"):
+        return None
+    cpus = sorted(os.sched_getaffinity(0))
+    cpu = cpus[task_id % len(cpus)]
+    os.sched_setaffinity(0, {cpu})
+    return cpu
+
+
+class ControlChannel:
+    """
+    Broadcasts model load and unload operations between forked workers over
+    unix datagram sockets, one per worker in a directory created before forking.
+    """
+
+    def __init__(self, directory: str, workers: int):
+        self.directory = directory
+        self.workers = workers
+        self.task_id: Optional[int] = None
+        self.models: Optional[ModelRepository] = None
+        self._socket: Optional[socket.socket] = None
+
+    def _path(self, task_id: int) -> str:
+        return os.path.join(self.directory, f"worker-{task_id}.sock")
+
+    def start(self, task_id: int, models: ModelRepository):
+        """Starts receiving the operations of the other workers, called in the worker"""
+        self.task_id = task_id
+        self.models = models
+        path = self._path(task_id)
+        if os.path.exists(path):
+            # left behind by a worker which was restarted
+            os.unlink(path)
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._socket.bind(path)
+        self._socket.setblocking(False)
+        tornado.ioloop.IOLoop.current().add_handler(self._socket.fileno(), self._on_message,
+                                                    tornado.ioloop.IOLoop.READ)
+
+    def broadcast(self, op: str, name: str):
+        if self._socket is None:
+            return
+        message = json.dumps({"op": op, "name": name, "origin": self.task_id}).encode("utf-8")
+        for task_id in range(self.workers):
+            if task_id == self.task_id:
+                continue
+            try:
+                self._socket.sendto(message, self._path(task_id))
+            except OSError as e:
+                logging.warning("Failed to send %s of model %s to worker %d: %s", op, name, task_id, e)
+
+    def _on_message(self, fd, events):
+        while True:
+            try:
+                data = self._socket.recv(65536)
+            except (BlockingIOError, InterruptedError):
+                return
+            message = json.loads(data)
+            tornado.ioloop.IOLoop.current().spawn_callback(self.apply, message["op"], message["name"])
+
+    async def apply(self, op: str, name: str):
+        logging.info("Applying %s of model %s from another worker", op, name)
+        try:
+            if op == LOAD:
+                await self.models.reload_model(name)
+            elif op == UNLOAD:
+                self.models.clear_response_cache(name)
+                self.models.unload(name)
+        except Exception:  # pylint: disable=broad-except
+            logging.exception("Failed to apply %s of model %s", op, name)
+
+    def close(self):
+        if self._socket is not None:
+            tornado.ioloop.IOLoop.current().remove_handler(self._socket.fileno())
+            self._socket.close()
+            os.unlink(self._path(self.task_id))
+            self._socket = None
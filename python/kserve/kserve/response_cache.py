@@ -0,0 +1,143 @@
+# Copyright 2022 The KServe Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, NamedTuple, Optional
+
+from kserve.utils import json_codec
+from kserve.utils.numpy_encoder import NumpyEncoder
+
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+try:
+    import orjson
+
+    def _canonical_dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS | orjson.OPT_SERIALIZE_NUMPY |
+                            orjson.OPT_NON_STR_KEYS)
+except ImportError:
+    def _canonical_dumps(obj: Any) -> bytes:
+        return json.dumps(obj, sort_keys=True, separators=(",", ":"), cls=NumpyEncoder).encode("utf-8")
+
+
+def request_key(*parts: Any) -> Optional[bytes]:
+    """Returns a digest of the canonical JSON form of the parts, so that requests only
+    differing in key order or whitespace share a key. Returns None for requests which
+    can't be serialized, these are not cached.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        if not isinstance(part, bytes):
+            try:
+                part = _canonical_dumps(part)
+            except (TypeError, ValueError):
+                return None
+        digest.update(len(part).to_bytes(8, "little"))
+        digest.update(part)
+    return digest.digest()
+
+
+class _Entry(NamedTuple):
+    body: bytes
+    expires: float
+
+
+class ResponseCache:
+    """
+    LRU cache of model responses bounded by the number of entries and the size of the
+    JSON encoded responses, entries expire after ttl_seconds if set. Responses are stored
+    encoded, each hit returns a new copy which callers are free to modify.
+
+    Caching is opt-in, only set it on models whose responses are a deterministic
+    function of the request:
+
+        model.response_cache = ResponseCache(max_entries=10000, ttl_seconds=300)
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, max_bytes: int = DEFAULT_MAX_BYTES,
+                 ttl_seconds: Optional[float] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # optional ModelMetrics of the model the cache belongs to
+        self.metrics = None
+        self._entries: "OrderedDict[bytes, _Entry]" = OrderedDict()
+        self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def get(self, key: bytes) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires < time.monotonic():
+            self._remove(key)
+            entry = None
+        if entry is None:
+            self.misses += 1
+            if self.metrics is not None:
+                self.metrics.cache_misses.inc()
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        if self.metrics is not None:
+            self.metrics.cache_hits.inc()
+        return json_codec.loads(entry.body)
+
+    def put(self, key: bytes, response: Any):
+        try:
+            body = json_codec.dumps(response)
+        except (TypeError, ValueError):
+            return
+        if len(body) > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        expires = time.monotonic() + self.ttl_seconds if self.ttl_seconds else float("inf")
+        self._entries[key] = _Entry(body, expires)
+        self._bytes += len(body)
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+            if self.metrics is not None:
+                self.metrics.cache_evictions.inc()
+        self._update_size()
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+        self._update_size()
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), "bytes": self._bytes, "hits": self.hits,
+                "misses": self.misses, "evictions": self.evictions}
+
+    def _remove(self, key: bytes):
+        entry = self._entries.pop(key)
+        self._bytes -= len(entry.body)
+        self._update_size()
+
+    def _update_size(self):
+        if self.metrics is not None:
+            self.metrics.cache_bytes.set(self._bytes)
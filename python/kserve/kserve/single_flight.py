@@ -0,0 +1,54 @@
+# Copyright 2022 The KServe Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import copy
+from typing import Any, Awaitable, Callable, Dict
+
+
+class SingleFlight:
+    """
+    SingleFlight coalesces concurrent calls with the same key into a single call,
+    callers arriving while it is in flight share its result or exception. Nothing
+    is kept once the call completes. The first caller gets the response itself, the
+    others a copy, so handlers modifying the response don't affect each other.
+    """
+
+    def __init__(self, requests=None, coalesced=None):
+        # optional counters of the calls and of the calls which shared another's result
+        self.requests = requests
+        self.coalesced = coalesced
+        self._flights: Dict[bytes, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    async def do(self, key: bytes, fn: Callable[[], Awaitable[Any]]) -> Any:
+        if self.requests is not None:
+            self.requests.inc()
+        flight = self._flights.get(key)
+        if flight is None:
+            # run as a task of its own, so that the call completes for the others
+            # even if the caller which started it is cancelled
+            flight = asyncio.ensure_future(fn())
+            self._flights[key] = flight
+            flight.add_done_callback(lambda _: self._done(key, flight))
+            return await asyncio.shield(flight)
+        if self.coalesced is not None:
+            self.coalesced.inc()
+        return copy.deepcopy(await asyncio.shield(flight))
+
+    def _done(self, key: bytes, flight: asyncio.Future):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
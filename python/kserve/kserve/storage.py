@@ -12,8 +12,10 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import contextlib
 import glob
 import gzip
+import hashlib
 import logging
 import mimetypes
 import os
@@ -22,20 +24,32 @@ import json
 import shutil
 import tarfile
 import tempfile
+import threading
+import time
 import zipfile
-from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
+from typing import IO, Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
 import requests
 from pathlib import Path
 from azure.storage.blob import BlobServiceClient
-from azure.storage.blob._list_blobs_helper import BlobPrefix
 
 from botocore.client import Config
 from botocore import UNSIGNED
 import boto3
+from boto3.s3.transfer import TransferConfig
 from google.auth import exceptions
 from google.cloud import storage
 
+from kserve import transfer
+from kserve.download_cache import DownloadCache, _file_lock
 from kserve.model_repository import MODEL_MOUNT_DIRS
+from kserve.utils import utils
+
+try:
+    import zstandard
+except ImportError:  # .tar.zst archives need the zstandard package
+    zstandard = None
 
 _GCS_PREFIX = "gs://"
 _S3_PREFIX = "s3://"
@@ -47,11 +61,169 @@ _HTTP_PREFIX = "http(s)://"
 _HEADERS_SUFFIX = "-headers"
 _PVC_PREFIX = "/mnt/pvc"
 
+# Objects downloaded concurrently, defaults to the number of CPUs + 4 (at most 32)
+DOWNLOAD_WORKERS_ENV = "STORAGE_DOWNLOAD_WORKERS"
+# Objects larger than the chunk size are downloaded in chunks of this size, in parallel
+CHUNK_SIZE_ENV = "STORAGE_CHUNK_SIZE_MB"
+CHUNK_CONCURRENCY_ENV = "STORAGE_CHUNK_CONCURRENCY"
+_DEFAULT_CHUNK_SIZE_MB = 64
+_DEFAULT_CHUNK_CONCURRENCY = 8
+
+# Sync mode, only the objects which changed since the last download into out_dir are downloaded
+SYNC_ENV = "STORAGE_SYNC"
+# Parent of the directories synced when Storage.download isn't given an out_dir
+SYNC_DIR_ENV = "STORAGE_SYNC_DIR"
+SYNC_MANIFEST = ".kserve-sync.json"
+
+_TAR = "application/x-tar"
+_ZIP = "application/zip"
+_TAR_ZSTD_SUFFIXES = (".tar.zst", ".tzst")
+_PIPE_READ_SIZE = 1 << 20
+_UNPACK_ERRORS = (tarfile.TarError, zipfile.BadZipfile) + ((zstandard.ZstdError,) if zstandard else ())
+
+
+def _download_workers() -> int:
+    return int(os.getenv(DOWNLOAD_WORKERS_ENV, 0)) or min(32, utils.cpu_count() + 4)
+
+
+def _chunk_size() -> int:
+    return int(float(os.getenv(CHUNK_SIZE_ENV, _DEFAULT_CHUNK_SIZE_MB)) * 1024 * 1024)
+
+
+def _chunk_concurrency() -> int:
+    return int(os.getenv(CHUNK_CONCURRENCY_ENV, _DEFAULT_CHUNK_CONCURRENCY))
+
+
+def _archive_mimetype(path: str) -> Optional[str]:
+    """Returns the mimetype of the archive formats Storage unpacks, None for other files"""
+    if path.endswith(_TAR_ZSTD_SUFFIXES) and zstandard is not None:
+        return _TAR
+    mimetype, _ = mimetypes.guess_type(path)
+    return mimetype if mimetype in (_TAR, _ZIP) else None
+
+
+def _run_concurrently(fn: Callable, items: List, max_workers: int, thread_name_prefix: str):
+    """Calls fn on each item in a thread pool, raising the first error after
+    cancelling the calls that have not started yet.
+    """
+    if max_workers <= 1 or len(items) <= 1:
+        for item in items:
+            fn(*item)
+        return
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items)),
+                            thread_name_prefix=thread_name_prefix) as executor:
+        futures = [executor.submit(fn, *item) for item in items]
+        try:
+            for future in futures:
+                future.result()
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+
+class _SyncManifest:
+    """Ids (URI and version) of the objects downloaded into a directory by the last sync,
+    by their path relative to the directory, and the members extracted from the archive
+    when the model is a single archive.
+    """
+
+    def __init__(self, out_dir: str, object_id: Callable[[Any], str]):
+        self.out_dir = out_dir
+        self.object_id = object_id
+        self.path = os.path.join(out_dir, SYNC_MANIFEST)
+        self.objects: Dict[str, str] = {}
+        self.members: List[str] = []
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                manifest = json.load(f)
+            self.objects = manifest.get("objects", {})
+            self.members = manifest.get("members", [])
+
+    def changed(self, downloads: List[Tuple[Any, str]]) -> List[Tuple[Any, str]]:
+        """Returns the downloads of the objects that are new or changed, removes the files
+        of the objects that are no longer listed and the files about to be replaced.
+        """
+        objects = {os.path.relpath(dest_path, self.out_dir): self.object_id(obj) for obj, dest_path in downloads}
+        for path in set(self.objects) - set(objects):
+            logging.info("Removing %s, no longer in the model", path)
+            self._remove(path)
+        changed = []
+        for obj, dest_path in downloads:
+            path = os.path.relpath(dest_path, self.out_dir)
+            # a single archive is removed once unpacked
+            if self.objects.get(path) == objects[path] and \
+                    (os.path.exists(dest_path) or _archive_mimetype(dest_path)):
+                continue
+            if os.path.lexists(dest_path):
+                # replaced rather than overwritten, it may be a hard link to the download cache
+                os.remove(dest_path)
+            changed.append((obj, dest_path))
+        if self.members and (changed or set(self.objects) != set(objects)):
+            # the files of the previous version of the archive, the new one may not have all of them
+            logging.info("Removing %d files unpacked from the previous archive", len(self.members))
+            for path in sorted(self.members, reverse=True):
+                self._remove(path)
+            self.members = []
+        logging.info("Sync of %s: %d of %d objects changed, %d removed", self.out_dir, len(changed),
+                     len(downloads), len(set(self.objects) - set(objects)))
+        self.objects = objects
+        return changed
+
+    def _remove(self, path: str):
+        dest_path = os.path.join(self.out_dir, path)
+        if os.path.isdir(dest_path) and not os.path.islink(dest_path):
+            if os.listdir(dest_path):
+                return
+            os.rmdir(dest_path)
+        elif os.path.lexists(dest_path):
+            os.remove(dest_path)
+        directory = os.path.dirname(dest_path)
+        while os.path.abspath(directory) != os.path.abspath(self.out_dir) and not os.listdir(directory):
+            os.rmdir(directory)
+            directory = os.path.dirname(directory)
+
+    def save(self, members: Optional[List[str]] = None):
+        """Records the objects once all of them were downloaded, and the members of the
+        archive they were unpacked from.
+        """
+        if members is not None:
+            # tarfile and zipfile extract the members outside of the directory as well
+            self.members = [path for path in map(os.path.normpath, members)
+                            if not os.path.isabs(path) and not path.startswith(os.pardir)]
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"objects": self.objects, "members": self.members}, f)
+        os.replace(tmp_path, self.path)
+
+
+def _sync_dir(uri: str) -> str:
+    """Directory synced with a URI when no out_dir is given, so that the next download
+    of the URI, a reload of the model, only fetches the objects that changed.
+    """
+    parent = os.getenv(SYNC_DIR_ENV) or os.path.join(tempfile.gettempdir(), "kserve-sync")
+    return os.path.join(parent, hashlib.sha256(uri.encode("utf-8")).hexdigest()[:16])
+
+
+def _sync_lock(out_dir: str):
+    """Lock of a directory shared by the processes syncing the same URI, held for the whole
+    download so that a process doesn't read or delete the files another one is writing.
+    """
+    return _file_lock(out_dir.rstrip(os.sep) + ".lock")
+
 
 class Storage(object):  # pylint: disable=too-few-public-methods
     @staticmethod
-    def download(uri: str, out_dir: str = None) -> str:
+    def download(uri: str, out_dir: str = None, sync: Optional[bool] = None) -> str:
+        """Downloads the model at uri into out_dir, a new temporary directory if not given.
+        In sync mode, also enabled by the STORAGE_SYNC environment variable, only the GCS,
+        S3 or Azure objects which changed since the last download into out_dir are
+        downloaded and the files of the objects removed from uri are deleted. Without
+        out_dir, the directory synced with uri is shared and locked while downloading.
+        """
         logging.info("Copying contents of %s to local", uri)
+        if sync is None:
+            sync = os.getenv(SYNC_ENV, "false").lower() == "true"
 
         if uri.startswith(_PVC_PREFIX) and not os.path.exists(uri):
             raise Exception(f"Cannot locate source uri {uri} for PVC")
@@ -60,20 +232,31 @@ class Storage(object):  # pylint: disable=too-few-public-methods
         if uri.startswith(_LOCAL_PREFIX) or os.path.exists(uri):
             is_local = True
 
+        lock = contextlib.nullcontext()
         if out_dir is None:
             if is_local:
                 # noop if out_dir is not set and the path is local
                 return Storage._download_local(uri)
-            out_dir = tempfile.mkdtemp()
+            if sync:
+                out_dir = _sync_dir(uri)
+                os.makedirs(out_dir, exist_ok=True)
+                lock = _sync_lock(out_dir)
+            else:
+                out_dir = tempfile.mkdtemp()
         elif not os.path.exists(out_dir):
             os.mkdir(out_dir)
 
+        with lock:
+            return Storage._download_into(uri, out_dir, sync, is_local)
+
+    @staticmethod
+    def _download_into(uri: str, out_dir: str, sync: bool, is_local: bool) -> str:
         if uri.startswith(_GCS_PREFIX):
-            Storage._download_gcs(uri, out_dir)
+            Storage._download_gcs(uri, out_dir, sync)
         elif uri.startswith(_S3_PREFIX):
-            Storage._download_s3(uri, out_dir)
+            Storage._download_s3(uri, out_dir, sync)
         elif re.search(_BLOB_RE, uri):
-            Storage._download_blob(uri, out_dir)
+            Storage._download_blob(uri, out_dir, sync)
         elif is_local:
             return Storage._download_local(uri, out_dir)
         elif re.search(_URI_RE, uri):
@@ -100,23 +283,36 @@ class Storage(object):  # pylint: disable=too-few-public-methods
             return None
 
     @staticmethod
-    def _download_s3(uri, temp_dir: str):
+    def _download_s3(uri, temp_dir: str, sync: bool = False):
         # Boto3 looks at various configuration locations until it finds configuration values.
         # lookup order:
         # 1. Config object passed in as the config parameter when creating S3 resource
         #    if awsAnonymousCredential env var true, passed in via config
         # 2. Environment variables
         # 3. ~/.aws/config file
-        s3 = boto3.resource('s3',
-                            endpoint_url=os.getenv("AWS_ENDPOINT_URL", "http://s3.amazonaws.com"),
-                            config=Storage.get_S3_config())
+        # The listing keeps botocore's retries. The objects are downloaded by a client with a
+        # single attempt, shared by the worker threads with a connection pool which fits all
+        # the parts in flight. Neither botocore nor s3transfer retry the downloads, a failed
+        # object is retried with backoff by transfer.retry, otherwise the layers would multiply
+        # the attempts of each other.
+        workers = _download_workers()
+        config = Storage.get_S3_config()
+        endpoint_url = os.getenv("AWS_ENDPOINT_URL", "http://s3.amazonaws.com")
+        s3 = boto3.resource('s3', endpoint_url=endpoint_url, config=config)
+        download_config = Config(max_pool_connections=workers * _chunk_concurrency(),
+                                 retries={"total_max_attempts": 1, "mode": "standard"})
+        download_config = config.merge(download_config) if config else download_config
+        download_s3 = boto3.resource('s3', endpoint_url=endpoint_url, config=download_config)
+        transfer_config = TransferConfig(multipart_threshold=_chunk_size(), multipart_chunksize=_chunk_size(),
+                                         max_concurrency=_chunk_concurrency(),
+                                         num_download_attempts=1)
         parsed = urlparse(uri, scheme='s3')
         bucket_name = parsed.netloc
         bucket_path = parsed.path.lstrip('/')
 
-        count = 0
-        bucket = s3.Bucket(bucket_name)
-        for obj in bucket.objects.filter(Prefix=bucket_path):
+        downloads = []
+        bucket = download_s3.Bucket(bucket_name)
+        for obj in s3.Bucket(bucket_name).objects.filter(Prefix=bucket_path):
             # Skip where boto3 lists the directory as an object
             if obj.key.endswith("/"):
                 continue
@@ -142,21 +338,81 @@ class Storage(object):  # pylint: disable=too-few-public-methods
             target = f"{temp_dir}/{target_key}"
             if not os.path.exists(os.path.dirname(target)):
                 os.makedirs(os.path.dirname(target), exist_ok=True)
-            bucket.download_file(obj.key, target)
-            logging.info('Downloaded object %s to %s' % (obj.key, target))
-            count = count + 1
-        if count == 0:
+            downloads.append((obj, target))
+        if not downloads:
             raise RuntimeError(
                 "Failed to fetch model. No model found in %s." % bucket_path)
 
+        def object_id(obj) -> str:
+            return f"{endpoint_url}/{bucket_name}/{obj.key}@{obj.e_tag}"
+        manifest = _SyncManifest(temp_dir, object_id) if sync else None
+        fetches = manifest.changed(downloads) if manifest else downloads
+        if manifest and not fetches:
+            manifest.save()
+            return
+        if len(downloads) == 1 and Storage._stream_archive(target):
+            obj = downloads[0][0]
+
+            def extract():
+                # the parts are fetched in parallel and handed to the extraction in order
+                checksum = Storage._s3_checksum(obj)
+                checksums = [checksum] if checksum else []
+                members = Storage._extract_tar_from_writer(
+                    lambda f: bucket.download_fileobj(obj.key, transfer.HashingWriter(f, checksums),
+                                                      Config=transfer_config), target, temp_dir)
+                Storage._verify_s3(bucket, obj, checksum, lambda: checksum.verify(obj.key))
+                return members
+            members = transfer.retry(extract, uri)
+            if manifest:
+                manifest.save(members)
+            return
+
+        def download(obj, target: str):
+            # objects above the chunk size are fetched as a multipart download
+            checksum = Storage._s3_checksum(obj)
+            if checksum is None:
+                bucket.download_file(obj.key, target, Config=transfer_config)
+            else:
+                # hashed as it is written, the parts fetched in parallel are written in order
+                with open(target, "wb") as f:
+                    bucket.download_fileobj(obj.key, transfer.HashingWriter(f, [checksum]), Config=transfer_config)
+                Storage._verify_s3(bucket, obj, checksum, lambda: checksum.verify(obj.key))
+            logging.info('Downloaded object %s to %s' % (obj.key, target))
+
+        Storage._download_concurrently(uri, download, fetches, workers, object_id)
+
         # Unpack compressed file, supports .tgz, tar.gz and zip file formats.
-        if count == 1:
-            mimetype, _ = mimetypes.guess_type(target)
-            if mimetype in ["application/x-tar", "application/zip"]:
-                Storage._unpack_archive_file(target, mimetype, temp_dir)
+        members = None
+        if len(downloads) == 1:
+            mimetype = _archive_mimetype(target)
+            if mimetype:
+                members = Storage._unpack_archive_file(target, mimetype, temp_dir)
+        if manifest:
+            manifest.save(members)
 
     @staticmethod
-    def _download_gcs(uri, temp_dir: str):
+    def _s3_checksum(obj) -> Optional[transfer.Checksum]:
+        """The ETag of an object uploaded in a single part is the MD5 of its content, the
+        ETag of a multipart upload (md5-parts) depends on the part size of the upload.
+        """
+        etag = obj.e_tag.strip('"') if isinstance(obj.e_tag, str) else None
+        return transfer.Checksum.from_hex("md5", etag) if etag and len(etag) == 32 else None
+
+    @staticmethod
+    def _verify_s3(bucket, obj, checksum: Optional[transfer.Checksum], verify: Callable[[], None]):
+        if checksum is None:
+            return
+        try:
+            verify()
+        except transfer.ChecksumError:
+            # the ETag of objects encrypted with SSE-KMS or SSE-C isn't the MD5 of their content
+            head = bucket.Object(obj.key)
+            if head.sse_customer_algorithm or (head.server_side_encryption or "").startswith("aws:kms"):
+                return
+            raise
+
+    @staticmethod
+    def _download_gcs(uri, temp_dir: str, sync: bool = False):
         try:
             storage_client = storage.Client()
         except exceptions.DefaultCredentialsError:
@@ -170,6 +426,7 @@ class Storage(object):  # pylint: disable=too-few-public-methods
             prefix = prefix + "/"
         blobs = bucket.list_blobs(prefix=prefix)
         count = 0
+        downloads = []
         for blob in blobs:
             # Replace any prefix from the object key with temp_dir
             subdir_object_key = blob.name.replace(bucket_path, "", 1).strip("/")
@@ -181,21 +438,79 @@ class Storage(object):  # pylint: disable=too-few-public-methods
                     os.makedirs(local_object_dir, exist_ok=True)
             if subdir_object_key.strip() != "":
                 dest_path = os.path.join(temp_dir, subdir_object_key)
-                logging.info("Downloading: %s", dest_path)
-                blob.download_to_filename(dest_path)
+                downloads.append((blob, dest_path))
             count = count + 1
         if count == 0:
             raise RuntimeError(
                 "Failed to fetch model. No model found in %s." % uri)
 
+        def object_id(blob) -> str:
+            return f"gs://{bucket_name}/{blob.name}#{blob.generation}"
+        manifest = _SyncManifest(temp_dir, object_id) if sync else None
+        fetches = manifest.changed(downloads) if manifest else downloads
+        if manifest and not fetches:
+            manifest.save()
+            return
+        if count == 1 and downloads and Storage._stream_archive(blob.name):
+            # download_to_file verifies the MD5 of the blob
+            members = transfer.retry(
+                lambda: Storage._extract_tar_from_writer(blob.download_to_file, blob.name, temp_dir), uri)
+            if manifest:
+                manifest.save(members)
+            return
+
+        def download(blob, dest_path: str):
+            logging.info("Downloading: %s", dest_path)
+            Storage._download_gcs_blob(bucket, blob, dest_path)
+
+        Storage._download_concurrently(uri, download, fetches, _download_workers(), object_id)
+
         # Unpack compressed file, supports .tgz, tar.gz and zip file formats.
+        members = None
         if count == 1:
-            mimetype, _ = mimetypes.guess_type(blob.name)
-            if mimetype in ["application/x-tar", "application/zip"]:
-                Storage._unpack_archive_file(dest_path, mimetype, temp_dir)
+            mimetype = _archive_mimetype(blob.name)
+            if mimetype:
+                members = Storage._unpack_archive_file(dest_path, mimetype, temp_dir)
+        if manifest:
+            manifest.save(members)
+
+    @staticmethod
+    def _download_gcs_blob(bucket, blob, dest_path: str):
+        """Downloads a blob larger than the chunk size as ranged requests of a chunk
+        each, written in parallel at their offset of the file. The checksum of ranged
+        requests isn't verified by the client, the CRC32C of each slice is computed as
+        it is written and the CRC32C of the blob is checked from their combination.
+        """
+        chunk_size = _chunk_size()
+        if blob.size is None or blob.size <= chunk_size:
+            # verifies the MD5 of the blob
+            blob.download_to_filename(dest_path)
+            return
+        with open(dest_path, "wb") as f:
+            f.truncate(blob.size)
+
+        checksum = transfer.Checksum.from_base64("crc32c", blob.crc32c)
+        crcs = {}
+
+        def download_slice(start: int, end: int):
+            # pinned to the generation listed, so that all the slices are of the same object
+            blob_slice = bucket.blob(blob.name, generation=blob.generation)
+            crc = transfer.Checksum("crc32c", b"")
+            with open(dest_path, "r+b") as f:
+                f.seek(start)
+                blob_slice.download_to_file(transfer.HashingWriter(f, [crc]), start=start, end=end)
+            crcs[start] = crc.digest()
+
+        slices = [(start, min(start + chunk_size, blob.size) - 1) for start in range(0, blob.size, chunk_size)]
+        _run_concurrently(download_slice, slices, _chunk_concurrency(), "download_slice")
+        if checksum is not None:
+            crc = 0
+            for start, end in slices:
+                crc = transfer.crc32c_combine(crc, int.from_bytes(crcs[start], "big"), end - start + 1)
+            checksum.verify(blob.name, crc.to_bytes(4, "big"))
 
     @staticmethod
-    def _download_blob(uri, out_dir: str):  # pylint: disable=too-many-locals
+    def _download_blob(uri, out_dir: str, sync: bool = False):  # pylint: disable=too-many-locals
         match = re.search(_BLOB_RE, uri)
         account_url = re.search(_ACCOUNT_RE, uri).group(0)
         account_name = match.group(1)
@@ -212,37 +527,100 @@ class Storage(object):  # pylint: disable=too-few-public-methods
         blob_service_client = BlobServiceClient(account_url, credential=token)
         container_client = blob_service_client.get_container_client(container_name)
         count = 0
-        blobs = []
-        max_depth = 5
-        stack = [(prefix, max_depth)]
-        while stack:
-            curr_prefix, depth = stack.pop()
-            if depth < 0:
+        downloads = []
+        # a flat listing returns the blobs of all the virtual directories under the prefix in one pass
+        for blob in container_client.list_blobs(name_starts_with=prefix):
+            if blob.name.endswith("/"):
                 continue
-            for item in container_client.walk_blobs(
-                            name_starts_with=curr_prefix):
-                if isinstance(item, BlobPrefix):
-                    stack.append((item.name, depth - 1))
-                else:
-                    blobs += container_client.list_blobs(name_starts_with=item.name,
-                                                         include=['snapshots'])
-        for blob in blobs:
             dest_path = os.path.join(out_dir, blob.name.replace(prefix, "", 1).lstrip("/"))
             Path(os.path.dirname(dest_path)).mkdir(parents=True, exist_ok=True)
-            logging.info("Downloading: %s to %s", blob.name, dest_path)
-            downloader = container_client.download_blob(blob.name)
-            with open(dest_path, "wb+") as f:
-                f.write(downloader.readall())
+            downloads.append((blob, dest_path))
             count = count + 1
         if count == 0:
             raise RuntimeError(
                 "Failed to fetch model. No model found in %s." % (uri))
 
+        def object_id(blob) -> str:
+            return f"{account_url}/{container_name}/{blob.name}@{blob.etag}"
+        manifest = _SyncManifest(out_dir, object_id) if sync else None
+        fetches = manifest.changed(downloads) if manifest else downloads
+        if manifest and not fetches:
+            manifest.save()
+            return
+        if count == 1 and Storage._stream_archive(blob.name):
+            def extract():
+                # the pipe isn't seekable, the blob is read over a single connection
+                checksums = Storage._azure_checksums(blob)
+                members = Storage._extract_tar_from_writer(
+                    lambda f: container_client.download_blob(blob.name, validate_content=True).readinto(
+                        transfer.HashingWriter(f, checksums)), blob.name, out_dir)
+                for checksum in checksums:
+                    checksum.verify(blob.name)
+                return members
+            members = transfer.retry(extract, uri)
+            if manifest:
+                manifest.save(members)
+            return
+
+        def download(blob, dest_path: str):
+            logging.info("Downloading: %s to %s", blob.name, dest_path)
+            # blobs above max_single_get_size are fetched as ranged reads of max_chunk_get_size by
+            # max_concurrency connections and written to the file as they arrive, so memory stays
+            # bounded by the chunks in flight instead of growing with the size of the blob.
+            # validate_content checks the MD5 of each range as it is received.
+            downloader = container_client.download_blob(blob.name, max_concurrency=_chunk_concurrency(),
+                                                        validate_content=True)
+            with open(dest_path, "wb") as f:
+                downloader.readinto(f)
+            transfer.verify_file(dest_path, Storage._azure_checksums(blob), blob.name)
+
+        Storage._download_concurrently(uri, download, fetches, _download_workers(), object_id)
+
         # Unpack compressed file, supports .tgz, tar.gz and zip file formats.
+        members = None
         if count == 1:
-            mimetype, _ = mimetypes.guess_type(dest_path)
-            if mimetype in ["application/x-tar", "application/zip"]:
-                Storage._unpack_archive_file(dest_path, mimetype, out_dir)
+            mimetype = _archive_mimetype(dest_path)
+            if mimetype:
+                members = Storage._unpack_archive_file(dest_path, mimetype, out_dir)
+        if manifest:
+            manifest.save(members)
+
+    @staticmethod
+    def _azure_checksums(blob) -> List[transfer.Checksum]:
+        """The MD5 of the blob, set when it was uploaded in a single request or by the client"""
+        md5 = blob.content_settings.content_md5
+        return [transfer.Checksum("md5", bytes(md5))] if isinstance(md5, (bytes, bytearray)) and md5 else []
+
+    @staticmethod
+    def _download_concurrently(uri: str, download: Callable, downloads: List[Tuple[Any, str]], workers: int,
+                               object_id: Optional[Callable[[Any], str]] = None):
+        """Runs download(obj, dest_path) for the objects in a pool of workers and
+        logs the throughput of the download. Failed downloads, checksum mismatches
+        included, are retried with backoff. With the download cache enabled the
+        objects are fetched through the cache, keyed by object_id(obj), the URI and
+        version of the object.
+        """
+        def fetch(obj, dest_path: str):
+            transfer.retry(lambda: download(obj, dest_path), dest_path)
+
+        cache = DownloadCache.from_env() if object_id else None
+        hits = []
+        if cache is not None:
+            def fetch_cached(obj, dest_path: str):
+                if cache.fetch(object_id(obj), dest_path, lambda path: fetch(obj, path)):
+                    hits.append(dest_path)
+
+        start = time.monotonic()
+        _run_concurrently(fetch_cached if cache is not None else fetch, downloads, workers, "download")
+        elapsed = max(time.monotonic() - start, 1e-6)
+        size = sum(os.path.getsize(dest_path) for _, dest_path in downloads if os.path.isfile(dest_path))
+        saved = sum(os.path.getsize(dest_path) for dest_path in hits)
+        logging.info("Downloaded %d objects (%.1f MB) of %s in %.2fs, %.1f MB/s with %d workers",
+                     len(downloads) - len(hits), (size - saved) / 1e6, uri, elapsed, (size - saved) / 1e6 / elapsed,
+                     min(workers, len(downloads)))
+        if cache is not None:
+            logging.info("Download cache hits %d/%d objects of %s, %.1f MB not downloaded",
+                         len(hits), len(downloads), uri, saved / 1e6)
 
     @staticmethod
     def _get_azure_storage_token():
@@ -289,8 +667,8 @@ class Storage(object):  # pylint: disable=too-few-public-methods
                 "Failed to fetch model. No model found in %s." % (uri))
         # Unpack compressed file, supports .tgz, tar.gz and zip file formats.
         if count == 1:
-            mimetype, _ = mimetypes.guess_type(dest_path)
-            if mimetype in ["application/x-tar", "application/zip"]:
+            mimetype = _archive_mimetype(dest_path)
+            if mimetype:
                 Storage._unpack_archive_file(dest_path, mimetype, out_dir)
 
         return out_dir
@@ -330,33 +708,122 @@ class Storage(object):  # pylint: disable=too-few-public-methods
                 raise RuntimeError("URI: %s did not respond with \'Content-Type\': \'application/octet-stream\'"
                                    % uri)
 
-            if encoding == 'gzip':
-                stream = gzip.GzipFile(fileobj=response.raw)
-                local_path = os.path.join(out_dir, f'{filename}.tar')
-            else:
-                stream = response.raw
-            with open(local_path, 'wb') as out:
-                shutil.copyfileobj(stream, out)
+            # resumed with a Range request from where it stopped if the connection fails
+            with transfer.ResumableHTTPReader(uri, headers, response, Storage._http_checksums(url, response)) \
+                    as reader:
+                if _archive_mimetype(url.path) == _TAR:
+                    # extracted as the response arrives, without writing the archive
+                    Storage._extract_tar_stream(reader, url.path, out_dir)
+                    reader.verify()
+                    return out_dir
+                if encoding == 'gzip':
+                    stream = gzip.GzipFile(fileobj=reader)
+                    local_path = os.path.join(out_dir, f'{filename}.tar')
+                else:
+                    stream = reader
+                with open(local_path, 'wb') as out:
+                    shutil.copyfileobj(stream, out)
+                reader.verify()
 
-        if mimetype in ["application/x-tar", "application/zip"]:
+        if mimetype == _ZIP:
             Storage._unpack_archive_file(local_path, mimetype, out_dir)
 
         return out_dir
 
     @staticmethod
-    def _unpack_archive_file(file_path, mimetype, target_dir=None):
+    def _http_checksums(url, response) -> List[transfer.Checksum]:
+        """Checksums of a URI, given by a md5= or sha256= fragment of the URI (a manifest
+        hash of the model), the x-goog-hash or the Content-MD5 header of the response
+        """
+        checksums = [transfer.Checksum.from_hex(algorithm, values[0])
+                     for algorithm, values in parse_qs(url.fragment).items() if algorithm in ("md5", "sha256")]
+        for value in response.headers.get("x-goog-hash", "").split(","):
+            algorithm, _, digest = value.strip().partition("=")
+            if algorithm == "md5":
+                checksums.append(transfer.Checksum.from_base64("md5", digest))
+        checksums.append(transfer.Checksum.from_base64("md5", response.headers.get("Content-MD5")))
+        return [checksum for checksum in checksums if checksum is not None]
+
+    @staticmethod
+    def _stream_archive(path: str) -> bool:
+        """Whether the object is a tar archive to extract while it downloads. Archives
+        go through the download cache as files when it is enabled, a hit avoids the download.
+        """
+        return _archive_mimetype(path) == _TAR and DownloadCache.from_env() is None
+
+    @staticmethod
+    def _extract_tar_stream(stream: IO[bytes], name: str, target_dir: str) -> List[str]:
+        """Extracts a tar archive, compressed or not, reading it sequentially from the stream.
+        Returns the names of the members.
+        """
+        logging.info("Unpacking: %s", name)
+        if name.endswith(_TAR_ZSTD_SUFFIXES):
+            stream = zstandard.ZstdDecompressor().stream_reader(stream)
+        try:
+            # a stream of blocks, decompressed and written to the target as they are read
+            with tarfile.open(fileobj=stream, mode='r|*', encoding='utf-8') as archive:
+                archive.extractall(target_dir)
+                return archive.getnames()
+        except _UNPACK_ERRORS:
+            raise RuntimeError("Failed to unpack archive file. \
+The file format is not valid.")
+
+    @staticmethod
+    def _extract_tar_from_writer(write: Callable[[IO[bytes]], Any], name: str, target_dir: str) -> List[str]:
+        """Extracts a tar archive while write(f) downloads it into f, through a pipe, so
+        the download, the decompression and the writes of the files overlap and the
+        archive itself is never stored. Returns the names of the members.
+        """
+        read_fd, write_fd = os.pipe()
+        reader, writer = os.fdopen(read_fd, 'rb'), os.fdopen(write_fd, 'wb')
+        errors = []
+
+        def download():
+            try:
+                with writer:
+                    write(writer)
+            except BaseException as e:  # pylint: disable=broad-except
+                errors.append(e)
+
+        thread = threading.Thread(target=download, name="download_archive", daemon=True)
+        thread.start()
+        start = time.monotonic()
+        try:
+            with reader:
+                members = Storage._extract_tar_stream(reader, name, target_dir)
+                # the end of the archive may be followed by padding and the compression trailer
+                while reader.read(_PIPE_READ_SIZE):
+                    pass
+        except BaseException:
+            # closing the reader fails the writes of the download with a broken pipe
+            thread.join()
+            if errors and not isinstance(errors[0], BrokenPipeError):
+                raise errors[0]
+            raise
+        thread.join()
+        if errors:
+            raise errors[0]
+        logging.info("Downloaded and unpacked %s in %.2fs", name, time.monotonic() - start)
+        return members
+
+    @staticmethod
+    def _unpack_archive_file(file_path, mimetype, target_dir=None) -> List[str]:
+        """Unpacks the archive and removes it, returns the names of the members"""
         if not target_dir:
             target_dir = os.path.dirname(file_path)
 
+        if mimetype == _TAR:
+            with open(file_path, 'rb') as f:
+                members = Storage._extract_tar_stream(f, file_path, target_dir)
+            os.remove(file_path)
+            return members
         try:
             logging.info("Unpacking: %s", file_path)
-            if mimetype == "application/x-tar":
-                archive = tarfile.open(file_path, 'r', encoding='utf-8')
-            else:
-                archive = zipfile.ZipFile(file_path, 'r')
-            archive.extractall(target_dir)
-            archive.close()
-        except (tarfile.TarError, zipfile.BadZipfile):
+            with zipfile.ZipFile(file_path, 'r') as archive:
+                archive.extractall(target_dir)
+                members = archive.namelist()
+        except _UNPACK_ERRORS:
             raise RuntimeError("Failed to unpack archive file. \
 The file format is not valid.")
         os.remove(file_path)
+        return members
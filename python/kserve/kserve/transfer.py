@@ -0,0 +1,307 @@
+# Copyright 2022 The KServe Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""
+Integrity and resumption of the downloads of Storage. Objects are verified against
+the checksum published by their provider as they are written, transient failures
+are retried with exponential backoff and HTTP downloads resume from the last byte
+received with a Range request.
+"""
+
+import base64
+import binascii
+import hashlib
+import io
+import logging
+import os
+import random
+import time
+from typing import IO, Callable, Dict, List, Optional, TypeVar
+
+import boto3.exceptions
+import botocore.exceptions
+import requests
+import s3transfer.exceptions
+import urllib3
+from google.resumable_media.common import DataCorruption
+
+from kserve import metrics
+
+ATTEMPTS_ENV = "STORAGE_DOWNLOAD_ATTEMPTS"
+_DEFAULT_ATTEMPTS = 5
+BACKOFF_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 30.0
+_READ_SIZE = 1 << 20
+
+
+class ChecksumError(RuntimeError):
+    """The content downloaded doesn't match the checksum of the object"""
+
+
+TRANSIENT_ERRORS = (ConnectionError, TimeoutError, EOFError, ChecksumError, DataCorruption,
+                    requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError,
+                    requests.exceptions.Timeout, urllib3.exceptions.ProtocolError,
+                    urllib3.exceptions.ReadTimeoutError, botocore.exceptions.ConnectionError,
+                    botocore.exceptions.ReadTimeoutError, botocore.exceptions.IncompleteReadError,
+                    # raised by s3transfer once its single attempt at a part failed with one of the above
+                    boto3.exceptions.RetriesExceededError, s3transfer.exceptions.RetriesExceededError)
+# S3 error codes of throttled or failed requests which succeed when sent again
+TRANSIENT_S3_CODES = {"SlowDown", "Throttling", "ThrottlingException", "RequestTimeout",
+                      "InternalError", "ServiceUnavailable"}
+
+T = TypeVar("T")
+
+
+def attempts() -> int:
+    return max(1, int(os.getenv(ATTEMPTS_ENV, _DEFAULT_ATTEMPTS)))
+
+
+def backoff(attempt: int) -> float:
+    """Seconds to wait before the retry following the given attempt, doubling with
+    each attempt up to BACKOFF_MAX_SECONDS, with jitter so that the workers of a
+    download don't retry in lockstep.
+    """
+    return min(BACKOFF_MAX_SECONDS, BACKOFF_SECONDS * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+
+def is_transient(e: BaseException) -> bool:
+    if isinstance(e, TRANSIENT_ERRORS):
+        return True
+    if isinstance(e, botocore.exceptions.ClientError):
+        status = e.response.get("ResponseMetadata", {}).get("HTTPStatusCode") or 0
+        return e.response.get("Error", {}).get("Code") in TRANSIENT_S3_CODES or status >= 500
+    return False
+
+
+def retry(fn: Callable[[], T], description: str) -> T:
+    """Calls fn until it succeeds, retrying transient errors and checksum mismatches.
+    The S3 downloads make a single attempt in botocore and s3transfer, so that a failure
+    isn't retried attempts() times at every layer.
+    """
+    failures = 0
+    while True:
+        try:
+            return fn()
+        except Exception as e:  # pylint: disable=broad-except
+            if not is_transient(e):
+                raise
+            failures += 1
+            if failures >= attempts():
+                raise
+            delay = backoff(failures - 1)
+            metrics.STORAGE_DOWNLOAD_RETRIES.inc()
+            logging.warning("Download of %s failed: %s, retrying in %.1fs", description, e, delay)
+            time.sleep(delay)
+
+
+class Checksum:
+    """Expected digest of an object, computed incrementally from its content"""
+
+    def __init__(self, algorithm: str, expected: bytes):
+        self.algorithm = algorithm
+        self.expected = expected
+        if algorithm == "crc32c":
+            import google_crc32c
+            self._hash = google_crc32c.Checksum()
+        else:
+            self._hash = hashlib.new(algorithm)
+
+    @staticmethod
+    def from_base64(algorithm: str, value) -> Optional["Checksum"]:
+        """Returns None if the provider didn't publish a checksum"""
+        if not isinstance(value, str) or not value:
+            return None
+        try:
+            return Checksum(algorithm, base64.b64decode(value, validate=True))
+        except binascii.Error:
+            return None
+
+    @staticmethod
+    def from_hex(algorithm: str, value) -> Optional["Checksum"]:
+        if not isinstance(value, str) or not value:
+            return None
+        try:
+            return Checksum(algorithm, bytes.fromhex(value))
+        except ValueError:
+            return None
+
+    def update(self, data: bytes):
+        self._hash.update(data)
+
+    def digest(self) -> bytes:
+        return self._hash.digest()
+
+    def verify(self, name: str, actual: Optional[bytes] = None):
+        """Checks the digest of the content, or the actual digest given"""
+        actual = self._hash.digest() if actual is None else actual
+        if actual != self.expected:
+            raise ChecksumError(f"{self.algorithm} of {name} is {actual.hex()}, expected {self.expected.hex()}")
+
+
+def _gf2_times(matrix: List[int], vector: int) -> int:
+    result = 0
+    i = 0
+    while vector:
+        if vector & 1:
+            result ^= matrix[i]
+        vector >>= 1
+        i += 1
+    return result
+
+
+def _gf2_square(matrix: List[int]) -> List[int]:
+    return [_gf2_times(matrix, row) for row in matrix]
+
+
+def crc32c_combine(crc1: int, crc2: int, length2: int) -> int:
+    """Returns the CRC32C of the concatenation of two blocks from the CRC32C of each
+    and the length of the second one, as zlib's crc32_combine does for CRC32. Lets
+    the blocks of an object be hashed while they are written in parallel.
+    """
+    if length2 == 0:
+        return crc1
+    # operator appending one zero bit, then two and four zero bits
+    odd = [0x82F63B78] + [1 << n for n in range(31)]
+    even = _gf2_square(odd)
+    odd = _gf2_square(even)
+    # appends length2 zero bytes to crc1, squaring the operator for each bit of length2
+    while True:
+        even = _gf2_square(odd)
+        if length2 & 1:
+            crc1 = _gf2_times(even, crc1)
+        length2 >>= 1
+        if not length2:
+            break
+        odd = _gf2_square(even)
+        if length2 & 1:
+            crc1 = _gf2_times(odd, crc1)
+        length2 >>= 1
+        if not length2:
+            break
+    return crc1 ^ crc2
+
+
+def verify_file(path: str, checksums: List[Checksum], name: str):
+    """Verifies a downloaded file, reading it once for all the checksums"""
+    if not checksums:
+        return
+    with open(path, "rb") as f:
+        for data in iter(lambda: f.read(_READ_SIZE), b""):
+            for checksum in checksums:
+                checksum.update(data)
+    for checksum in checksums:
+        checksum.verify(name)
+
+
+class HashingWriter(io.RawIOBase):
+    """Writes to a file while computing the checksums of what is written, for the
+    objects streamed by a download instead of being stored.
+    """
+
+    def __init__(self, f: IO[bytes], checksums: List[Checksum]):
+        super().__init__()
+        self._f = f
+        self._checksums = checksums
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        for checksum in self._checksums:
+            checksum.update(data)
+        return self._f.write(data)
+
+
+class ResumableHTTPReader(io.RawIOBase):
+    """Reads the body of an HTTP GET response. When the connection fails, or closes
+    before Content-Length bytes, the request is sent again with a Range header from
+    the offset reached, with exponential backoff between attempts. The checksums
+    are computed as the bytes are read, verify() checks them once the body is read.
+    """
+
+    def __init__(self, uri: str, headers: Dict[str, str], response, checksums: List[Checksum]):
+        super().__init__()
+        self._uri = uri
+        self._headers = headers
+        self._response = response
+        self._checksums = checksums
+        length = response.headers.get("Content-Length")
+        self._length = int(length) if length is not None else None
+        self._offset = 0
+        self._resumed = 0
+        self._responses = []
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        failures = 0
+        while True:
+            try:
+                if self._response is None:
+                    self._reopen()
+                data = self._response.raw.read(len(buffer))
+                if not data and self._length is not None and self._offset < self._length:
+                    raise EOFError(f"connection closed after {self._offset} of {self._length} bytes")
+                break
+            except TRANSIENT_ERRORS as e:
+                failures += 1
+                if failures >= attempts():
+                    raise
+                self._response = None
+                delay = backoff(failures - 1)
+                metrics.STORAGE_DOWNLOAD_RETRIES.inc()
+                logging.warning("Download of %s failed at byte %d: %s, resuming in %.1fs",
+                                self._uri, self._offset, e, delay)
+                time.sleep(delay)
+        size = len(data)
+        buffer[:size] = data
+        self._offset += size
+        for checksum in self._checksums:
+            checksum.update(data)
+        return size
+
+    def _reopen(self):
+        response = requests.get(self._uri, stream=True, headers=dict(self._headers, Range=f"bytes={self._offset}-"))
+        self._responses.append(response)
+        if response.status_code == 206:
+            self._resumed += self._offset
+            metrics.STORAGE_RESUMED_BYTES.inc(self._offset)
+        elif response.status_code == 200:
+            # the server doesn't support ranges, what was received already is read again
+            remaining = self._offset
+            while remaining:
+                data = response.raw.read(min(remaining, _READ_SIZE))
+                if not data:
+                    raise EOFError(f"connection closed after {self._offset - remaining} bytes")
+                remaining -= len(data)
+        else:
+            raise RuntimeError("URI: %s returned a %s response code." % (self._uri, response.status_code))
+        self._response = response
+
+    def verify(self):
+        """Reads the rest of the body and verifies the checksums"""
+        while self.read(_READ_SIZE):
+            pass
+        for checksum in self._checksums:
+            checksum.verify(self._uri)
+        if self._resumed:
+            logging.info("Resumed the download of %s, %d bytes were not downloaded again", self._uri, self._resumed)
+
+    def close(self):
+        for response in self._responses:
+            response.close()
+        self._responses = []
+        super().close()
@@ -0,0 +1,130 @@
+# Copyright 2022 The KServe Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Binary tensor data extension of the v2 REST inference protocol, see
+# https://github.com/triton-inference-server/server/blob/main/docs/protocol/extension_binary_data.md
+
+from typing import Any, Dict, Optional, Set, Tuple
+
+import numpy as np
+from tritonclient.utils import (deserialize_bytes_tensor, np_to_triton_dtype,
+                                serialize_byte_tensor, triton_to_np_dtype)
+
+from kserve.utils import json_codec
+
+INFERENCE_HEADER_CONTENT_LENGTH = "Inference-Header-Content-Length"
+BINARY_DATA_SIZE = "binary_data_size"
+BINARY_DATA = "binary_data"
+BINARY_DATA_OUTPUT = "binary_data_output"
+
+
+def decode_binary_request(body: bytes, header_length: int) -> Dict:
+    """Decodes a request with binary tensor data. The first header_length bytes
+    of the body are the JSON inference request, followed by the data of each input
+    carrying a "binary_data_size" parameter in the order the inputs are listed.
+    Binary inputs are returned as np.frombuffer views over the request body.
+    """
+    if header_length < 0 or header_length > len(body):
+        raise ValueError(f"Invalid {INFERENCE_HEADER_CONTENT_LENGTH} {header_length}")
+    request = json_codec.loads(body[:header_length])
+    view = memoryview(body)
+    offset = header_length
+    for infer_input in request.get("inputs", []):
+        parameters = infer_input.get("parameters") or {}
+        if BINARY_DATA_SIZE not in parameters:
+            continue
+        size = parameters.pop(BINARY_DATA_SIZE)
+        if offset + size > len(body):
+            raise ValueError(f"Input {infer_input.get('name')} expects {size} bytes of binary data, "
+                             f"only {len(body) - offset} are left in the request body")
+        raw = view[offset:offset + size]
+        offset += size
+        datatype = infer_input["datatype"]
+        if datatype == "BYTES":
+            data = deserialize_bytes_tensor(raw.tobytes())
+        else:
+            data = np.frombuffer(raw, dtype=triton_to_np_dtype(datatype))
+        infer_input["data"] = data.reshape(infer_input["shape"])
+        if not parameters:
+            del infer_input["parameters"]
+    if offset != len(body):
+        raise ValueError(f"Unexpected {len(body) - offset} trailing bytes in the request body")
+    return request
+
+
+def binary_outputs(request: Dict) -> Tuple[bool, Set[str]]:
+    """Returns whether all outputs were requested as binary data and the
+    names of the outputs that were requested individually as binary data.
+    """
+    if not isinstance(request, dict):
+        return False, set()
+    parameters = request.get("parameters") or {}
+    all_binary = bool(parameters.get(BINARY_DATA_OUTPUT, False))
+    names = set()
+    for output in request.get("outputs") or []:
+        if (output.get("parameters") or {}).get(BINARY_DATA, False):
+            names.add(output["name"])
+    return all_binary, names
+
+
+def to_tensor(data: Any, datatype: Optional[str] = None) -> Tuple[np.ndarray, str]:
+    """Converts the data of an output to an array of its v2 datatype, which is inferred
+    from the data when not given. BYTES tensors are object arrays, the only ones
+    serialize_byte_tensor takes, strings like labels come as unicode arrays otherwise.
+    """
+    if datatype == "BYTES":
+        return np.asarray(data, dtype=np.object_), datatype
+    if datatype is not None:
+        return np.asarray(data, dtype=triton_to_np_dtype(datatype)), datatype
+    array = np.asarray(data)
+    if array.dtype.kind in ("U", "S", "O"):
+        return array.astype(np.object_), "BYTES"
+    return array, np_to_triton_dtype(array.dtype)
+
+
+def to_raw_bytes(data: np.ndarray, datatype: str) -> bytes:
+    """Returns the raw bytes of a tensor, BYTES elements are prefixed with their length"""
+    return serialize_byte_tensor(data).item() if datatype == "BYTES" else data.tobytes()
+
+
+def encode_binary_response(response: Dict, all_binary: bool, names: Set[str]) \
+        -> Optional[Tuple[bytes, int]]:
+    """Encodes the outputs requested as binary data as raw bytes appended after the
+    JSON response. Returns the response body and the length of its JSON header,
+    or None if no output of the response is sent as binary data.
+    """
+    outputs = response.get("outputs") if isinstance(response, dict) else None
+    if not outputs or not (all_binary or names):
+        return None
+
+    chunks = []
+    encoded = []
+    for output in outputs:
+        if not all_binary and output.get("name") not in names:
+            encoded.append(output)
+            continue
+        data, datatype = to_tensor(output["data"], output.get("datatype"))
+        raw = to_raw_bytes(data, datatype)
+        chunks.append(raw)
+        # the response of the model is left as is, it may be cached
+        binary = {key: value for key, value in output.items() if key != "data"}
+        binary["datatype"] = datatype
+        binary.setdefault("shape", list(data.shape))
+        binary["parameters"] = dict(output.get("parameters") or {}, **{BINARY_DATA_SIZE: len(raw)})
+        encoded.append(binary)
+    if not chunks:
+        return None
+
+    header = json_codec.dumps(dict(response, outputs=encoded))
+    return b"".join([header] + chunks), len(header)
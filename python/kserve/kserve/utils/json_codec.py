@@ -0,0 +1,110 @@
+# Copyright 2022 The KServe Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+JSON codec used by the model server handlers and the transformer to predictor client.
+orjson is used when it is installed, otherwise the stdlib json module. Both encode
+NumPy arrays and scalars natively, so models can return them without calling tolist().
+The codec can be forced with the KSERVE_JSON_CODEC environment variable or set_codec().
+"""
+
+import json
+import logging
+import os
+from typing import Any, Callable, Dict, NamedTuple, Union
+
+import numpy as np
+
+from kserve.utils.numpy_encoder import NumpyEncoder
+
+ENV_JSON_CODEC = "KSERVE_JSON_CODEC"
+
+# Raised by loads for invalid documents, orjson.JSONDecodeError is a subclass of it.
+JSONDecodeError = json.JSONDecodeError
+
+
+class JSONCodec(NamedTuple):
+    name: str
+    dumps: Callable[[Any], bytes]
+    loads: Callable[[Union[bytes, str]], Any]
+
+
+def _json_dumps(obj: Any) -> bytes:
+    return json.dumps(obj, cls=NumpyEncoder).encode("utf-8")
+
+
+def _json_loads(data: Union[bytes, str]) -> Any:
+    return json.loads(data)
+
+
+_codecs: Dict[str, JSONCodec] = {
+    "json": JSONCodec("json", _json_dumps, _json_loads),
+}
+
+try:
+    import orjson
+
+    def _orjson_default(obj: Any) -> Any:
+        # Arrays orjson can't serialize natively, e.g. non contiguous or object arrays
+        if isinstance(obj, np.ndarray):
+            return obj.tolist()
+        if isinstance(obj, np.generic):
+            return obj.item()
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+    def _orjson_dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj, default=_orjson_default,
+                            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+
+    _codecs["orjson"] = JSONCodec("orjson", _orjson_dumps, orjson.loads)
+except ImportError:
+    pass
+
+
+def register_codec(name: str, dumps: Callable[[Any], bytes],
+                   loads: Callable[[Union[bytes, str]], Any]):
+    """Registers a JSON codec which can then be selected with set_codec"""
+    _codecs[name] = JSONCodec(name, dumps, loads)
+
+
+def _default_codec() -> JSONCodec:
+    name = os.environ.get(ENV_JSON_CODEC)
+    if name:
+        if name not in _codecs:
+            raise ValueError(f"Unknown JSON codec {name}, available codecs: {list(_codecs)}")
+        return _codecs[name]
+    return _codecs.get("orjson", _codecs["json"])
+
+
+_codec = _default_codec()
+logging.debug("Using %s JSON codec", _codec.name)
+
+
+def set_codec(name: str):
+    global _codec
+    if name not in _codecs:
+        raise ValueError(f"Unknown JSON codec {name}, available codecs: {list(_codecs)}")
+    _codec = _codecs[name]
+
+
+def get_codec() -> JSONCodec:
+    return _codec
+
+
+def dumps(obj: Any) -> bytes:
+    return _codec.dumps(obj)
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    return _codec.loads(data)
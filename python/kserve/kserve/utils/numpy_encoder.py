@@ -18,12 +18,8 @@ import numpy as np
 
 class NumpyEncoder(json.JSONEncoder):
     def default(self, obj):   # pylint: disable=arguments-differ,method-hidden
-        if isinstance(obj, (
-                np.int_, np.intc, np.intp, np.int8, np.int16, np.int32, np.int64, np.uint8,
-                np.uint16, np.uint32, np.uint64)):
-            return int(obj)
-        elif isinstance(obj, (np.float_, np.float16, np.float32, np.float64)):
-            return float(obj)
-        elif isinstance(obj, (np.ndarray,)):
+        if isinstance(obj, np.ndarray):
             return obj.tolist()
+        elif isinstance(obj, np.generic):
+            return obj.item()
         return json.JSONEncoder.default(self, obj)
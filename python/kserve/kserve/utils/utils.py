@@ -40,6 +40,14 @@ def set_isvc_namespace(inferenceservice):
     return namespace
 
 
+def is_ray_serve_handle(model) -> bool:
+    """Returns True if model is a Ray Serve deployment handle. Ray is only imported
+    once handles are registered, so the check doesn't import it.
+    """
+    handle = sys.modules.get("ray.serve.handle")
+    return handle is not None and isinstance(model, handle.RayServeHandle)
+
+
 def cpu_count():
     """Get the available CPU count for this system.
     Takes the minimum value from the following locations:
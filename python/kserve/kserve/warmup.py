@@ -0,0 +1,49 @@
+# Copyright 2022 The KServe Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""
+Warmup requests bundled with a model. The first requests after a model is loaded
+pay for lazy initialization in the framework (allocator growth, kernel selection,
+JIT compilation), the ModelServer runs the warmup requests through the model before
+it reports ready, so that this cost isn't paid by live traffic after a scale-up.
+"""
+
+import os
+from typing import Dict, List
+
+from kserve.utils import json_codec
+
+WARMUP_DIR = "warmup"
+
+
+def load_requests(model_dir: str) -> List[Dict]:
+    """Reads the JSON files of the warmup/ directory of a model directory in file
+    name order, each holding a v1 or v2 inference request. Returns an empty list
+    if the model doesn't bundle warmup requests.
+    """
+    directory = os.path.join(model_dir, WARMUP_DIR)
+    if not os.path.isdir(directory):
+        return []
+    requests = []
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(".json"):
+            continue
+        path = os.path.join(directory, name)
+        with open(path, "rb") as f:
+            try:
+                requests.append(json_codec.loads(f.read()))
+            except ValueError as e:
+                raise ValueError(f"Invalid warmup request {path}: {e}")
+    return requests
@@ -64,5 +64,6 @@ setuptools.setup(
     ],
     install_requires=REQUIRES,
     tests_require=TESTS_REQUIRES,
-    extras_require={'test': TESTS_REQUIRES}
+    extras_require={'test': TESTS_REQUIRES, 'batch': ['pandas', 'pyarrow'],
+                    'curl': ['pycurl'], 'httpx': ['httpx[http2]']}
 )
@@ -0,0 +1,125 @@
+# Copyright 2022 The KServe Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import json
+
+import pytest
+import tornado.web
+from tornado.httpclient import HTTPClientError
+
+from kserve import Model, ModelRepository, ModelServer
+from kserve.admission import AdmissionController
+
+
+class DummySlowModel(Model):
+    def __init__(self, name):
+        super().__init__(name)
+        self.ready = True
+        self.release = None
+
+    async def predict(self, request):
+        if self.release is None:
+            self.release = asyncio.Event()
+        await self.release.wait()
+        return {"predictions": request["instances"]}
+
+
+@pytest.mark.asyncio
+async def test_admission_queue():
+    admission = AdmissionController(max_in_flight=1, max_queue_size=1)
+    await admission.acquire()
+    waiter = asyncio.ensure_future(admission.acquire())
+    await asyncio.sleep(0)
+    assert admission.queue_size == 1
+    assert admission.overloaded
+    with pytest.raises(tornado.web.HTTPError) as e:
+        await admission.acquire()
+    assert e.value.status_code == 429
+    admission.release()
+    await waiter
+    assert admission.in_flight == 1 and admission.queue_size == 0
+    admission.release()
+    assert admission.in_flight == 0
+    assert not admission.overloaded
+
+
+@pytest.mark.asyncio
+async def test_admission_without_queue():
+    admission = AdmissionController(max_in_flight=1)
+    await admission.acquire()
+    with pytest.raises(tornado.web.HTTPError) as e:
+        await admission.acquire()
+    assert e.value.status_code == 429
+    # busy rather than overloaded, the readiness doesn't flap with every request
+    assert not admission.overloaded
+    admission.release()
+
+
+@pytest.mark.asyncio
+async def test_admission_queue_timeout():
+    admission = AdmissionController(max_in_flight=1, max_queue_size=2, queue_timeout_ms=10)
+    await admission.acquire()
+    with pytest.raises(tornado.web.HTTPError) as e:
+        await admission.acquire()
+    assert e.value.status_code == 503
+    assert admission.queue_size == 0
+    admission.release()
+    assert admission.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_admission_cancelled_waiter():
+    admission = AdmissionController(max_in_flight=1, max_queue_size=2)
+    await admission.acquire()
+    cancelled = asyncio.ensure_future(admission.acquire())
+    waiter = asyncio.ensure_future(admission.acquire())
+    await asyncio.sleep(0)
+    cancelled.cancel()
+    await asyncio.sleep(0)
+    admission.release()
+    await waiter
+    assert admission.in_flight == 1 and admission.queue_size == 0
+
+
+class TestAdmissionControl:
+    model = DummySlowModel("SlowModel")
+
+    @pytest.fixture(scope="class")
+    def app(self):
+        server = ModelServer(registered_models=ModelRepository(), max_in_flight=1, max_queue_size=1)
+        server.register_model(self.model)
+        return server.create_application()
+
+    async def test_overload(self, http_server_client):
+        body = json.dumps({"instances": [[1, 2]]})
+        requests = [asyncio.ensure_future(http_server_client.fetch(
+            '/v1/models/SlowModel:predict', method="POST", body=body)) for _ in range(2)]
+        await asyncio.sleep(0.1)
+
+        with pytest.raises(HTTPClientError) as e:
+            await http_server_client.fetch('/v1/models/SlowModel:predict', method="POST", body=body)
+        assert e.value.code == 429
+        with pytest.raises(HTTPClientError) as e:
+            await http_server_client.fetch('/v1/models/SlowModel')
+        assert e.value.code == 503
+        with pytest.raises(HTTPClientError) as e:
+            await http_server_client.fetch('/v2/health/ready')
+        assert e.value.code == 503
+
+        self.model.release.set()
+        responses = await asyncio.gather(*requests)
+        assert all(resp.code == 200 for resp in responses)
+        resp = await http_server_client.fetch('/v2/health/ready')
+        assert json.loads(resp.body) == {"ready": True}
@@ -174,3 +174,26 @@ def test_blob_no_prefix(mock_storage, mock_makedirs):  # pylint: disable=unused-
     # then
     actual_calls = get_call_args(mock_container.download_blob.call_args_list)
     assert set(actual_calls) == set(expected_calls)
+
+
+@mock.patch('kserve.storage.BlobServiceClient')
+def test_blob_streamed_to_file(mock_storage, tmp_path):
+
+    # given
+    blob_path = 'https://accountname.blob.core.windows.net/container/model/'
+    paths = ['model/a/b/c/d/e/f/weights.bin', 'model/config.json', 'model/a/']
+    mock_blob, mock_container = create_mock_blob(mock_storage, paths)
+    downloader = mock.MagicMock()
+    downloader.readinto.side_effect = lambda f: f.write(b"test")
+    downloader.readall.side_effect = AssertionError("blobs must not be buffered in memory")
+    mock_container.download_blob.return_value = downloader
+
+    # when
+    kserve.Storage._download_blob(blob_path, str(tmp_path))
+
+    # then
+    mock_container.list_blobs.assert_called_once_with(name_starts_with='model/')
+    mock_container.walk_blobs.assert_not_called()
+    assert (tmp_path / 'a/b/c/d/e/f/weights.bin').read_bytes() == b"test"
+    assert (tmp_path / 'config.json').read_bytes() == b"test"
+    assert mock_container.download_blob.call_count == 2
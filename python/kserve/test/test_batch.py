@@ -0,0 +1,90 @@
+# Copyright 2022 The KServe Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+
+import pytest
+
+from kserve import Model
+from kserve.batch import infer_format, load_model_class, main, run
+
+
+class DummyBatchScoringModel(Model):
+    def __init__(self, name, model_dir, scale=1):
+        super().__init__(name)
+        self.model_dir = model_dir
+        self.scale = scale
+
+    def load(self):
+        with open(os.path.join(self.model_dir, "offset")) as f:
+            self.offset = int(f.read())
+        self.ready = True
+
+    def predict(self, request):
+        return {"predictions": [sum(row) * self.scale + self.offset for row in request["instances"]]}
+
+
+@pytest.fixture
+def model_dir(tmp_path):
+    path = tmp_path / "model"
+    path.mkdir()
+    (path / "offset").write_text("100")
+    return str(path)
+
+
+def test_load_model_class():
+    assert load_model_class(f"{__name__}.DummyBatchScoringModel") is DummyBatchScoringModel
+    assert load_model_class(f"{__name__}:DummyBatchScoringModel") is DummyBatchScoringModel
+    with pytest.raises(ValueError):
+        load_model_class("json.JSONDecoder")
+
+
+def test_infer_format():
+    assert infer_format("a.jsonl") == "ndjson"
+    assert infer_format("a.CSV") == "csv"
+    with pytest.raises(ValueError):
+        infer_format("a.txt")
+
+
+def test_ndjson(tmp_path, model_dir):
+    input_path = tmp_path / "input.ndjson"
+    input_path.write_text("".join(json.dumps([i, i]) + "\n" for i in range(10)))
+    output_path = tmp_path / "output.ndjson"
+    stats = run(DummyBatchScoringModel, model_dir, str(input_path), str(output_path),
+                model_kwargs={"scale": 2}, chunk_size=3, workers=1)
+    assert stats["rows"] == 10
+    assert [json.loads(line) for line in output_path.read_text().splitlines()] == \
+        [i * 4 + 100 for i in range(10)]
+
+
+def test_csv_process_pool(tmp_path, model_dir):
+    pd = pytest.importorskip("pandas")
+    input_path = tmp_path / "input.csv"
+    pd.DataFrame({"a": range(50), "b": range(50)}).to_csv(input_path, index=False)
+    output_path = tmp_path / "output.csv"
+    main(["--model_class", f"{__name__}.DummyBatchScoringModel", "--model_dir", model_dir,
+          "--input", str(input_path), "--output", str(output_path), "--chunk_size", "7",
+          "--workers", "2"])
+    assert pd.read_csv(output_path)["prediction"].tolist() == [i * 2 + 100 for i in range(50)]
+
+
+def test_parquet(tmp_path, model_dir):
+    pd = pytest.importorskip("pandas")
+    pytest.importorskip("pyarrow")
+    input_path = tmp_path / "input.parquet"
+    pd.DataFrame({"a": range(20), "b": range(20)}).to_parquet(input_path)
+    output_path = tmp_path / "output.parquet"
+    run(DummyBatchScoringModel, model_dir, str(input_path), str(output_path), chunk_size=8, workers=1)
+    assert pd.read_parquet(output_path)["prediction"].tolist() == [i * 2 + 100 for i in range(20)]
@@ -0,0 +1,148 @@
+# Copyright 2022 The KServe Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+
+import numpy as np
+import pytest
+
+from kserve import Model
+from kserve.batcher import Batcher, batch_key, merge_requests, split_response
+from kserve.errors import InferenceError
+
+
+class DummyBatchModel(Model):
+    def __init__(self, name):
+        super().__init__(name)
+        self.calls = []
+        self.ready = True
+
+    def predict(self, request):
+        self.calls.append(request)
+        return {"predictions": [sum(instance) for instance in request["instances"]]}
+
+
+def _v2_request(data, rows):
+    return {"inputs": [{"name": "input-0", "shape": [rows, 2], "datatype": "INT32", "data": data}]}
+
+
+def test_batch_key():
+    assert batch_key({"instances": [[1, 2]]}) == ("instances",)
+    assert batch_key({"instances": [[1, 2]], "signature": "foo"}) is None
+    assert batch_key({"instances": []}) is None
+    assert batch_key(b"raw") is None
+    assert batch_key(_v2_request([1, 2, 3, 4], 2)) == batch_key(_v2_request([5, 6], 1))
+    assert batch_key(_v2_request([1, 2, 3, 4], 2)) != batch_key(_v2_request([[5, 6]], 1))
+    # data length does not match the shape
+    assert batch_key(_v2_request([1, 2, 3], 2)) is None
+
+
+def test_merge_and_split_v2():
+    requests = [_v2_request([1, 2], 1), _v2_request([3, 4, 5, 6], 2)]
+    merged = merge_requests(requests)
+    assert merged["inputs"][0]["shape"] == [3, 2]
+    assert merged["inputs"][0]["data"] == [1, 2, 3, 4, 5, 6]
+
+    response = {"model_name": "m", "outputs": [{"name": "out", "shape": [3], "datatype": "INT32",
+                                                "data": [3, 7, 11]}]}
+    responses = split_response(response, [1, 2])
+    assert responses[0] == {"model_name": "m", "outputs": [{"name": "out", "shape": [1],
+                                                            "datatype": "INT32", "data": [3]}]}
+    assert responses[1]["outputs"][0]["shape"] == [2]
+    assert responses[1]["outputs"][0]["data"] == [7, 11]
+
+
+def test_split_ndarray():
+    responses = split_response({"predictions": np.array([[1, 2], [3, 4], [5, 6]])}, [1, 2])
+    np.testing.assert_array_equal(responses[1]["predictions"], [[3, 4], [5, 6]])
+
+    response = {"outputs": [{"name": "out", "shape": [3, 2], "datatype": "INT32",
+                             "data": np.arange(6, dtype=np.int32)}]}
+    responses = split_response(response, [2, 1])
+    assert responses[0]["outputs"][0]["shape"] == [2, 2]
+    np.testing.assert_array_equal(responses[1]["outputs"][0]["data"], [4, 5])
+
+
+def test_split_mismatch():
+    with pytest.raises(InferenceError, match="Expected a list of 3 predictions"):
+        split_response({"predictions": [1, 2]}, [1, 2])
+    with pytest.raises(InferenceError):
+        split_response({"predictions": 3}, [1, 2])
+
+
+@pytest.mark.asyncio
+async def test_batcher_merges_concurrent_requests():
+    model = DummyBatchModel("TestModel")
+    model.max_batch_size = 4
+    model.max_latency_ms = 1000
+    responses = await asyncio.gather(
+        model({"instances": [[1, 2]]}),
+        model({"instances": [[3, 4], [5, 6]]}),
+        model({"instances": [[7, 8]]}),
+    )
+    assert responses == [{"predictions": [3]}, {"predictions": [7, 11]}, {"predictions": [15]}]
+    assert len(model.calls) == 1
+    assert model.batcher.stats() == {4: 1}
+
+
+@pytest.mark.asyncio
+async def test_batcher_flushes_on_latency():
+    model = DummyBatchModel("TestModel")
+    model.max_batch_size = 32
+    model.max_latency_ms = 10
+    response = await asyncio.wait_for(model({"instances": [[1, 2]]}), timeout=1)
+    assert response == {"predictions": [3]}
+    assert model.batcher.stats() == {1: 1}
+
+
+@pytest.mark.asyncio
+async def test_batcher_unmergeable_request():
+    model = DummyBatchModel("TestModel")
+    model.max_batch_size = 2
+    response = await model({"instances": [[1, 2]], "parameters": {}})
+    assert response == {"predictions": [3]}
+    assert model.calls == [{"instances": [[1, 2]], "parameters": {}}]
+
+
+@pytest.mark.asyncio
+async def test_batcher_propagates_errors():
+    async def predict(request):
+        raise RuntimeError("boom")
+
+    batcher = Batcher(predict, max_batch_size=2, max_latency_ms=1000)
+    results = await asyncio.gather(batcher.submit({"instances": [1]}),
+                                   batcher.submit({"instances": [2]}),
+                                   return_exceptions=True)
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+@pytest.mark.asyncio
+async def test_batcher_isolates_failed_request():
+    calls = []
+
+    async def predict(request):
+        calls.append(request)
+        if "bad" in request["instances"]:
+            raise ValueError("bad instance")
+        return {"predictions": request["instances"]}
+
+    batcher = Batcher(predict, max_batch_size=3, max_latency_ms=1000)
+    results = await asyncio.gather(batcher.submit({"instances": [1]}),
+                                   batcher.submit({"instances": ["bad"]}),
+                                   batcher.submit({"instances": [2]}),
+                                   return_exceptions=True)
+    # the merged predict failed, each request was predicted on its own
+    assert results[0] == {"predictions": [1]} and results[2] == {"predictions": [2]}
+    assert isinstance(results[1], ValueError)
+    assert len(calls) == 4
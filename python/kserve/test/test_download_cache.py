@@ -0,0 +1,98 @@
+# Copyright 2022 The KServe Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import os
+import threading
+import time
+import unittest.mock as mock
+
+import kserve
+from kserve.download_cache import CACHE_DIR_ENV, CACHE_SIZE_ENV, DownloadCache
+from test.test_s3_storage import create_mock_boto3_bucket
+
+
+def _writer(data: bytes, calls: list):
+    def download(path):
+        calls.append(path)
+        # slow enough for concurrent fetches to overlap
+        time.sleep(0.05)
+        with open(path, "wb") as f:
+            f.write(data)
+    return download
+
+
+def test_fetch_hit_and_miss(tmp_path):
+    cache = DownloadCache(str(tmp_path / "cache"), 1 << 20)
+    calls = []
+    assert not cache.fetch("s3://bucket/model.bin@1", str(tmp_path / "a.bin"), _writer(b"v1", calls))
+    assert cache.fetch("s3://bucket/model.bin@1", str(tmp_path / "b.bin"), _writer(b"v1", calls))
+    assert len(calls) == 1
+    assert (tmp_path / "b.bin").read_bytes() == b"v1"
+    # hard linked to the cached object
+    assert os.stat(tmp_path / "a.bin").st_ino == os.stat(tmp_path / "b.bin").st_ino
+    # another version of the object is a miss
+    assert not cache.fetch("s3://bucket/model.bin@2", str(tmp_path / "c.bin"), _writer(b"v2", calls))
+    assert (tmp_path / "c.bin").read_bytes() == b"v2"
+
+
+def test_concurrent_fetch_downloads_once(tmp_path):
+    cache = DownloadCache(str(tmp_path / "cache"), 1 << 20)
+    calls = []
+    threads = [threading.Thread(target=cache.fetch,
+                                args=("gs://bucket/model.bin#1", str(tmp_path / f"{i}.bin"), _writer(b"data", calls)))
+               for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert all((tmp_path / f"{i}.bin").read_bytes() == b"data" for i in range(4))
+
+
+def test_lru_eviction(tmp_path):
+    cache = DownloadCache(str(tmp_path / "cache"), 10)
+    calls = []
+    cache.fetch("a", str(tmp_path / "a"), _writer(b"aaaa", calls))
+    cache.fetch("b", str(tmp_path / "b"), _writer(b"bbbb", calls))
+    past = time.time() - 60
+    os.utime(cache._entry("b")[0], (past, past))
+    # a is more recent than b, b is evicted to make room for c
+    cache.fetch("c", str(tmp_path / "c"), _writer(b"cccc", calls))
+    assert os.path.exists(cache._entry("a")[0])
+    assert not os.path.exists(cache._entry("b")[0])
+    assert os.path.exists(cache._entry("c")[0])
+    # larger than the cache, downloaded without being cached
+    assert not cache.fetch("d", str(tmp_path / "d"), _writer(b"d" * 11, calls))
+    assert (tmp_path / "d").read_bytes() == b"d" * 11
+    assert not os.path.exists(cache._entry("d")[0])
+
+
+@mock.patch('kserve.storage.boto3')
+def test_s3_download_cached(mock_storage, tmp_path):
+    mock_bucket = create_mock_boto3_bucket(mock_storage, ['model/model.bin', 'model/config.json'])
+    for obj in mock_bucket.objects.filter.return_value:
+        obj.e_tag = '"etag"'
+
+    def download_file(key, target, **kwargs):
+        with open(target, "w") as f:
+            f.write(key)
+    mock_bucket.download_file.side_effect = download_file
+
+    with mock.patch.dict(os.environ, {CACHE_DIR_ENV: str(tmp_path / "cache"), CACHE_SIZE_ENV: "1"}):
+        kserve.Storage._download_s3('s3://foo/model', str(tmp_path / "first"))
+        kserve.Storage._download_s3('s3://foo/model', str(tmp_path / "second"))
+    assert mock_bucket.download_file.call_count == 2
+    assert (tmp_path / "second" / "model.bin").read_text() == "model/model.bin"
+    assert (tmp_path / "second" / "config.json").read_text() == "model/config.json"
@@ -0,0 +1,104 @@
+# Copyright 2022 The KServe Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import os
+import pickle
+import threading
+
+import numpy as np
+import pytest
+
+from kserve import Model
+from kserve.executor import ExecutionMode, _share_arrays, _restore_arrays, _close, shared_memory
+
+
+class DummySyncModel(Model):
+    def __init__(self, name):
+        super().__init__(name)
+        self.ready = True
+
+    def predict(self, request):
+        return {"predictions": request["instances"],
+                "thread": threading.current_thread().name,
+                "pid": os.getpid()}
+
+
+class DummyArrayModel(Model):
+    def __init__(self, name):
+        super().__init__(name)
+        self.ready = True
+
+    def predict(self, request):
+        data = request["inputs"][0]["data"]
+        return {"outputs": [{"name": "output-0", "data": data * 2}], "pid": os.getpid()}
+
+
+@pytest.mark.asyncio
+async def test_inline():
+    model = DummySyncModel("TestModel")
+    response = await model({"instances": [[1, 2]]})
+    assert response["thread"] == threading.current_thread().name
+
+
+@pytest.mark.asyncio
+async def test_thread_pool():
+    model = DummySyncModel("TestModel")
+    model.execution_mode = ExecutionMode.THREAD
+    model.model_workers = 2
+    try:
+        responses = await asyncio.gather(*[model({"instances": [[i]]}) for i in range(4)])
+        assert [r["predictions"] for r in responses] == [[[0]], [[1]], [[2]], [[3]]]
+        assert all(r["thread"].startswith("TestModel") for r in responses)
+    finally:
+        model.shutdown_executor()
+
+
+@pytest.mark.asyncio
+async def test_process_pool():
+    model = DummyArrayModel("TestModel")
+    model.execution_mode = "process"
+    model.model_workers = 1
+    try:
+        data = np.arange(1 << 15, dtype=np.float32)
+        response = await model({"inputs": [{"name": "input-0", "data": data}]})
+        assert response["pid"] != os.getpid()
+        np.testing.assert_array_equal(response["outputs"][0]["data"], data * 2)
+    finally:
+        model.shutdown_executor()
+
+
+def test_model_pickle_drops_executor():
+    model = DummySyncModel("TestModel")
+    model.execution_mode = ExecutionMode.THREAD
+    model.model_workers = 1
+    assert model.executor is not None
+    copy = pickle.loads(pickle.dumps(model))
+    assert copy._executor is None
+    assert copy.execution_mode == ExecutionMode.THREAD
+    model.shutdown_executor()
+
+
+@pytest.mark.skipif(shared_memory is None, reason="requires multiprocessing.shared_memory")
+def test_shared_arrays():
+    data = np.arange(1 << 15, dtype=np.float64).reshape(2, -1)
+    blocks = []
+    shared = _share_arrays({"inputs": [{"data": data}], "small": np.arange(2)}, blocks)
+    assert len(blocks) == 1
+    assert isinstance(shared["small"], np.ndarray)
+    restored_blocks = []
+    restored = _restore_arrays(shared, restored_blocks, copy=True)
+    np.testing.assert_array_equal(restored["inputs"][0]["data"], data)
+    _close(restored_blocks)
+    _close(blocks, unlink=True)
@@ -0,0 +1,98 @@
+# Copyright 2022 The KServe Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+
+import grpc
+import numpy as np
+import pytest
+from prometheus_client import REGISTRY
+from tritonclient.grpc import InferResult, service_pb2
+
+from kserve import Model, ModelRepository
+from kserve.grpc_client import GRPCChannelPool, channel_options, endpoints
+from kserve.grpc_server import GRPCServer
+
+
+class DummyV2Model(Model):
+    def __init__(self, name):
+        super().__init__(name)
+        self.ready = True
+
+    async def predict(self, request):
+        data = request["inputs"][0]["data"]
+        return {"outputs": [{"name": "output-0", "shape": list(data.shape),
+                             "datatype": "FP32", "data": data * 2}]}
+
+
+class DummyGRPCTransformer(Model):
+    def postprocess(self, response):
+        return InferResult(response).as_numpy("output-0")
+
+
+def test_endpoints():
+    assert endpoints("predictor") == ["predictor:80"]
+    assert endpoints("a:8081, b") == ["a:8081", "b:80"]
+
+
+def test_channel_options():
+    options = dict(channel_options(max_message_size=1 << 26, keepalive_time_ms=10000,
+                                   lb_policy="round_robin"))
+    assert options["grpc.max_receive_message_length"] == 1 << 26
+    assert options["grpc.keepalive_time_ms"] == 10000
+    assert options["grpc.lb_policy_name"] == "round_robin"
+    assert channel_options() == []
+
+
+@pytest.mark.asyncio
+async def test_channel_pool_round_robin():
+    pool = GRPCChannelPool("a:1,b:2", size=3)
+    assert len(pool.channels) == 3
+    stubs = [pool.stub() for _ in range(4)]
+    assert stubs[0] is stubs[3] and stubs[0] is not stubs[1]
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_grpc_predictor():
+    repository = ModelRepository()
+    repository.update(DummyV2Model("GRPCPoolModel"))
+    server = GRPCServer(0, repository, channel_options(max_message_size=1 << 26))
+    port = await server.start()
+    transformer = DummyGRPCTransformer("GRPCPoolModel")
+    transformer.protocol = "grpc-v2"
+    transformer.predictor_host = f"localhost:{port}"
+    transformer.grpc_channels = 2
+    transformer.grpc_max_message_size = 1 << 26
+    try:
+        # larger than the default 4MB message size limit
+        data = np.arange(1 << 21, dtype=np.float32)
+        tensor = service_pb2.ModelInferRequest.InferInputTensor(name="input-0", datatype="FP32",
+                                                                shape=list(data.shape))
+        request = service_pb2.ModelInferRequest(model_name="GRPCPoolModel", inputs=[tensor],
+                                                raw_input_contents=[data.tobytes()])
+        for _ in range(2):
+            response = await transformer(request)
+            np.testing.assert_array_equal(response, data * 2)
+        for _ in range(50):
+            if REGISTRY.get_sample_value("kserve_grpc_channels_ready", {"model": "GRPCPoolModel"}) == 2:
+                break
+            await asyncio.sleep(0.01)
+        assert REGISTRY.get_sample_value("kserve_grpc_channels_ready", {"model": "GRPCPoolModel"}) == 2
+        assert all(channel.get_state() == grpc.ChannelConnectivity.READY
+                   for channel in transformer._grpc_pool.channels)
+    finally:
+        await transformer._grpc_pool.close()
+        await server.stop()
+    assert REGISTRY.get_sample_value("kserve_grpc_channels_ready", {"model": "GRPCPoolModel"}) == 0
@@ -0,0 +1,121 @@
+# Copyright 2022 The KServe Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import grpc
+import numpy as np
+import pytest
+from tritonclient.grpc import service_pb2, service_pb2_grpc
+from tritonclient.utils import deserialize_bytes_tensor
+
+from kserve import Model, ModelRepository
+from kserve.grpc_server import GRPCServer, decode_infer_request, encode_infer_response
+
+
+class DummyV2Model(Model):
+    def __init__(self, name):
+        super().__init__(name)
+        self.ready = True
+        self.platform = "numpy"
+        self.versions = ["1"]
+        self.input_metadata = [{"name": "input-0", "datatype": "FP32", "shape": [-1, 3]}]
+        self.output_metadata = [{"name": "output-0", "datatype": "FP32", "shape": [-1, 3]}]
+
+    async def predict(self, request):
+        data = request["inputs"][0]["data"]
+        assert isinstance(data, np.ndarray)
+        return {"outputs": [{"name": "output-0", "shape": list(data.shape),
+                             "datatype": "FP32", "data": data * 2}]}
+
+
+def _infer_request(data: np.ndarray) -> service_pb2.ModelInferRequest:
+    tensor = service_pb2.ModelInferRequest.InferInputTensor(
+        name="input-0", datatype="FP32", shape=list(data.shape))
+    return service_pb2.ModelInferRequest(model_name="TestModel", id="1", inputs=[tensor],
+                                         raw_input_contents=[data.tobytes()])
+
+
+def test_decode_raw_input_contents():
+    data = np.arange(6, dtype=np.float32).reshape(2, 3)
+    request = decode_infer_request(_infer_request(data))
+    assert request["id"] == "1"
+    assert request["inputs"][0]["shape"] == [2, 3]
+    np.testing.assert_array_equal(request["inputs"][0]["data"], data)
+
+
+def test_decode_contents():
+    tensor = service_pb2.ModelInferRequest.InferInputTensor(
+        name="input-0", datatype="INT64", shape=[2],
+        contents=service_pb2.InferTensorContents(int64_contents=[1, 2]))
+    request = decode_infer_request(service_pb2.ModelInferRequest(inputs=[tensor]))
+    assert request["inputs"][0]["data"].dtype == np.int64
+    assert request["inputs"][0]["data"].tolist() == [1, 2]
+
+
+def test_encode_v1_response():
+    response = encode_infer_response("TestModel", {"predictions": [1, 2, 3]})
+    assert response.outputs[0].name == "predictions"
+    assert response.outputs[0].datatype == "INT64"
+    assert np.frombuffer(response.raw_output_contents[0], dtype=np.int64).tolist() == [1, 2, 3]
+
+
+def test_encode_bytes_response():
+    response = encode_infer_response("TestModel", {"predictions": ["setosa", "virginica"]})
+    assert response.outputs[0].datatype == "BYTES"
+    assert response.outputs[0].shape == [2]
+    assert deserialize_bytes_tensor(response.raw_output_contents[0]).tolist() == [b"setosa", b"virginica"]
+
+    response = encode_infer_response("TestModel", {"outputs": [
+        {"name": "labels", "datatype": "BYTES", "shape": [1, 2], "data": ["setosa", b"virginica"]}]})
+    assert response.outputs[0].shape == [1, 2]
+    assert deserialize_bytes_tensor(response.raw_output_contents[0]).tolist() == [b"setosa", b"virginica"]
+
+
+@pytest.mark.asyncio
+async def test_grpc_server():
+    repository = ModelRepository()
+    repository.update(DummyV2Model("TestModel"))
+    server = GRPCServer(0, repository)
+    port = await server.start()
+    try:
+        async with grpc.aio.insecure_channel(f"localhost:{port}") as channel:
+            stub = service_pb2_grpc.GRPCInferenceServiceStub(channel)
+
+            live = await stub.ServerLive(service_pb2.ServerLiveRequest())
+            assert live.live
+            ready = await stub.ModelReady(service_pb2.ModelReadyRequest(name="TestModel"))
+            assert ready.ready
+            metadata = await stub.ModelMetadata(service_pb2.ModelMetadataRequest(name="TestModel"))
+            assert metadata.name == "TestModel"
+            assert metadata.platform == "numpy"
+            assert list(metadata.versions) == ["1"]
+            assert metadata.inputs[0].name == "input-0"
+            assert list(metadata.inputs[0].shape) == [-1, 3]
+            assert metadata.outputs[0].datatype == "FP32"
+            with pytest.raises(grpc.aio.AioRpcError) as err:
+                await stub.ModelMetadata(service_pb2.ModelMetadataRequest(name="TestModel", version="2"))
+            assert err.value.code() == grpc.StatusCode.NOT_FOUND
+
+            data = np.arange(6, dtype=np.float32).reshape(2, 3)
+            response = await stub.ModelInfer(_infer_request(data))
+            assert response.model_name == "TestModel"
+            assert response.id == "1"
+            assert list(response.outputs[0].shape) == [2, 3]
+            result = np.frombuffer(response.raw_output_contents[0], dtype=np.float32)
+            np.testing.assert_array_equal(result.reshape(2, 3), data * 2)
+
+            with pytest.raises(grpc.aio.AioRpcError) as err:
+                await stub.ModelReady(service_pb2.ModelReadyRequest(name="InvalidModel"))
+            assert err.value.code() == grpc.StatusCode.NOT_FOUND
+    finally:
+        await server.stop()
@@ -0,0 +1,88 @@
+# Copyright 2022 The KServe Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from unittest import mock
+
+import pytest
+import tornado.web
+from prometheus_client import REGISTRY
+
+from kserve import Model, ModelRepository, ModelServer
+from kserve.http_client import HTTPClientBackend, HttpxHTTPClient, TornadoHTTPClient, create_http_client
+from kserve.model import ModelType
+
+
+class DummyPredictor(Model):
+    def __init__(self, name):
+        super().__init__(name)
+        self.ready = True
+
+    def predict(self, request):
+        return {"predictions": [[value * 2 for value in row] for row in request["instances"]]}
+
+    def explain(self, request):
+        return {"explanations": request["instances"]}
+
+
+def test_create_http_client():
+    with mock.patch("importlib.util.find_spec", return_value=None):
+        assert isinstance(create_http_client(), TornadoHTTPClient)
+    client = create_http_client("tornado", pool_size=4)
+    assert client.pool_size == 4
+    with pytest.raises(ValueError):
+        create_http_client("unknown")
+
+
+def test_default_http_client_keeps_connections_alive():
+    pytest.importorskip("httpx")
+    assert isinstance(create_http_client(), HttpxHTTPClient)
+
+
+class TestOutboundHTTPClient:
+
+    @pytest.fixture(scope="class")
+    def app(self):  # pylint: disable=no-self-use
+        server = ModelServer(registered_models=ModelRepository())
+        server.register_model(DummyPredictor("ClientModel"))
+        return server.create_application()
+
+    @pytest.mark.parametrize("backend", [HTTPClientBackend.TORNADO, HTTPClientBackend.HTTPX])
+    async def test_predict_and_explain(self, http_server_client, http_server_port, backend):
+        if backend == HTTPClientBackend.HTTPX:
+            pytest.importorskip("httpx")
+        transformer = Model("ClientModel")
+        transformer.predictor_host = f"127.0.0.1:{http_server_port[1]}"
+        transformer.explainer_host = transformer.predictor_host
+        transformer.http_client_backend = backend
+        transformer.http_pool_size = 2
+        try:
+            assert await transformer({"instances": [[1, 2]]}) == {"predictions": [[2, 4]]}
+            assert await transformer({"instances": [[1, 2]]}, model_type=ModelType.EXPLAINER) == \
+                {"explanations": [[1, 2]]}
+            assert REGISTRY.get_sample_value("kserve_outbound_pool_size",
+                                             {"model": "ClientModel", "target": "predictor"}) == 2
+            assert REGISTRY.get_sample_value("kserve_outbound_requests_active",
+                                             {"model": "ClientModel", "target": "predictor"}) == 0
+            if backend == HTTPClientBackend.HTTPX:
+                assert isinstance(transformer._http_client("predictor"), HttpxHTTPClient)
+        finally:
+            for client in transformer._http_clients.values():
+                await client.close()
+
+    async def test_predictor_error(self, http_server_client, http_server_port):
+        transformer = Model("MissingPredictorModel")
+        transformer.predictor_host = f"127.0.0.1:{http_server_port[1]}"
+        with pytest.raises(tornado.web.HTTPError) as e:
+            await transformer({"instances": [[1, 2]]})
+        assert e.value.status_code == 404
@@ -0,0 +1,58 @@
+# Copyright 2022 The KServe Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import json
+import os
+import subprocess
+import sys
+
+# Generous for CI machines, importing kserve takes well under a second on a laptop
+IMPORT_TIME_BUDGET_SECONDS = float(os.environ.get("KSERVE_IMPORT_TIME_BUDGET", "2.0"))
+
+# Modules a model server only needs when it uses them
+LAZY_MODULES = ["ray", "kubernetes", "tritonclient.grpc", "kserve.models", "kserve.storage",
+                "kserve.api.kserve_client", "kserve.api_client", "azure.storage.blob", "boto3"]
+
+_IMPORT_KSERVE = """
+import json, sys, time
+start = time.perf_counter()
+import kserve
+print(json.dumps({"seconds": time.perf_counter() - start,
+                  "modules": [m for m in sys.argv[1:] if m in sys.modules]}))
+"""
+
+
+def _import_kserve():
+    output = subprocess.run([sys.executable, "-c", _IMPORT_KSERVE] + LAZY_MODULES,
+                            check=True, stdout=subprocess.PIPE,
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).stdout
+    return json.loads(output.decode("utf-8").strip().splitlines()[-1])
+
+
+def test_import_is_lazy():
+    assert _import_kserve()["modules"] == []
+
+
+def test_import_time():
+    # best of three, the first run may pay for cold file system caches
+    seconds = min(_import_kserve()["seconds"] for _ in range(3))
+    assert seconds < IMPORT_TIME_BUDGET_SECONDS
+
+
+def test_lazy_attributes():
+    import kserve
+    assert kserve.Storage.__module__ == "kserve.storage"
+    assert kserve.V1beta1SKLearnSpec.__module__ == "kserve.models.v1beta1_sk_learn_spec"
+    assert "KServeClient" in dir(kserve)
@@ -0,0 +1,69 @@
+# Copyright 2022 The KServe Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+
+import numpy as np
+import pytest
+
+from kserve.utils import json_codec
+
+CODECS = list(json_codec._codecs)
+
+
+@pytest.fixture(params=CODECS)
+def codec(request):
+    previous = json_codec.get_codec().name
+    json_codec.set_codec(request.param)
+    yield request.param
+    json_codec.set_codec(previous)
+
+
+def test_numpy_serialization(codec):
+    response = {
+        "predictions": np.arange(6, dtype=np.float32).reshape(2, 3),
+        "transposed": np.arange(4, dtype=np.int64).reshape(2, 2).T,
+        "labels": np.array(["a", "b"], dtype=object),
+        "count": np.int32(2),
+        "score": np.float64(0.5),
+    }
+    assert json.loads(json_codec.dumps(response)) == {
+        "predictions": [[0, 1, 2], [3, 4, 5]],
+        "transposed": [[0, 2], [1, 3]],
+        "labels": ["a", "b"],
+        "count": 2,
+        "score": 0.5,
+    }
+
+
+def test_loads(codec):
+    assert json_codec.loads(b'{"instances": [[1, 2]]}') == {"instances": [[1, 2]]}
+    with pytest.raises(json_codec.JSONDecodeError):
+        json_codec.loads(b'{')
+
+
+def test_set_unknown_codec():
+    with pytest.raises(ValueError):
+        json_codec.set_codec("unknown")
+
+
+def test_register_codec():
+    previous = json_codec.get_codec().name
+    json_codec.register_codec("custom", lambda obj: b"custom", json.loads)
+    try:
+        json_codec.set_codec("custom")
+        assert json_codec.dumps({}) == b"custom"
+    finally:
+        json_codec.set_codec(previous)
+        del json_codec._codecs["custom"]
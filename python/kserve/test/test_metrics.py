@@ -0,0 +1,120 @@
+# Copyright 2022 The KServe Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+from prometheus_client import REGISTRY
+from prometheus_client.parser import text_string_to_metric_families
+from tornado.httpclient import HTTPClientError
+
+from kserve import Model, ModelRepository, ModelServer
+
+
+class DummyMetricsModel(Model):
+    def __init__(self, name):
+        super().__init__(name)
+        self.ready = True
+
+    def predict(self, request):
+        if request["instances"] == [["fail"]]:
+            raise ValueError("failed")
+        return {"predictions": request["instances"]}
+
+
+def _sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+class TestMetrics:
+
+    @pytest.fixture(scope="class")
+    def app(self):  # pylint: disable=no-self-use
+        server = ModelServer(registered_models=ModelRepository())
+        server.register_model(DummyMetricsModel("MetricsModel"))
+        return server.create_application()
+
+    async def test_predict_metrics(self, http_server_client):
+        stages = ("decode", "preprocess", "predict", "postprocess", "encode")
+        before = {stage: _sample("kserve_stage_duration_seconds_count",
+                                 model="MetricsModel", stage=stage) for stage in stages}
+        requests = _sample("kserve_request_duration_seconds_count", model="MetricsModel", protocol="v1")
+
+        resp = await http_server_client.fetch('/v1/models/MetricsModel:predict', method="POST",
+                                              body=json.dumps({"instances": [[1, 2]]}))
+        assert resp.code == 200
+
+        for stage in stages:
+            assert _sample("kserve_stage_duration_seconds_count",
+                           model="MetricsModel", stage=stage) == before[stage] + 1
+        assert _sample("kserve_request_duration_seconds_count",
+                       model="MetricsModel", protocol="v1") == requests + 1
+        assert _sample("kserve_payload_bytes_sum", model="MetricsModel",
+                       direction="response") >= len(resp.body)
+        assert _sample("kserve_requests_in_flight", model="MetricsModel") == 0
+
+    async def test_error_metrics(self, http_server_client):
+        errors = _sample("kserve_request_errors_total", model="MetricsModel", protocol="v1")
+        with pytest.raises(HTTPClientError):
+            await http_server_client.fetch('/v1/models/MetricsModel:predict', method="POST",
+                                           body=json.dumps({"instances": [["fail"]]}))
+        assert _sample("kserve_request_errors_total",
+                       model="MetricsModel", protocol="v1") == errors + 1
+
+    async def test_unknown_model_not_recorded(self, http_server_client):
+        with pytest.raises(HTTPClientError):
+            await http_server_client.fetch('/v1/models/UnknownModel:predict', method="POST",
+                                           body=json.dumps({"instances": [[1, 2]]}))
+        assert REGISTRY.get_sample_value("kserve_requests_in_flight", {"model": "UnknownModel"}) is None
+
+    async def test_metrics_endpoint(self, http_server_client):
+        await http_server_client.fetch('/v1/models/MetricsModel:predict', method="POST",
+                                       body=json.dumps({"instances": [[1, 2]]}))
+        resp = await http_server_client.fetch('/metrics')
+        assert resp.code == 200
+        assert resp.headers["Content-Type"].startswith("text/plain")
+        assert b'kserve_stage_duration_seconds_count{model="MetricsModel",stage="predict"}' in resp.body
+
+
+def test_multiprocess_metrics(tmp_path):
+    # the mode is picked when kserve.metrics is imported, in a separate interpreter
+    # as it applies to the whole process
+    script = textwrap.dedent("""
+        import os, sys
+        from kserve import metrics, prefork
+        assert os.environ[metrics.PROMETHEUS_MULTIPROC_DIR].startswith(sys.argv[1])
+        metrics.MODEL_EVICTIONS.inc()
+        try:
+            prefork.fork_workers(2, on_exit=metrics.mark_process_dead)
+        except SystemExit:
+            sys.stdout.write(metrics.generate()[0].decode())
+        else:
+            metrics.MODEL_EVICTIONS.inc()
+            metrics.MODEL_MEMORY.set(1024)
+            os._exit(0)
+    """)
+    env = dict(os.environ, TMPDIR=str(tmp_path))
+    env.pop("PROMETHEUS_MULTIPROC_DIR", None)
+    output = subprocess.run([sys.executable, "-c", script, str(tmp_path), "--workers", "2"], check=True,
+                            capture_output=True, text=True, env=env).stdout
+    samples = {sample.name: sample.value for family in text_string_to_metric_families(output)
+               for sample in family.samples}
+    # the samples of the parent and of both workers
+    assert samples["kserve_model_evictions_total"] == 3
+    # the live gauges of the workers are gone once they exited, only the parent's is left
+    assert samples["kserve_model_repository_memory_bytes"] == 0
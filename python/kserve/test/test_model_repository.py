@@ -0,0 +1,380 @@
+# Copyright 2022 The KServe Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import tornado.web
+from prometheus_client import REGISTRY
+
+from kserve import Model, ModelRepository, ModelServer
+from kserve.model_repository import ModelState
+
+MODEL_SIZE = 32 << 20
+
+
+class DummyLargeModel(Model):
+    def __init__(self, name):
+        super().__init__(name)
+        self.weights = None
+
+    def load(self):
+        # touch every page, so that the weights are resident
+        self.weights = b"\x01" * MODEL_SIZE
+        self.ready = True
+        return self.ready
+
+    def predict(self, request):
+        return {"predictions": request["instances"]}
+
+
+class DummyLRUModelRepository(ModelRepository):
+    def __init__(self, memory_budget=None):
+        super().__init__(memory_budget=memory_budget)
+        self.loads = []
+
+    def load_model(self, name: str) -> bool:
+        model = DummyLargeModel(name)
+        model.load()
+        self.update(model)
+        self.loads.append(name)
+        return model.ready
+
+    async def load(self, name: str) -> bool:
+        return self.load_model(name)
+
+
+def _load(repository, name):
+    with repository.track_load(name):
+        repository.load_model(name)
+
+
+def test_unbounded():
+    repository = DummyLRUModelRepository()
+    for name in ("a", "b", "c"):
+        _load(repository, name)
+    assert list(repository.get_models()) == ["a", "b", "c"]
+    assert repository.model_memory["a"] >= MODEL_SIZE // 2
+    assert repository.stats()["evictions"] == 0
+
+
+@pytest.mark.asyncio
+async def test_lru_eviction():
+    evictions = REGISTRY.get_sample_value("kserve_model_evictions_total") or 0
+    repository = DummyLRUModelRepository(memory_budget=MODEL_SIZE * 5 // 2)
+    for name in ("a", "b"):
+        _load(repository, name)
+    assert await repository.use_model("a") is not None
+    _load(repository, "c")
+    # b is the least recently used model
+    assert list(repository.get_models()) == ["a", "c"]
+    assert repository.is_model_evicted("b")
+    assert not repository.is_model_ready("b")
+
+    model = await repository.use_model("b")
+    assert model is not None and model.ready
+    assert repository.loads == ["a", "b", "c", "b"]
+    assert list(repository.get_models()) == ["c", "b"]
+    assert repository.stats() == {"models": 2, "evicted": 1, "memory_bytes": sum(repository.model_memory.values()),
+                                  "hits": 1, "misses": 1, "evictions": 2}
+    assert REGISTRY.get_sample_value("kserve_model_evictions_total") - evictions == 2
+
+    repository.unload("a")
+    assert not repository.is_model_evicted("a")
+    with pytest.raises(KeyError):
+        repository.unload("a")
+
+
+def test_registered_models_are_not_evicted():
+    repository = DummyLRUModelRepository(memory_budget=MODEL_SIZE // 2)
+    model = DummyLargeModel("registered")
+    model.load()
+    repository.update(model)
+    _load(repository, "a")
+    _load(repository, "b")
+    assert list(repository.get_models()) == ["registered", "b"]
+
+
+def test_unload_and_eviction_stop_executors():
+    repository = DummyLRUModelRepository(memory_budget=MODEL_SIZE * 3 // 2)
+    _load(repository, "a")
+    executor = ThreadPoolExecutor(max_workers=1)
+    model = repository.get_model("a")
+    model._executor = executor
+    _load(repository, "b")
+    assert repository.is_model_evicted("a")
+    assert model._executor is None and executor._shutdown
+
+    executor = ThreadPoolExecutor(max_workers=1)
+    model = repository.get_model("b")
+    model._executor = executor
+    repository.unload("b")
+    assert model._executor is None and executor._shutdown
+
+
+class DummySizedModel(DummyLargeModel):
+    def memory_bytes(self):
+        return MODEL_SIZE
+
+
+def test_reported_memory():
+    repository = ModelRepository(memory_budget=MODEL_SIZE * 3)
+    with repository.track_load("sized"):
+        model = DummySizedModel("sized")
+        model.ready = True
+        repository.update(model)
+    assert repository.model_memory["sized"] == MODEL_SIZE
+
+
+def test_loads_within_budget_are_serialized():
+    repository = DummyLRUModelRepository(memory_budget=MODEL_SIZE * 10)
+    running = []
+    overlaps = []
+    load_model = repository.load_model
+
+    def load_alone(name):
+        running.append(name)
+        overlaps.append(len(running))
+        time.sleep(0.05)
+        try:
+            return load_model(name)
+        finally:
+            running.remove(name)
+
+    repository.load_model = load_alone
+    threads = [threading.Thread(target=_load, args=(repository, name)) for name in ("a", "b", "c")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert overlaps == [1, 1, 1]
+    # each load measured only its own model
+    assert all(memory < MODEL_SIZE * 2 for memory in repository.model_memory.values())
+
+
+@pytest.mark.asyncio
+async def test_api_load_does_not_block_loop_on_measured_loads():
+    repository = DummySlowModelRepository()
+    repository.memory_budget = MODEL_SIZE * 10
+    slow = asyncio.ensure_future(repository.load("slow"))
+    await asyncio.sleep(0.05)
+    # the measured load of slow holds the lock in the executor
+    reload = asyncio.ensure_future(repository.reload_model("other"))
+    await asyncio.sleep(0.05)
+    assert not reload.done()
+    repository.release.set()
+    await asyncio.gather(slow, reload)
+    assert repository.get_state("other") == ModelState.READY
+
+
+class DummySyncLoadRepository(ModelRepository):
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+
+    def load(self, name: str) -> bool:
+        self.release.wait()
+        model = DummyLargeModel(name)
+        model.ready = True
+        self.update(model)
+        return model.ready
+
+
+@pytest.mark.asyncio
+async def test_api_load_of_sync_override_does_not_block_loop():
+    repository = DummySyncLoadRepository()
+    repository.memory_budget = MODEL_SIZE * 10
+    measuring = threading.Event()
+
+    def measured_load():
+        with repository.track_load("slow"):
+            measuring.set()
+            repository.release.wait()
+    holder = threading.Thread(target=measured_load)
+    holder.start()
+    measuring.wait()
+    # fails the test rather than hanging it if the loop blocks
+    timer = threading.Timer(2, repository.release.set)
+    timer.start()
+    reload = asyncio.ensure_future(repository.reload_model("other"))
+    start = time.monotonic()
+    await asyncio.sleep(0.05)
+    assert time.monotonic() - start < 1
+    assert not reload.done()
+    repository.release.set()
+    await reload
+    timer.cancel()
+    holder.join()
+    assert repository.get_state("other") == ModelState.READY
+    assert "other" in repository.model_memory
+
+
+def test_models_snapshot_while_loading():
+    repository = ModelRepository()
+    done = threading.Event()
+
+    def load_many():
+        for i in range(2000):
+            repository.update(DummyLargeModel(f"m{i}"))
+        done.set()
+
+    thread = threading.Thread(target=load_many)
+    thread.start()
+    while not done.is_set():
+        # iterating the repository mustn't race the loads adding models
+        assert len(repository.index()) <= 2000
+        assert len(list(repository.get_models().values())) <= 2000
+    thread.join()
+    assert len(repository.get_models()) == 2000
+
+
+class DummySlowModelRepository(ModelRepository):
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+        self.loads = 0
+
+    def load_model(self, name: str) -> bool:
+        self.loads += 1
+        self.release.wait()
+        if name == "broken":
+            raise RuntimeError("corrupted model file")
+        model = DummyLargeModel(name)
+        model.ready = True
+        self.update(model)
+        return model.ready
+
+
+@pytest.mark.asyncio
+async def test_concurrent_loads_share_one():
+    repository = DummySlowModelRepository()
+    loads = [asyncio.ensure_future(repository.load("slow")) for _ in range(3)]
+    await asyncio.sleep(0.05)
+    # the loop keeps running while the model loads
+    assert repository.get_state("slow") == ModelState.LOADING
+    assert repository.index() == [{"name": "slow", "state": "LOADING"}]
+    repository.release.set()
+    assert await asyncio.gather(*loads) == [True, True, True]
+    assert repository.loads == 1
+    assert repository.get_state("slow") == ModelState.READY
+
+
+@pytest.mark.asyncio
+async def test_load_timeout():
+    repository = DummySlowModelRepository()
+    repository.load_timeout_ms = 0
+    model = DummyLargeModel("lazy")
+    repository.update(model)
+    with pytest.raises(tornado.web.HTTPError) as e:
+        await repository.use_model("lazy")
+    assert e.value.status_code == 503
+    assert repository.get_state("lazy") == ModelState.LOADING
+    repository.load_timeout_ms = None
+    assert await repository.use_model("lazy") is model
+    assert model.ready
+
+
+@pytest.mark.asyncio
+async def test_failed_load():
+    repository = DummySlowModelRepository()
+    repository.release.set()
+    with pytest.raises(RuntimeError):
+        await repository.load("broken")
+    assert repository.get_state("broken") == ModelState.FAILED
+    assert repository.index() == [{"name": "broken", "state": "FAILED",
+                                   "reason": "RuntimeError: corrupted model file"}]
+    repository.unload("broken")
+    assert repository.get_state("broken") == ModelState.UNAVAILABLE
+    assert repository.index() == []
+
+
+class DummyDirModelRepository(ModelRepository):
+    def __init__(self, models_dir, load_seconds):
+        super().__init__(models_dir)
+        self.load_seconds = load_seconds
+        self.threads = set()
+
+    def load_model(self, name: str) -> bool:
+        self.threads.add(threading.current_thread().name)
+        time.sleep(self.load_seconds[name])
+        if name == "broken":
+            raise RuntimeError("corrupted model file")
+        model = DummyLargeModel(name)
+        model.ready = True
+        self.update(model)
+        return model.ready
+
+
+def _models_dir(tmp_path, names):
+    for name in names:
+        (tmp_path / name).mkdir()
+    (tmp_path / "README.md").write_text("not a model")
+    return str(tmp_path)
+
+
+def test_load_models_concurrently(tmp_path):
+    # the later models load faster, they complete first
+    load_seconds = {"a": 0.3, "b": 0.2, "broken": 0.1, "c": 0.1}
+    repository = DummyDirModelRepository(_models_dir(tmp_path, load_seconds), load_seconds)
+    start = time.perf_counter()
+    repository.load_models(workers=4)
+    assert time.perf_counter() - start < sum(load_seconds.values())
+    assert len(repository.threads) > 1
+    assert list(repository.get_models()) == ["a", "b", "c"]
+    assert repository.get_state("broken") == ModelState.FAILED
+    assert all(repository.is_model_ready(name) for name in ("a", "b", "c"))
+
+
+@pytest.mark.asyncio
+async def test_load_models_in_background(tmp_path):
+    load_seconds = {"a": 0.01, "b": 0.2}
+    repository = DummyDirModelRepository(_models_dir(tmp_path, load_seconds), load_seconds)
+    repository.load_models(workers=2, wait=False)
+    assert repository.get_state("b") == ModelState.LOADING
+    model = await repository.use_model("b")
+    assert model is not None and model.ready
+    repository.wait_for_loads()
+    assert list(repository.get_models()) == ["a", "b"]
+    assert [entry["state"] for entry in repository.index()] == ["READY", "READY"]
+
+
+class TestModelEviction:
+    repository = DummyLRUModelRepository(memory_budget=MODEL_SIZE * 3 // 2)
+
+    @pytest.fixture(scope="class")
+    def app(self):
+        server = ModelServer(registered_models=self.repository)
+        return server.create_application()
+
+    async def test_reload_evicted(self, http_server_client):
+        for name in ("EvictModelA", "EvictModelB"):
+            resp = await http_server_client.fetch(f'/v2/repository/models/{name}/load', method="POST", body=b"")
+            assert resp.code == 200
+        assert self.repository.is_model_evicted("EvictModelA")
+
+        resp = await http_server_client.fetch('/v1/models/EvictModelA:predict', method="POST",
+                                              body=json.dumps({"instances": [[1]]}))
+        assert json.loads(resp.body) == {"predictions": [[1]]}
+        assert self.repository.is_model_evicted("EvictModelB")
+        assert self.repository.loads == ["EvictModelA", "EvictModelB", "EvictModelA"]
+
+        resp = await http_server_client.fetch('/v2/repository/index', method="POST", body=b"")
+        assert resp.headers["Content-Type"] == "application/json; charset=UTF-8"
+        assert json.loads(resp.body) == [{"name": "EvictModelA", "state": "READY"},
+                                         {"name": "EvictModelB", "state": "UNAVAILABLE"}]
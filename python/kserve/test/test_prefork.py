@@ -0,0 +1,86 @@
+# Copyright 2022 The KServe Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import os
+
+import pytest
+
+from kserve import Model
+from kserve.model_repository import ModelRepository
+from kserve.prefork import ControlChannel, load_models, pin_cpu
+
+
+class DummyModel(Model):
+    def __init__(self, name):
+        super().__init__(name)
+        self.ready = False
+
+    def load(self):
+        self.ready = True
+        return self.ready
+
+
+class DummyRepository(ModelRepository):
+    def load(self, name: str) -> bool:
+        model = DummyModel(name)
+        model.load()
+        self.update(model)
+        return model.ready
+
+
+def test_load_models():
+    models = ModelRepository()
+    models.update(DummyModel("TestPreforkModel"))
+    load_models(models)
+    assert models.is_model_ready("TestPreforkModel")
+
+
+@pytest.mark.skipif(not hasattr(os, "sched_setaffinity"), reason="requires sched_setaffinity")
+def test_pin_cpu():
+    cpus = os.sched_getaffinity(0)
+    try:
+        cpu = pin_cpu(len(cpus))
+        assert os.sched_getaffinity(0) == {cpu}
+        assert cpu == min(cpus)
+    finally:
+        os.sched_setaffinity(0, cpus)
+
+
+@pytest.mark.asyncio
+async def test_control_channel(tmp_path):
+    repositories = [DummyRepository(), DummyRepository()]
+    channels = [ControlChannel(str(tmp_path), 2) for _ in repositories]
+    for task_id, channel in enumerate(channels):
+        channel.start(task_id, repositories[task_id])
+    try:
+        repositories[0].load("TestControlModel")
+        channels[0].broadcast("load", "TestControlModel")
+        for _ in range(100):
+            if repositories[1].is_model_ready("TestControlModel"):
+                break
+            await asyncio.sleep(0.01)
+        assert repositories[1].is_model_ready("TestControlModel")
+
+        repositories[1].unload("TestControlModel")
+        channels[1].broadcast("unload", "TestControlModel")
+        for _ in range(100):
+            if repositories[0].get_model("TestControlModel") is None:
+                break
+            await asyncio.sleep(0.01)
+        assert repositories[0].get_model("TestControlModel") is None
+    finally:
+        for channel in channels:
+            channel.close()
+    assert not os.listdir(tmp_path)
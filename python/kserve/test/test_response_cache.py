@@ -0,0 +1,114 @@
+# Copyright 2022 The KServe Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import time
+
+import numpy as np
+import pytest
+from prometheus_client import REGISTRY
+
+from kserve import Model, ModelRepository, ModelServer
+from kserve.response_cache import ResponseCache, request_key
+
+
+class DummyCacheModel(Model):
+    def __init__(self, name):
+        super().__init__(name)
+        self.calls = 0
+        self.ready = True
+        self.response_cache = ResponseCache()
+
+    def predict(self, request):
+        self.calls += 1
+        return {"predictions": request["instances"]}
+
+
+def test_request_key():
+    assert request_key("m", {"a": 1, "b": [1, 2]}) == request_key("m", {"b": [1, 2], "a": 1})
+    assert request_key("m", {"a": 1}) != request_key("n", {"a": 1})
+    assert request_key("m", {"a": np.array([1, 2])}) == request_key("m", {"a": [1, 2]})
+    assert request_key("m", b"raw") == request_key("m", b"raw")
+    assert request_key("m", object()) is None
+
+
+def test_lru_eviction():
+    cache = ResponseCache(max_entries=2)
+    cache.put(b"a", {"predictions": [1]})
+    cache.put(b"b", {"predictions": [2]})
+    assert cache.get(b"a") == {"predictions": [1]}
+    cache.put(b"c", {"predictions": [3]})
+    assert cache.get(b"b") is None
+    assert cache.get(b"a") == {"predictions": [1]}
+    assert cache.stats() == {"entries": 2, "bytes": cache.size_bytes, "hits": 2, "misses": 1,
+                             "evictions": 1}
+
+
+def test_byte_bound():
+    cache = ResponseCache(max_bytes=40)
+    cache.put(b"a", {"predictions": [1] * 5})
+    cache.put(b"b", {"predictions": [2] * 5})
+    assert len(cache) == 1 and cache.size_bytes <= 40
+    # larger than the whole cache
+    cache.put(b"c", {"predictions": [3] * 100})
+    assert cache.get(b"c") is None
+
+
+def test_ttl():
+    cache = ResponseCache(ttl_seconds=0.01)
+    cache.put(b"a", {"predictions": [1]})
+    assert cache.get(b"a") is not None
+    time.sleep(0.02)
+    assert cache.get(b"a") is None
+    assert len(cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_model_cache_hit():
+    model = DummyCacheModel("TestModel")
+    response = await model({"instances": [[1, 2]]})
+    response["predictions"].append("modified")
+    assert await model({"instances": [[1, 2]]}) == {"predictions": [[1, 2]]}
+    assert model.calls == 1
+    await model({"instances": [[3, 4]]})
+    assert model.calls == 2
+
+
+class CacheModelRepository(ModelRepository):
+    def load(self, name: str) -> bool:
+        return True
+
+
+class TestResponseCacheInvalidation:
+
+    @pytest.fixture(scope="class")
+    def app(self):  # pylint: disable=no-self-use
+        server = ModelServer(registered_models=CacheModelRepository())
+        server.register_model(DummyCacheModel("CacheModel"))
+        return server.create_application()
+
+    async def test_load_clears_cache(self, http_server_client):
+        def lookups(result):
+            return REGISTRY.get_sample_value("kserve_response_cache_requests_total",
+                                             {"model": "CacheModel", "result": result}) or 0
+        hits, misses = lookups("hit"), lookups("miss")
+        body = json.dumps({"instances": [[1, 2]]})
+        await http_server_client.fetch('/v1/models/CacheModel:predict', method="POST", body=body)
+        await http_server_client.fetch('/v1/models/CacheModel:predict', method="POST", body=body)
+        resp = await http_server_client.fetch('/v2/repository/models/CacheModel/load',
+                                              method="POST", body=b'')
+        assert resp.code == 200
+        await http_server_client.fetch('/v1/models/CacheModel:predict', method="POST", body=body)
+        assert lookups("hit") == hits + 1
+        assert lookups("miss") == misses + 2
@@ -13,11 +13,14 @@
 # limitations under the License.
 
 import os
+import threading
 import unittest.mock as mock
 
+from boto3.s3.transfer import TransferConfig
 from botocore.client import Config
 from botocore import UNSIGNED
 import kserve
+from kserve.storage import CHUNK_SIZE_ENV, DOWNLOAD_WORKERS_ENV
 
 
 def create_mock_obj(path):
@@ -73,7 +76,7 @@ def test_parent_key(mock_storage):
 
     # then
     arg_list = get_call_args(mock_boto3_bucket.download_file.call_args_list)
-    assert arg_list == expected_call_args_list('bar', 'dest_path', paths)
+    assert sorted(arg_list) == sorted(expected_call_args_list('bar', 'dest_path', paths))
 
     mock_boto3_bucket.objects.filter.assert_called_with(Prefix='bar')
 
@@ -91,7 +94,7 @@ def test_no_key(mock_storage):
 
     # then
     arg_list = get_call_args(mock_boto3_bucket.download_file.call_args_list)
-    assert arg_list == expected_call_args_list('', 'dest_path', object_paths)
+    assert sorted(arg_list) == sorted(expected_call_args_list('', 'dest_path', object_paths))
 
     mock_boto3_bucket.objects.filter.assert_called_with(Prefix='')
 
@@ -134,6 +137,32 @@ def test_full_name_key_root_bucket_dir(mock_storage):
     mock_boto3_bucket.objects.filter.assert_called_with(Prefix=object_key)
 
 
+@mock.patch('kserve.storage.boto3')
+def test_concurrent_download(mock_storage):
+
+    # given
+    object_paths = ['model/0.bin', 'model/1.bin', 'model/2.bin']
+    mock_boto3_bucket = create_mock_boto3_bucket(mock_storage, object_paths)
+    # every download waits for the others, so they only complete if all run at once
+    barrier = threading.Barrier(len(object_paths), timeout=10)
+    mock_boto3_bucket.download_file.side_effect = lambda *args, **kwargs: barrier.wait()
+
+    # when
+    with mock.patch.dict(os.environ, {DOWNLOAD_WORKERS_ENV: "3", CHUNK_SIZE_ENV: "16"}):
+        kserve.Storage._download_s3('s3://foo/model', 'dest_path')
+
+    # then
+    assert mock_boto3_bucket.download_file.call_count == 3
+    for _, kwargs in mock_boto3_bucket.download_file.call_args_list:
+        assert isinstance(kwargs['Config'], TransferConfig)
+        assert kwargs['Config'].multipart_chunksize == 16 * 1024 * 1024
+    (_, list_kwargs), (_, kwargs) = mock_storage.resource.call_args_list
+    # the listing keeps botocore's retries, transfer.retry retries the downloads
+    assert list_kwargs['config'] is None
+    assert kwargs['config'].max_pool_connections >= 3
+    assert kwargs['config'].retries['total_max_attempts'] == 1
+
+
 AWS_TEST_CREDENTIALS = {"AWS_ACCESS_KEY_ID": "testing",
                         "AWS_SECRET_ACCESS_KEY": "testing",
                         "AWS_SECURITY_TOKEN": "testing",
@@ -19,12 +19,15 @@ from unittest import mock
 import avro.io
 import avro.schema
 import io
+import numpy as np
 import pytest
 from cloudevents.http import CloudEvent, to_binary, to_structured
 from kserve import Model
 from kserve import ModelServer
 from kserve import ModelRepository
+from kserve.utils.binary_data import encode_binary_response
 from tornado.httpclient import HTTPClientError
+from tritonclient.utils import deserialize_bytes_tensor
 from ray import serve
 
 
@@ -144,6 +147,23 @@ class DummyAvroCEModel(Model):
         return {"predictions": [[request['name'], request['favorite_number'], request['favorite_color']]]}
 
 
+class DummyV2Model(Model):
+    def __init__(self, name):
+        super().__init__(name)
+        self.name = name
+        self.ready = False
+
+    def load(self):
+        self.ready = True
+
+    async def predict(self, request):
+        infer_input = request["inputs"][0]
+        data = np.asarray(infer_input["data"], dtype=np.float32).reshape(infer_input["shape"])
+        return {"model_name": self.name,
+                "outputs": [{"name": "output-0", "shape": list(data.shape), "datatype": "FP32",
+                             "data": (data * 2).tolist()}]}
+
+
 class DummyModelRepository(ModelRepository):
     def __init__(self, test_load_success: bool):
         super().__init__()
@@ -189,7 +209,7 @@ class TestTFHttpServer:
                                               method="POST",
                                               body=b'{"instances":[[1,2]]}')
         assert resp.code == 200
-        assert resp.body == b'{"predictions": [[1, 2]]}'
+        assert json.loads(resp.body) == {"predictions": [[1, 2]]}
         assert resp.headers['content-type'] == "application/json; charset=UTF-8"
 
     async def test_explain(self, http_server_client):
@@ -197,7 +217,7 @@ class TestTFHttpServer:
                                               method="POST",
                                               body=b'{"instances":[[1,2]]}')
         assert resp.code == 200
-        assert resp.body == b'{"predictions": [[1, 2]]}'
+        assert json.loads(resp.body) == {"predictions": [[1, 2]]}
         assert resp.headers['content-type'] == "application/json; charset=UTF-8"
 
     async def test_list(self, http_server_client):
@@ -246,7 +266,7 @@ class TestRayServer:
                                               method="POST",
                                               body=b'{"instances":[[1,2]]}')
         assert resp.code == 200
-        assert resp.body == b'{"predictions": [[1, 2]]}'
+        assert json.loads(resp.body) == {"predictions": [[1, 2]]}
         assert resp.headers['content-type'] == "application/json; charset=UTF-8"
 
     async def test_explain(self, http_server_client):
@@ -254,7 +274,7 @@ class TestRayServer:
                                               method="POST",
                                               body=b'{"instances":[[1,2]]}')
         assert resp.code == 200
-        assert resp.body == b'{"predictions": [[1, 2]]}'
+        assert json.loads(resp.body) == {"predictions": [[1, 2]]}
         assert resp.headers['content-type'] == "application/json; charset=UTF-8"
 
 
@@ -268,7 +288,7 @@ class TestTFHttpServerLoadAndUnLoad:
         resp = await http_server_client.fetch('/v2/repository/models/model/load',
                                               method="POST", body=b'')
         assert resp.code == 200
-        assert resp.body == b'{"name": "model", "load": true}'
+        assert resp.body == b'{"name": "model", "load": true, "state": "READY"}'
 
     async def test_unload(self, http_server_client):
         resp = await http_server_client.fetch('/v2/repository/models/model/unload',
@@ -311,6 +331,86 @@ class TestTFHttpServerModelNotLoaded:
         assert excinfo.value.code == 503
 
 
+class TestTFHttpServerV2BinaryData:
+    @pytest.fixture(scope="class")
+    def app(self):  # pylint: disable=no-self-use
+        model = DummyV2Model("TestModel")
+        model.load()
+        server = ModelServer()
+        server.register_model(model)
+        return server.create_application()
+
+    async def test_binary_input_binary_output(self, http_server_client):
+        data = np.arange(6, dtype=np.float32).reshape(2, 3)
+        header = json.dumps({
+            "inputs": [{"name": "input-0", "shape": [2, 3], "datatype": "FP32",
+                        "parameters": {"binary_data_size": data.nbytes}}],
+            "outputs": [{"name": "output-0", "parameters": {"binary_data": True}}]
+        }).encode()
+        resp = await http_server_client.fetch('/v2/models/TestModel/infer',
+                                              method="POST",
+                                              headers={"Inference-Header-Content-Length": str(len(header))},
+                                              body=header + data.tobytes())
+        assert resp.code == 200
+        assert resp.headers['content-type'] == "application/octet-stream"
+        header_length = int(resp.headers['inference-header-content-length'])
+        response = json.loads(resp.body[:header_length])
+        output = response["outputs"][0]
+        assert "data" not in output
+        assert output["parameters"]["binary_data_size"] == data.nbytes
+        result = np.frombuffer(resp.body[header_length:], dtype=np.float32).reshape(output["shape"])
+        np.testing.assert_array_equal(result, data * 2)
+
+    async def test_binary_input_json_output(self, http_server_client):
+        data = np.arange(2, dtype=np.float32).reshape(1, 2)
+        header = json.dumps({
+            "inputs": [{"name": "input-0", "shape": [1, 2], "datatype": "FP32",
+                        "parameters": {"binary_data_size": data.nbytes}}]
+        }).encode()
+        resp = await http_server_client.fetch('/v2/models/TestModel/infer',
+                                              method="POST",
+                                              headers={"Inference-Header-Content-Length": str(len(header))},
+                                              body=header + data.tobytes())
+        assert resp.code == 200
+        assert json.loads(resp.body)["outputs"][0]["data"] == [[0.0, 2.0]]
+
+    async def test_json_input_binary_output(self, http_server_client):
+        body = json.dumps({
+            "inputs": [{"name": "input-0", "shape": [1, 2], "datatype": "FP32", "data": [1, 2]}],
+            "parameters": {"binary_data_output": True}
+        }).encode()
+        resp = await http_server_client.fetch('/v2/models/TestModel/infer', method="POST", body=body)
+        assert resp.code == 200
+        header_length = int(resp.headers['inference-header-content-length'])
+        assert np.frombuffer(resp.body[header_length:], dtype=np.float32).tolist() == [2.0, 4.0]
+
+    async def test_binary_input_size_mismatch(self, http_server_client):
+        header = json.dumps({
+            "inputs": [{"name": "input-0", "shape": [1, 2], "datatype": "FP32",
+                        "parameters": {"binary_data_size": 8}}]
+        }).encode()
+        with pytest.raises(HTTPClientError) as err:
+            _ = await http_server_client.fetch('/v2/models/TestModel/infer',
+                                               method="POST",
+                                               headers={"Inference-Header-Content-Length": str(len(header))},
+                                               body=header + b'1234')
+        assert err.value.code == 400
+
+    def test_encode_bytes_output(self):
+        for datatype in ("BYTES", None):
+            output = {"name": "output-0", "shape": [2], "data": ["cat", "dog"]}
+            if datatype:
+                output["datatype"] = datatype
+            response = {"outputs": [output]}
+            body, header_length = encode_binary_response(response, True, set())
+            header = json.loads(body[:header_length])
+            assert header["outputs"][0]["datatype"] == "BYTES"
+            assert "data" not in header["outputs"][0]
+            # the response of the model is not modified
+            assert response == {"outputs": [output]} and output["data"] == ["cat", "dog"]
+            assert deserialize_bytes_tensor(body[header_length:]).tolist() == [b"cat", b"dog"]
+
+
 class TestTFHttpServerCloudEvent:
     @pytest.fixture(scope="class")
     def app(self):  # pylint: disable=no-self-use
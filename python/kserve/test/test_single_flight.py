@@ -0,0 +1,89 @@
+# Copyright 2022 The KServe Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+
+import pytest
+from prometheus_client import REGISTRY
+
+from kserve import Model
+from kserve.single_flight import SingleFlight
+
+
+class DummySlowModel(Model):
+    def __init__(self, name):
+        super().__init__(name)
+        self.ready = True
+        self.calls = 0
+
+    async def predict(self, request):
+        self.calls += 1
+        await asyncio.sleep(0.05)
+        if request["instances"] == [["fail"]]:
+            raise ValueError("failed")
+        return {"predictions": request["instances"]}
+
+
+@pytest.mark.asyncio
+async def test_single_flight_shares_result():
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"value": [1]}
+
+    flight = SingleFlight()
+    results = await asyncio.gather(*[flight.do(b"key", compute) for _ in range(3)])
+    assert len(calls) == 1
+    assert results == [{"value": [1]}] * 3
+    assert results[0] is not results[1]
+    assert len(flight) == 0
+    # nothing is kept once the call completed
+    await flight.do(b"key", compute)
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_single_flight_cancelled_leader():
+    async def compute():
+        await asyncio.sleep(0.01)
+        return 1
+
+    flight = SingleFlight()
+    leader = asyncio.ensure_future(flight.do(b"key", compute))
+    await asyncio.sleep(0)
+    follower = asyncio.ensure_future(flight.do(b"key", compute))
+    await asyncio.sleep(0)
+    leader.cancel()
+    assert await follower == 1
+
+
+@pytest.mark.asyncio
+async def test_model_coalesces_requests():
+    model = DummySlowModel("CoalescingModel")
+    model.coalesce_requests = True
+    coalesced = REGISTRY.get_sample_value("kserve_coalesced_requests_total",
+                                          {"model": "CoalescingModel"}) or 0
+    responses = await asyncio.gather(model({"instances": [[1, 2]]}), model({"instances": [[1, 2]]}),
+                                     model({"instances": [[3, 4]]}))
+    assert responses == [{"predictions": [[1, 2]]}, {"predictions": [[1, 2]]}, {"predictions": [[3, 4]]}]
+    assert model.calls == 2
+    assert REGISTRY.get_sample_value("kserve_coalesced_requests_total",
+                                     {"model": "CoalescingModel"}) == coalesced + 1
+
+    results = await asyncio.gather(model({"instances": [["fail"]]}), model({"instances": [["fail"]]}),
+                                   return_exceptions=True)
+    assert all(isinstance(result, ValueError) for result in results)
+    assert model.calls == 3
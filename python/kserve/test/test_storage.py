@@ -12,17 +12,25 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import base64
 import io
 import os
 import tempfile
 import binascii
+import hashlib
 import unittest.mock as mock
 import mimetypes
+import shutil
+import tarfile
 from pathlib import Path
 
 import botocore
+import google_crc32c
 import kserve
 import pytest
+from kserve import transfer
+from kserve.storage import CHUNK_SIZE_ENV, SYNC_DIR_ENV, SYNC_MANIFEST
+from test.test_s3_storage import create_mock_boto3_bucket
 
 STORAGE_MODULE = 'kserve.storage'
 HTTPS_URI_TARGZ = 'https://foo.bar/model.tar.gz'
@@ -139,10 +147,42 @@ def test_mock_gcs(mock_storage):
     gcs_path = 'gs://foo/bar'
     mock_obj = mock.MagicMock()
     mock_obj.name = 'mock.object'
+    mock_obj.size = 4
     mock_storage.Client().bucket().list_blobs().__iter__.return_value = [mock_obj]
     assert kserve.Storage.download(gcs_path)
 
 
+def test_gcs_sliced_download():
+    data = bytes(range(10))
+
+    def create_blob(name, generation=None):
+        def download_to_file(f, start, end):
+            assert generation == 7
+            f.write(data[start:end + 1])
+        return mock.MagicMock(download_to_file=download_to_file)
+
+    mock_bucket = mock.MagicMock()
+    mock_bucket.blob.side_effect = create_blob
+    crc32c = google_crc32c.Checksum(data)
+    mock_blob = mock.MagicMock(size=len(data), generation=7, crc32c=base64.b64encode(crc32c.digest()).decode())
+    mock_blob.name = 'model.bin'
+    with tempfile.TemporaryDirectory() as out_dir, \
+            mock.patch.dict(os.environ, {CHUNK_SIZE_ENV: str(4 / 1024 / 1024)}):
+        dest_path = os.path.join(out_dir, 'model.bin')
+        kserve.Storage._download_gcs_blob(mock_bucket, mock_blob, dest_path)
+        with open(dest_path, 'rb') as f:
+            assert f.read() == data
+    # 3 slices of at most 4 bytes
+    assert mock_bucket.blob.call_count == 3
+    mock_blob.download_to_filename.assert_not_called()
+
+    mock_blob.crc32c = base64.b64encode(google_crc32c.Checksum(data[::-1]).digest()).decode()
+    with tempfile.TemporaryDirectory() as out_dir, \
+            mock.patch.dict(os.environ, {CHUNK_SIZE_ENV: str(4 / 1024 / 1024)}), \
+            pytest.raises(transfer.ChecksumError):
+        kserve.Storage._download_gcs_blob(mock_bucket, mock_blob, os.path.join(out_dir, 'model.bin'))
+
+
 def test_storage_blob_exception():
     blob_path = 'https://accountname.blob.core.windows.net/container/some/blob/'
     with pytest.raises(Exception):
@@ -179,6 +219,165 @@ def test_no_permission_buckets(mock_connection, mock_boto3):
         kserve.Storage.download(bad_s3_path)
 
 
+def _mock_s3_archive(mock_boto3, key, write):
+    mock_obj = mock.MagicMock()
+    mock_obj.key = key
+    mock_s3_bucket = mock.MagicMock()
+    mock_s3_bucket.objects.filter.return_value = [mock_obj]
+    mock_s3_bucket.download_fileobj.side_effect = lambda key, f, **kwargs: write(f)
+    mock_boto3.resource.return_value.Bucket.return_value = mock_s3_bucket
+    return mock_s3_bucket
+
+
+@mock.patch(STORAGE_MODULE + '.boto3')
+def test_s3_archive_extracted_while_downloading(mock_boto3):
+    def write(f):
+        for i in range(0, len(FILE_TAR_GZ_RAW), 16):
+            f.write(FILE_TAR_GZ_RAW[i:i + 16])
+    mock_s3_bucket = _mock_s3_archive(mock_boto3, 'models/model.tar.gz', write)
+
+    with tempfile.TemporaryDirectory() as out_dir:
+        kserve.Storage.download('s3://foo/models/model.tar.gz', out_dir)
+        assert os.listdir(out_dir) == ['model.pth']
+    mock_s3_bucket.download_file.assert_not_called()
+
+
+@mock.patch(STORAGE_MODULE + '.boto3')
+def test_s3_archive_download_error(mock_boto3):
+    def write(f):
+        f.write(FILE_TAR_GZ_RAW[:32])
+        raise ConnectionError("connection reset")
+    mock_s3_bucket = _mock_s3_archive(mock_boto3, 'model.tar.gz', write)
+
+    with tempfile.TemporaryDirectory() as out_dir, pytest.raises(ConnectionError), \
+            mock.patch.object(transfer, 'BACKOFF_SECONDS', 0), \
+            mock.patch.dict(os.environ, {transfer.ATTEMPTS_ENV: "2"}):
+        kserve.Storage.download('s3://foo/model.tar.gz', out_dir)
+    # the extraction is started over
+    assert mock_s3_bucket.download_fileobj.call_count == 2
+
+
+@mock.patch(STORAGE_MODULE + '.boto3')
+def test_s3_archive_invalid(mock_boto3):
+    # more than the pipe buffer, the download has to be stopped once the extraction fails
+    _mock_s3_archive(mock_boto3, 'model.tar', lambda f: f.write(b'\xff' * (1 << 22)))
+
+    with tempfile.TemporaryDirectory() as out_dir, pytest.raises(RuntimeError):
+        kserve.Storage.download('s3://foo/model.tar', out_dir)
+
+
+@mock.patch(STORAGE_MODULE + '.boto3')
+def test_s3_etag_verified(mock_boto3):
+    mock_s3_bucket = create_mock_boto3_bucket(mock_boto3, ['model.bin'])
+    mock_s3_bucket.objects.filter.return_value[0].e_tag = '"%s"' % hashlib.md5(b'model').hexdigest()
+    mock_s3_bucket.Object.return_value = mock.MagicMock(server_side_encryption=None, sse_customer_algorithm=None)
+    content = [b'truncated', b'model']
+
+    def download_fileobj(key, f, **kwargs):
+        f.write(content.pop(0))
+    mock_s3_bucket.download_fileobj.side_effect = download_fileobj
+
+    with tempfile.TemporaryDirectory() as out_dir, mock.patch.object(transfer, 'BACKOFF_SECONDS', 0):
+        kserve.Storage.download('s3://foo/model.bin', out_dir)
+        assert Path(out_dir, 'model.bin').read_bytes() == b'model'
+    # downloaded again after the checksum mismatch, hashed as it was written
+    assert mock_s3_bucket.download_fileobj.call_count == 2
+    mock_s3_bucket.download_file.assert_not_called()
+
+
+@mock.patch(STORAGE_MODULE + '.boto3')
+def test_s3_etag_of_encrypted_object(mock_boto3):
+    mock_s3_bucket = create_mock_boto3_bucket(mock_boto3, ['model.bin'])
+    mock_s3_bucket.objects.filter.return_value[0].e_tag = '"%s"' % hashlib.md5(b'plaintext').hexdigest()
+    # the ETag of SSE-KMS objects isn't their MD5
+    mock_s3_bucket.Object.return_value = mock.MagicMock(server_side_encryption='aws:kms', sse_customer_algorithm=None)
+    mock_s3_bucket.download_fileobj.side_effect = lambda key, f, **kwargs: f.write(b'model')
+
+    with tempfile.TemporaryDirectory() as out_dir:
+        kserve.Storage.download('s3://foo/model.bin', out_dir)
+    assert mock_s3_bucket.download_fileobj.call_count == 1
+
+
+@mock.patch(STORAGE_MODULE + '.boto3')
+def test_s3_sync(mock_boto3):
+    mock_s3_bucket = create_mock_boto3_bucket(mock_boto3, [])
+
+    def list_objects(objects):
+        mock_objs = []
+        for key, etag in objects.items():
+            mock_obj = mock.MagicMock(key=key, e_tag=etag)
+            mock_objs.append(mock_obj)
+        mock_s3_bucket.objects.filter.return_value = mock_objs
+
+    def download_file(key, target, **kwargs):
+        Path(target).write_text(key)
+    mock_s3_bucket.download_file.side_effect = download_file
+
+    with tempfile.TemporaryDirectory() as sync_dir, mock.patch.dict(os.environ, {SYNC_DIR_ENV: sync_dir}):
+        list_objects({'model/checkpoint.bin': 'v1', 'model/vocab.txt': 'v1', 'model/old/config.json': 'v1'})
+        out_dir = kserve.Storage.download('s3://foo/model', sync=True)
+        assert out_dir.startswith(sync_dir)
+        assert mock_s3_bucket.download_file.call_count == 3
+
+        # a new checkpoint, an unchanged vocab, a config moved
+        list_objects({'model/checkpoint.bin': 'v2', 'model/vocab.txt': 'v1', 'model/config.json': 'v1'})
+        mock_s3_bucket.download_file.reset_mock()
+        assert kserve.Storage.download('s3://foo/model', sync=True) == out_dir
+        downloaded = sorted(args[0] for args, _ in mock_s3_bucket.download_file.call_args_list)
+        assert downloaded == ['model/checkpoint.bin', 'model/config.json']
+        assert sorted(os.listdir(out_dir)) == [SYNC_MANIFEST, 'checkpoint.bin', 'config.json', 'vocab.txt']
+
+        # up to date
+        mock_s3_bucket.download_file.reset_mock()
+        kserve.Storage.download('s3://foo/model', sync=True)
+        mock_s3_bucket.download_file.assert_not_called()
+
+        # without sync every object is downloaded into a new directory
+        tmp_dir = kserve.Storage.download('s3://foo/model')
+        shutil.rmtree(tmp_dir)
+        assert tmp_dir != out_dir
+        assert mock_s3_bucket.download_file.call_count == 3
+
+
+def _tar(files):
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode='w:gz') as archive:
+        for name, content in files.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            archive.addfile(info, io.BytesIO(content))
+    return buf.getvalue()
+
+
+@mock.patch(STORAGE_MODULE + '.boto3')
+def test_s3_sync_archive(mock_boto3):
+    versions = {'v1': _tar({'model/weights.bin': b'1', 'model/old.bin': b'1'}),
+                'v2': _tar({'model/weights.bin': b'2', 'config.json': b'{}'})}
+    mock_s3_bucket = _mock_s3_archive(mock_boto3, 'model.tar.gz', None)
+    mock_obj = mock_s3_bucket.objects.filter.return_value[0]
+    mock_obj.e_tag = 'v1'
+    mock_s3_bucket.download_fileobj.side_effect = lambda key, f, **kwargs: f.write(versions[mock_obj.e_tag])
+
+    with tempfile.TemporaryDirectory() as sync_dir, mock.patch.dict(os.environ, {SYNC_DIR_ENV: sync_dir}):
+        out_dir = kserve.Storage.download('s3://foo/model.tar.gz', sync=True)
+        # the processes syncing the same URI take turns
+        assert os.path.exists(out_dir + ".lock")
+        assert sorted(os.listdir(os.path.join(out_dir, 'model'))) == ['old.bin', 'weights.bin']
+
+        mock_obj.e_tag = 'v2'
+        kserve.Storage.download('s3://foo/model.tar.gz', sync=True)
+        # the files of the previous archive are not left behind
+        assert sorted(os.listdir(out_dir)) == [SYNC_MANIFEST, 'config.json', 'model']
+        assert os.listdir(os.path.join(out_dir, 'model')) == ['weights.bin']
+        assert Path(out_dir, 'model', 'weights.bin').read_bytes() == b'2'
+
+        # up to date
+        mock_s3_bucket.download_fileobj.reset_mock()
+        kserve.Storage.download('s3://foo/model.tar.gz', sync=True)
+        mock_s3_bucket.download_fileobj.assert_not_called()
+        assert Path(out_dir, 'config.json').exists()
+
+
 def test_unpack_tar_file():
     out_dir = '.'
     tar_file = os.path.join(out_dir, "model.tgz")
@@ -0,0 +1,86 @@
+# Copyright 2022 The KServe Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+
+import numpy as np
+import pytest
+from tornado.httpclient import HTTPClientError
+
+from kserve import Model, ModelRepository, ModelServer
+
+
+class DummyStreamModel(Model):
+    def __init__(self, name):
+        super().__init__(name)
+        self.ready = True
+        self.batches = []
+
+    def predict(self, request):
+        instances = request["instances"]
+        self.batches.append(len(instances))
+        if "fail" in instances:
+            raise ValueError("failed instance")
+        # streamed without a tolist() round trip
+        return {"predictions": np.asarray(instances) * 2}
+
+
+def _ndjson(rows):
+    return b"".join(json.dumps(row).encode() + b"\n" for row in rows)
+
+
+def _lines(body):
+    return [json.loads(line) for line in body.splitlines()]
+
+
+class TestInferStream:
+    model = DummyStreamModel("StreamModel")
+
+    @pytest.fixture(scope="class")
+    def app(self):
+        server = ModelServer(registered_models=ModelRepository())
+        server.register_model(self.model)
+        return server.create_application()
+
+    async def test_stream(self, http_server_client):
+        self.model.batches.clear()
+        resp = await http_server_client.fetch('/v2/models/StreamModel/infer_stream?batch_size=3',
+                                              method="POST", body=_ndjson(range(10)))
+        assert resp.code == 200
+        assert resp.headers["Content-Type"] == "application/x-ndjson"
+        assert _lines(resp.body) == [i * 2 for i in range(10)]
+        assert self.model.batches == [3, 3, 3, 1]
+
+    async def test_stream_without_trailing_newline(self, http_server_client):
+        resp = await http_server_client.fetch('/v2/models/StreamModel/infer_stream',
+                                              method="POST", body=b'1\n\n2')
+        assert _lines(resp.body) == [2, 4]
+
+    async def test_invalid_line(self, http_server_client):
+        with pytest.raises(HTTPClientError) as e:
+            await http_server_client.fetch('/v2/models/StreamModel/infer_stream',
+                                           method="POST", body=b'1\n{invalid\n')
+        assert e.value.code == 400
+
+    async def test_error_mid_stream(self, http_server_client):
+        resp = await http_server_client.fetch('/v2/models/StreamModel/infer_stream?batch_size=2',
+                                              method="POST", body=_ndjson([1, 2, 3, 4, "fail", 6]))
+        lines = _lines(resp.body)
+        assert lines[:2] == [2, 4]
+        assert lines[-1] == {"error": "failed instance"}
+
+    async def test_unknown_model(self, http_server_client):
+        with pytest.raises(HTTPClientError) as e:
+            await http_server_client.fetch('/v2/models/Unknown/infer_stream', method="POST", body=b'1\n')
+        assert e.value.code == 404
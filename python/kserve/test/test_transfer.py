@@ -0,0 +1,156 @@
+# Copyright 2022 The KServe Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import hashlib
+import io
+import os
+import tempfile
+import unittest.mock as mock
+
+import botocore.exceptions
+import google_crc32c
+import pytest
+import urllib3
+from prometheus_client import REGISTRY
+
+import kserve
+from kserve import transfer
+
+DATA = bytes(range(256)) * 64
+
+
+class FailingRaw(io.BytesIO):
+    """Response body failing with a connection error once fail_at bytes were read"""
+
+    def __init__(self, data, fail_at):
+        super().__init__(data)
+        self.fail_at = fail_at
+
+    def read(self, size=-1):
+        if self.tell() >= self.fail_at:
+            raise urllib3.exceptions.ProtocolError("Connection broken")
+        return super().read(min(size, self.fail_at - self.tell()))
+
+
+class MockResponse:
+    def __init__(self, raw, status_code=200, headers=None):
+        self.raw = raw
+        self.status_code = status_code
+        self.headers = {'Content-Type': 'application/octet-stream', **(headers or {})}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, ex_type, ex_val, traceback):
+        pass
+
+    def close(self):
+        pass
+
+
+def _sample(name):
+    return REGISTRY.get_sample_value(name) or 0
+
+
+@pytest.fixture(autouse=True)
+def no_backoff():
+    with mock.patch.object(transfer, 'BACKOFF_SECONDS', 0):
+        yield
+
+
+def test_http_download_resumed():
+    first = MockResponse(FailingRaw(DATA, 1000), headers={'Content-Length': str(len(DATA))})
+    resumed = MockResponse(io.BytesIO(DATA[1000:]), status_code=206)
+    retries = _sample('kserve_storage_download_retries_total')
+    resumed_bytes = _sample('kserve_storage_resumed_bytes_total')
+    uri = 'https://foo.bar/model.bin#sha256=' + hashlib.sha256(DATA).hexdigest()
+
+    with tempfile.TemporaryDirectory() as out_dir, \
+            mock.patch('requests.get', side_effect=[first, resumed]) as mock_get:
+        kserve.Storage.download(uri, out_dir)
+        with open(os.path.join(out_dir, 'model.bin'), 'rb') as f:
+            assert f.read() == DATA
+    _, kwargs = mock_get.call_args
+    assert kwargs['headers']['Range'] == 'bytes=1000-'
+    assert _sample('kserve_storage_download_retries_total') - retries == 1
+    assert _sample('kserve_storage_resumed_bytes_total') - resumed_bytes == 1000
+
+
+def test_http_download_range_not_supported():
+    first = MockResponse(FailingRaw(DATA, 1000), headers={'Content-Length': str(len(DATA))})
+    # the server ignores the range and sends the whole body again
+    restarted = MockResponse(io.BytesIO(DATA))
+    reader = transfer.ResumableHTTPReader('https://foo.bar/model.bin', {}, first, [])
+    with mock.patch('requests.get', return_value=restarted):
+        assert reader.read() == DATA
+
+
+def test_http_truncated_body():
+    # the connection is closed without an error before Content-Length bytes
+    response = MockResponse(io.BytesIO(DATA[:100]), headers={'Content-Length': str(len(DATA))})
+    with mock.patch('requests.get', return_value=MockResponse(io.BytesIO(b''), status_code=206)), \
+            mock.patch.dict(os.environ, {transfer.ATTEMPTS_ENV: "3"}):
+        reader = transfer.ResumableHTTPReader('https://foo.bar/model.bin', {}, response, [])
+        with pytest.raises(EOFError):
+            reader.read()
+
+
+def test_http_checksum_mismatch():
+    response = MockResponse(io.BytesIO(DATA), headers={'Content-MD5': 'AAAAAAAAAAAAAAAAAAAAAA=='})
+    with tempfile.TemporaryDirectory() as out_dir, mock.patch('requests.get', return_value=response), \
+            pytest.raises(transfer.ChecksumError):
+        kserve.Storage.download('https://foo.bar/model.bin', out_dir)
+
+
+def test_retry():
+    fn = mock.MagicMock(side_effect=[ConnectionError(), transfer.ChecksumError("md5"), "done"])
+    assert transfer.retry(fn, 'model.bin') == "done"
+    assert fn.call_count == 3
+
+    fn = mock.MagicMock(side_effect=PermissionError())
+    with pytest.raises(PermissionError):
+        transfer.retry(fn, 'model.bin')
+    assert fn.call_count == 1
+
+
+def test_retry_throttled_s3_requests():
+    throttled = botocore.exceptions.ClientError({"Error": {"Code": "SlowDown"}}, "GetObject")
+    fn = mock.MagicMock(side_effect=[throttled, "done"])
+    assert transfer.retry(fn, 'model.bin') == "done"
+
+    denied = botocore.exceptions.ClientError({"Error": {"Code": "AccessDenied"},
+                                              "ResponseMetadata": {"HTTPStatusCode": 403}}, "GetObject")
+    fn = mock.MagicMock(side_effect=denied)
+    with pytest.raises(botocore.exceptions.ClientError):
+        transfer.retry(fn, 'model.bin')
+    assert fn.call_count == 1
+
+
+def test_crc32c_combine():
+    head, tail = DATA[:1000], DATA[1000:]
+    crc = transfer.crc32c_combine(google_crc32c.value(head), google_crc32c.value(tail), len(tail))
+    assert crc == google_crc32c.value(DATA)
+    assert transfer.crc32c_combine(0, google_crc32c.value(DATA), len(DATA)) == google_crc32c.value(DATA)
+
+
+def test_verify_file():
+    with tempfile.NamedTemporaryFile() as f:
+        f.write(DATA)
+        f.flush()
+        transfer.verify_file(f.name, [transfer.Checksum.from_hex('md5', hashlib.md5(DATA).hexdigest())], 'data')
+        with pytest.raises(transfer.ChecksumError):
+            transfer.verify_file(f.name, [transfer.Checksum.from_hex('md5', hashlib.md5(b'').hexdigest())], 'data')
+    # multipart ETags are not checksums of the content
+    assert transfer.Checksum.from_hex('md5', 'abc-2') is None
@@ -0,0 +1,144 @@
+# Copyright 2022 The KServe Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import asyncio
+import json
+
+import pytest
+from tornado.httpclient import HTTPClientError
+
+from kserve import Model, ModelRepository, ModelServer
+from kserve import warmup
+from kserve.model_repository import ModelState
+
+
+class DummyWarmupModel(Model):
+    def __init__(self, name):
+        super().__init__(name)
+        self.ready = True
+        self.predictions = 0
+        self.release = None
+
+    def preprocess(self, request):
+        # the stored warmup requests must not be modified by the model
+        request["instances"].append([0])
+        return request
+
+    async def predict(self, request):
+        if self.release is not None:
+            await self.release.wait()
+        self.predictions += 1
+        return {"predictions": request["instances"]}
+
+
+def _write_warmup(model_dir, requests):
+    directory = model_dir / warmup.WARMUP_DIR
+    directory.mkdir()
+    for name, request in requests.items():
+        (directory / name).write_text(request if isinstance(request, str) else json.dumps(request))
+
+
+def test_load_requests(tmp_path):
+    assert warmup.load_requests(str(tmp_path)) == []
+    _write_warmup(tmp_path, {"1.json": {"instances": [[2]]}, "0.json": {"inputs": []},
+                             "README.md": "not a request"})
+    assert warmup.load_requests(str(tmp_path)) == [{"inputs": []}, {"instances": [[2]]}]
+
+
+def test_load_invalid_request(tmp_path):
+    _write_warmup(tmp_path, {"0.json": "{"})
+    with pytest.raises(ValueError):
+        warmup.load_requests(str(tmp_path))
+
+
+@pytest.mark.asyncio
+async def test_warmup():
+    model = DummyWarmupModel("TestWarmupModel")
+    assert await model.warmup() is None
+    model.warmup_requests = [{"instances": [[1]]}, {"instances": [[2]]}]
+    model.warmup_iterations = 3
+    seconds = await model.warmup()
+    assert seconds is not None and model.warmup_seconds == seconds
+    assert model.predictions == 6
+    assert model.warmup_requests == [{"instances": [[1]]}, {"instances": [[2]]}]
+    assert not model.warming_up
+
+
+class DummyWarmupModelRepository(ModelRepository):
+    def __init__(self, models_dir="/mnt/models"):
+        super().__init__(models_dir)
+        self.release = asyncio.Event()
+
+    def load_model(self, name: str) -> bool:
+        model = DummyWarmupModel(name)
+        model.warmup_requests = [{"instances": [[1]]}]
+        model.release = self.release
+        self.update(model)
+        return model.ready
+
+
+@pytest.mark.asyncio
+async def test_warmup_on_load():
+    repository = DummyWarmupModelRepository()
+    load = asyncio.ensure_future(repository.load("lazy"))
+    await asyncio.sleep(0.05)
+    assert repository.get_state("lazy") == ModelState.LOADING
+    repository.release.set()
+    assert await load
+    assert repository.get_state("lazy") == ModelState.READY
+    assert repository.get_model("lazy").predictions == 1
+
+
+@pytest.mark.asyncio
+async def test_warmup_on_background_startup_load(tmp_path):
+    (tmp_path / "a").mkdir()
+    repository = DummyWarmupModelRepository(str(tmp_path))
+    repository.release.set()
+    repository.start_warmup()
+    repository.load_models(wait=False)
+    await asyncio.wrap_future(repository._startup["a"])
+    assert repository.get_state("a") == ModelState.READY
+    assert repository.get_model("a").predictions == 1
+
+
+class TestWarmupHealth:
+    model = DummyWarmupModel("TestWarmupHealthModel")
+
+    @pytest.fixture(scope="class")
+    def app(self):
+        server = ModelServer(registered_models=ModelRepository())
+        server.register_model(self.model)
+        return server.create_application()
+
+    async def test_not_ready_while_warming_up(self, http_server_client):
+        self.model.warmup_requests = [{"instances": [[1]]}]
+        self.model.release = asyncio.Event()
+        task = asyncio.ensure_future(self.model.warmup())
+        await asyncio.sleep(0)
+        assert self.model.warming_up
+
+        with pytest.raises(HTTPClientError) as e:
+            await http_server_client.fetch('/v1/models/TestWarmupHealthModel')
+        assert e.value.code == 503
+        assert json.loads(e.value.response.body)["warming_up"]
+        with pytest.raises(HTTPClientError) as e:
+            await http_server_client.fetch('/v1/models/TestWarmupHealthModel:predict', method="POST",
+                                           body=json.dumps({"instances": [[1]]}))
+        assert e.value.code == 503
+
+        self.model.release.set()
+        await task
+        resp = await http_server_client.fetch('/v1/models/TestWarmupHealthModel')
+        assert json.loads(resp.body) == {"name": "TestWarmupHealthModel", "ready": True}
@@ -41,7 +41,9 @@ if __name__ == "__main__":
     except ModelMissingError:
         logging.error(f"fail to load model {args.model_name} from dir {args.model_dir},"
                       f"trying to load from model repository.")
-    model_repository = LightGBMModelRepository(args.model_dir, args.nthread)
+    model_repository = LightGBMModelRepository(args.model_dir, args.nthread, args.model_load_workers,
+                                               args.load_models_in_background)
     # LightGBM doesn't support multi-process, so the number of http server workers should be 1.
+    # Use --execution_mode process to predict in spawned worker processes on all cores instead.
     kfserver = kserve.ModelServer(workers=1, registered_models=model_repository)  # pylint:disable=c-extension-no-member
     kfserver.start([model] if model.ready else [])
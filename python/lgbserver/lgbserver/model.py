@@ -13,6 +13,7 @@
 # limitations under the License.
 
 import kserve
+from kserve import warmup
 import lightgbm as lgb
 from lightgbm import Booster
 import os
@@ -29,6 +30,7 @@ class LightGBMModel(kserve.Model):
                  booster: Booster = None):
         super().__init__(name)
         self.name = name
+        self.platform = "lightgbm"
         self.model_dir = model_dir
         self.nthread = nthread
         if booster is not None:
@@ -36,12 +38,13 @@ class LightGBMModel(kserve.Model):
             self.ready = True
 
     def load(self) -> bool:
-        model_file = os.path.join(
-            kserve.Storage.download(self.model_dir), BOOSTER_FILE)
+        model_path = kserve.Storage.download(self.model_dir)
+        model_file = os.path.join(model_path, BOOSTER_FILE)
         if not os.path.exists(model_file):
             raise ModelMissingError(model_file)
         self._booster = lgb.Booster(params={"nthread": self.nthread},
                                     model_file=model_file)
+        self.warmup_requests = warmup.load_requests(model_path)
         self.ready = True
         return self.ready
 
@@ -53,6 +56,6 @@ class LightGBMModel(kserve.Model):
             inputs = pd.concat(dfs, axis=0)
 
             result = self._booster.predict(inputs)
-            return {"predictions": result.tolist()}
+            return {"predictions": result}
         except Exception as e:
             raise InferenceError(str(e))
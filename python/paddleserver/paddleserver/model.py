@@ -17,6 +17,7 @@ import os
 import numpy as np
 from paddle import inference
 import kserve
+from kserve import warmup
 
 
 class PaddleModel(kserve.Model):
@@ -24,6 +25,7 @@ class PaddleModel(kserve.Model):
     def __init__(self, name: str, model_dir: str):
         super().__init__(name)
         self.name = name
+        self.platform = "paddle"
         self.model_dir = model_dir
         self.ready = False
         self.predictor = None
@@ -54,6 +56,7 @@ class PaddleModel(kserve.Model):
         self.input_tensor = self.predictor.get_input_handle(input_names[0])
         output_names = self.predictor.get_output_names()
         self.output_tensor = self.predictor.get_output_handle(output_names[0])
+        self.warmup_requests = warmup.load_requests(model_path)
 
         self.ready = True
         return self.ready
@@ -69,6 +72,6 @@ class PaddleModel(kserve.Model):
         try:
             self.input_tensor.copy_from_cpu(inputs)
             self.predictor.run()
-            return {"predictions": self.output_tensor.copy_to_cpu().tolist()}
+            return {"predictions": self.output_tensor.copy_to_cpu()}
         except Exception as e:
             raise Exception("Failed to predict %s" % e) from e
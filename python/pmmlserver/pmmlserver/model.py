@@ -15,6 +15,7 @@
 import os
 
 import kserve
+from kserve import warmup
 from jpmml_evaluator import make_evaluator
 from jpmml_evaluator.py4j import launch_gateway, Py4JBackend
 from typing import Dict
@@ -28,6 +29,7 @@ class PmmlModel(kserve.Model):
     def __init__(self, name: str, model_dir: str):
         super().__init__(name)
         self.name = name
+        self.platform = "pmml"
         self.model_dir = model_dir
         self.ready = False
         self.evaluator = None
@@ -45,6 +47,8 @@ class PmmlModel(kserve.Model):
                 self._backend = Py4JBackend(self._gateway)
                 self.evaluator = make_evaluator(self._backend, path).verify()
                 self.input_fields = [inputField.getName() for inputField in self.evaluator.getInputFields()]
+                # the first evaluations run in the JVM's interpreter until they are JIT compiled
+                self.warmup_requests = warmup.load_requests(model_path)
                 self.ready = True
                 break
         return self.ready
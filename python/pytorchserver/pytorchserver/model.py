@@ -13,6 +13,7 @@
 # limitations under the License.
 
 import kserve
+from kserve import warmup
 import os
 from typing import Dict
 import torch
@@ -26,6 +27,7 @@ class PyTorchModel(kserve.Model):
     def __init__(self, name: str, model_class_name: str, model_dir: str):
         super().__init__(name)
         self.name = name
+        self.platform = "pytorch"
         self.model_class_name = model_class_name
         self.model_dir = model_dir
         self.ready = False
@@ -57,6 +59,7 @@ class PyTorchModel(kserve.Model):
         self.model = model_class().to(self.device)
         self.model.load_state_dict(torch.load(model_file, map_location=self.device))
         self.model.eval()
+        self.warmup_requests = warmup.load_requests(model_file_dir)
         self.ready = True
         return self.ready
 
@@ -69,6 +72,6 @@ class PyTorchModel(kserve.Model):
                 raise TypeError(
                     "Failed to initialize Torch Tensor from inputs: %s, %s" % (e, inputs))
             try:
-                return {"predictions":  self.model(inputs).tolist()}
+                return {"predictions": self.model(inputs).cpu().numpy()}
             except Exception as e:
                 raise Exception("Failed to predict %s" % e)
@@ -36,4 +36,4 @@ def test_model():
 
     request = {"instances": images[0:1].tolist()}
     response = server.predict(request)
-    assert isinstance(response["predictions"][0], list)
+    assert response["predictions"].ndim == 2
@@ -38,4 +38,5 @@ if __name__ == "__main__":
         logging.error(f"fail to locate model file for model {args.model_name} under dir {args.model_dir},"
                       f"trying loading from model repository.")
 
-    kserve.ModelServer(registered_models=SKLearnModelRepository(args.model_dir)).start([model] if model.ready else [])
+    model_repository = SKLearnModelRepository(args.model_dir, args.model_load_workers, args.load_models_in_background)
+    kserve.ModelServer(registered_models=model_repository).start([model] if model.ready else [])
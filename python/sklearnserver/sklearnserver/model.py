@@ -17,6 +17,7 @@ import kserve
 import joblib
 import pathlib
 from typing import Dict
+from kserve import warmup
 from kserve.model import ModelMissingError, InferenceError
 
 MODEL_BASENAME = "model"
@@ -28,6 +29,7 @@ class SKLearnModel(kserve.Model):  # pylint:disable=c-extension-no-member
     def __init__(self, name: str, model_dir: str):
         super().__init__(name)
         self.name = name
+        self.platform = "sklearn"
         self.model_dir = model_dir
         self.ready = False
 
@@ -41,6 +43,7 @@ class SKLearnModel(kserve.Model):  # pylint:disable=c-extension-no-member
             raise RuntimeError('More than one model file is detected, '
                                f'Only one is allowed within model_dir: {existing_paths}')
         self._model = joblib.load(existing_paths[0])
+        self.warmup_requests = warmup.load_requests(model_path)
         self.ready = True
         return self.ready
 
@@ -49,9 +52,9 @@ class SKLearnModel(kserve.Model):  # pylint:disable=c-extension-no-member
         try:
             if os.environ.get(ENV_PREDICT_PROBA, "false").lower() == "true" and \
                     hasattr(self._model, "predict_proba"):
-                result = self._model.predict_proba(instances).tolist()
+                result = self._model.predict_proba(instances)
             else:
-                result = self._model.predict(instances).tolist()
+                result = self._model.predict(instances)
             return {"predictions": result}
         except Exception as e:
             raise InferenceError(str(e))
@@ -13,18 +13,17 @@
 # limitations under the License.
 
 import os
+from typing import Optional
 from kserve.model_repository import ModelRepository, MODEL_MOUNT_DIRS
 from sklearnserver import SKLearnModel
 
 
 class SKLearnModelRepository(ModelRepository):
 
-    def __init__(self, model_dir: str = MODEL_MOUNT_DIRS):
+    def __init__(self, model_dir: str = MODEL_MOUNT_DIRS, load_workers: Optional[int] = None,
+                 load_in_background: bool = False):
         super().__init__(model_dir)
-        self.load_models()
-
-    async def load(self, name: str) -> bool:
-        return self.load_model(name)
+        self.load_models(load_workers, wait=not load_in_background)
 
     def load_model(self, name: str) -> bool:
         model = SKLearnModel(name, os.path.join(self.models_dir, name))
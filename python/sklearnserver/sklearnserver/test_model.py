@@ -46,7 +46,7 @@ def _run_pickle_model(model_dir, model_name):
     model.load()
     request = data[0:1].tolist()
     response = model.predict({"instances": request})
-    assert response["predictions"] == [0]
+    assert response["predictions"].tolist() == [0]
 
 
 def test_model_joblib():
@@ -57,7 +57,7 @@ def test_model_joblib():
     model.load()
     request = data[0:1].tolist()
     response = model.predict({"instances": request})
-    assert response["predictions"] == [0]
+    assert response["predictions"].tolist() == [0]
 
 
 def test_mixedtype_model_joblib():
@@ -67,7 +67,7 @@ def test_mixedtype_model_joblib():
                 'YrSold': 2008, 'Neighborhood': 'CollgCr', 'OverallQual': 7, 'YearBuilt': 2003,
                 'SaleType': 'WD', 'GarageArea': 548}]
     response = model.predict({"instances": request})
-    assert response["predictions"] == [12.202832815138274]
+    assert response["predictions"].tolist() == [12.202832815138274]
 
 
 def test_model_pickle():
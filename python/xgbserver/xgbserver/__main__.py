@@ -41,5 +41,6 @@ if __name__ == "__main__":
         logging.error(f"fail to locate model file for model {args.model_name} under dir {args.model_dir},"
                       f"trying loading from model repository.")
 
-    kserve.ModelServer(registered_models=XGBoostModelRepository(args.model_dir, args.nthread))\
-        .start([model] if model.ready else [])
+    model_repository = XGBoostModelRepository(args.model_dir, args.nthread, args.model_load_workers,
+                                              args.load_models_in_background)
+    kserve.ModelServer(registered_models=model_repository).start([model] if model.ready else [])
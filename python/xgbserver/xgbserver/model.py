@@ -12,7 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from kserve import Model, Storage
+from kserve import Model, Storage, warmup
 from kserve.model import ModelMissingError, InferenceError
 import xgboost as xgb
 import numpy as np
@@ -28,6 +28,7 @@ class XGBoostModel(Model):
                  booster: XGBModel = None):
         super().__init__(name)
         self.name = name
+        self.platform = "xgboost"
         self.model_dir = model_dir
         self.nthread = nthread
         if booster is not None:
@@ -35,12 +36,13 @@ class XGBoostModel(Model):
             self.ready = True
 
     def load(self) -> bool:
-        model_file = os.path.join(
-            Storage.download(self.model_dir), BOOSTER_FILE)
+        model_path = Storage.download(self.model_dir)
+        model_file = os.path.join(model_path, BOOSTER_FILE)
         if not os.path.exists(model_file):
             raise ModelMissingError(model_file)
         self._booster = xgb.Booster(params={"nthread": self.nthread},
                                     model_file=model_file)
+        self.warmup_requests = warmup.load_requests(model_path)
         self.ready = True
         return self.ready
 
@@ -49,6 +51,6 @@ class XGBoostModel(Model):
             # Use of list as input is deprecated see https://github.com/dmlc/xgboost/pull/3970
             dmatrix = xgb.DMatrix(np.array(request["instances"]), nthread=self.nthread)
             result: xgb.DMatrix = self._booster.predict(dmatrix)
-            return {"predictions": result.tolist()}
+            return {"predictions": result}
         except Exception as e:
             raise InferenceError(str(e))
@@ -40,4 +40,4 @@ def test_model():
     model.load()
     request = [X[0].tolist()]
     response = model.predict({"instances": request})
-    assert response["predictions"] == [0]
+    assert response["predictions"].tolist() == [0]
@@ -0,0 +1,62 @@
+# Copyright 2022 The KServe Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Measures the encode/decode cost of the kserve JSON codecs per payload size.
+
+    python json_codec_benchmark.py [--rows 1 100 10000] [--features 16] [--repeat 20]
+
+Requests are v1 {"instances": [[float, ...], ...]} payloads, responses are encoded
+both from NumPy arrays (native serialization) and from the tolist() lists the
+framework servers used to return.
+"""
+
+import argparse
+import timeit
+
+import numpy as np
+
+from kserve.utils import json_codec
+
+
+def _best_ms(fn, repeat: int) -> float:
+    number = 5
+    return min(timeit.repeat(fn, number=number, repeat=repeat)) / number * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[1, 100, 10000])
+    parser.add_argument("--features", type=int, default=16)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    codecs = [name for name in ("json", "orjson") if name in json_codec._codecs]
+    print(f"{'codec':8} {'rows':>7} {'bytes':>10} {'decode ms':>10} "
+          f"{'encode list ms':>15} {'encode ndarray ms':>18}")
+    for rows in args.rows:
+        array = np.random.rand(rows, args.features).astype(np.float32)
+        request = json_codec._codecs["json"].dumps({"instances": array.tolist()})
+        for name in codecs:
+            json_codec.set_codec(name)
+            decode = _best_ms(lambda: json_codec.loads(request), args.repeat)
+            encode_list = _best_ms(lambda: json_codec.dumps({"predictions": array.tolist()}),
+                                   args.repeat)
+            encode_array = _best_ms(lambda: json_codec.dumps({"predictions": array}), args.repeat)
+            print(f"{name:8} {rows:>7} {len(request):>10} {decode:>10.3f} "
+                  f"{encode_list:>15.3f} {encode_array:>18.3f}")
+
+
+if __name__ == "__main__":
+    main()